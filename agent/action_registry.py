@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+自定义动作注册 (支持延迟加载)
+
+说明:
+- 各模块用 @custom_action("名称") 注册自定义动作 (与 @AgentServer.custom_action 用法相同)
+- 直接导入模块时 (模拟环境 / 工具脚本) 立即向 AgentServer 注册, 行为与 AgentServer.custom_action 一致
+- Agent 启动时 main 先调用 install_lazy_actions(): 按 ACTION_MODULES 清单为每个动作注册一个轻量代理,
+  AgentServer 无需导入 numpy / 识别 / 动作序列等模块即可启动;
+  模块在后台预热 (warm_up) 或首次执行该动作时导入, 其中的 @custom_action 把真实实例绑定到代理上
+- 新增自定义动作时须同时加入 ACTION_MODULES (打包时 tools/MaaAgent.spec 按此清单收集隐式导入)
+"""
+
+import importlib
+import logging
+import threading
+import time
+
+from maa.agent.agent_server import AgentServer
+from maa.custom_action import CustomAction
+
+logger = logging.getLogger(__name__)
+
+# 动作名 -> 定义它的模块
+# (预热按此顺序导入: 各任务的入口是设置节点, setting 最先)
+ACTION_MODULES = {
+    "SetDodgeKey": "setting",
+    "SetAutoBattleMode": "setting",
+    "SetBattleRounds": "setting",
+    "SetAutoEInterval": "setting",
+    "SetRoundTimeout": "setting",
+    "ApplySettings": "setting",
+    "ResetCharacterPosition": "common",
+    "AutoBattle": "common",
+    "MultiRoundsAutoBattle": "common",
+    "RunWithShift": "movement_action.actions",
+    "LongPressKey": "movement_action.actions",
+    "PressMultipleKeys": "movement_action.actions",
+    "RunWithJump": "movement_action.actions",
+    "JsonActionSequence": "movement_action.action_sequence",
+}
+
+# 已注册的延迟代理 (install_lazy_actions 之后)
+_proxies = {}
+
+# 已导入模块中注册的动作类
+_classes = {}
+
+
+class LazyAction(CustomAction):
+    """
+    延迟加载的自定义动作代理: 首次执行时导入定义模块, 之后直接转发给真实实例
+    """
+
+    def __init__(self, name, module):
+        super().__init__()
+        self.name = name
+        self.module = module
+        self.target = None
+        self._lock = threading.Lock()
+
+    def bind(self, action):
+        self.target = action
+
+    def load(self):
+        """导入定义模块并返回真实实例 (模块中没有对应的 @custom_action 时返回 None)"""
+        if self.target is None:
+            with self._lock:
+                if self.target is None:
+                    begin = time.perf_counter()
+                    importlib.import_module(self.module)
+                    if self.target is not None:
+                        logger.info(f"[ActionRegistry] 首次使用 {self.name}, 加载模块 {self.module} "
+                                    f"({(time.perf_counter() - begin) * 1000:.0f}ms)")
+        return self.target
+
+    def run(self, context, argv):
+        try:
+            action = self.load()
+        except Exception as e:
+            logger.error(f"[ActionRegistry] 加载模块 {self.module} 失败: {e}", exc_info=True)
+            return False
+        if action is None:
+            logger.error(f"[ActionRegistry] 模块 {self.module} 中没有注册动作 {self.name}")
+            return False
+        return action.run(context, argv)
+
+
+def custom_action(name):
+    """
+    自定义动作注册装饰器
+
+    已安装延迟代理时把实例绑定到代理上, 否则直接向 AgentServer 注册
+    """
+    def decorator(cls):
+        _classes[name] = cls
+        proxy = _proxies.get(name)
+        if proxy is not None:
+            proxy.bind(cls())
+        else:
+            if _proxies:
+                logger.warning(f"[ActionRegistry] 动作 {name} 不在 ACTION_MODULES 中, 启动后注册可能不生效")
+            AgentServer.custom_action(name)(cls)
+        return cls
+    return decorator
+
+
+def install_lazy_actions():
+    """为 ACTION_MODULES 中的全部动作注册延迟代理 (须在 AgentServer.start_up 之前调用)"""
+    for name, module in ACTION_MODULES.items():
+        if name in _proxies:
+            continue
+        proxy = LazyAction(name, module)
+        if name in _classes:
+            # 模块在此之前已被导入 (已直接注册): 代理直接绑定
+            proxy.bind(_classes[name]())
+        _proxies[name] = proxy
+        AgentServer.register_custom_action(name, proxy)
+    return len(_proxies)
+
+
+def warm_up():
+    """
+    依次导入全部动作模块 (Agent 就绪后在后台执行, 通常在首次使用前完成)
+
+    Returns:
+        {模块名: 导入耗时 (秒)}
+    """
+    timings = {}
+    for module in dict.fromkeys(ACTION_MODULES.values()):
+        begin = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.error(f"[ActionRegistry] 预热模块 {module} 失败: {e}", exc_info=True)
+            continue
+        timings[module] = time.perf_counter() - begin
+    missing = [name for name, proxy in _proxies.items() if proxy.target is None]
+    if missing:
+        logger.warning(f"[ActionRegistry] 以下动作未在对应模块中注册: {missing}")
+    return timings
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+自动战斗输入循环
+
+说明:
+- 战斗中的按键输入 (E 技能及可选的额外按键 / 动作序列) 在独立线程中按各自周期执行,
+  与识别结束画面的检测循环互不阻塞: 识别变慢不会推迟按 E, 按 E 周期也不再决定截图频率
+- 两个循环共享同一个 CancelToken 作为停止信号: 检测到结束画面、超时或任务停止时一起结束
+- 额外输入由 AutoBattle 的 custom_action_param 配置:
+  "extra_inputs": [
+      {"key": 81, "interval_ms": 8000},                      # 每 8 秒按一次 Q (VK 0x51)
+      {"sequence": "dodge_roll", "interval_ms": 15000, "delay_ms": 3000}
+  ]
+  delay_ms 为首次执行前的延迟, 默认 0; 动作序列经 JsonActionSequence 回放, 停止后会先播完当前一次
+"""
+
+import logging
+import threading
+import time
+
+import keycodes
+from tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+# 停止后等待输入线程结束的时间（秒）
+JOIN_TIMEOUT = 10.0
+
+# 等待开始信号时检查停止的间隔（秒）
+READY_POLL = 0.05
+
+
+class PeriodicInput:
+    """
+    周期输入
+
+    Args:
+        name: 日志中的名称
+        interval: 周期（秒）
+        fire: fire(context) 执行一次输入
+        delay: 首次执行前的延迟（秒）
+    """
+
+    def __init__(self, name, interval, fire, delay=0.0):
+        self.name = name
+        self.interval = interval
+        self.fire = fire
+        self.delay = delay
+        self.count = 0
+
+
+def key_input(vk, interval, delay=0.0, name=None):
+    """按一次按键 (post_click_key) 的周期输入"""
+    def fire(context):
+        with TRACER.span("key_click", vk=vk):
+            context.tasker.controller.post_click_key(vk).wait()
+    return PeriodicInput(name or f"VK 0x{vk:02X}", interval, fire, delay)
+
+
+def sequence_input(sequence, interval, delay=0.0):
+    """回放一次动作序列的周期输入"""
+    def fire(context):
+        # 延迟导入: movement_action 依赖较多, 仅在配置了序列输入时加载
+        from movement_action.action_sequence import JsonActionSequence
+        if not JsonActionSequence().run(context, sequence):
+            logger.warning(f"[BattleInput] 动作序列 '{sequence}' 执行失败")
+    return PeriodicInput(f"序列 {sequence}", interval, fire, delay)
+
+
+def build_inputs(auto_battle_mode, e_interval_ms, extra_inputs=None):
+    """
+    按自动战斗模式与额外输入配置生成周期输入列表
+
+    Raises:
+        ValueError: extra_inputs 格式不合法
+    """
+    inputs = []
+    if auto_battle_mode != 1:
+        # 模式 0 (及未知模式) 循环按 E; 模式 1 什么也不做
+        inputs.append(key_input(keycodes.VK_E, e_interval_ms / 1000.0, name="E"))
+
+    for i, item in enumerate(extra_inputs or []):
+        if not isinstance(item, dict):
+            raise ValueError(f"extra_inputs[{i}] 必须是对象: {item}")
+        interval = item.get("interval_ms")
+        delay = item.get("delay_ms", 0)
+        if isinstance(interval, bool) or not isinstance(interval, (int, float)) or interval <= 0:
+            raise ValueError(f"extra_inputs[{i}]: interval_ms 必须为正数: {interval}")
+        if isinstance(delay, bool) or not isinstance(delay, (int, float)) or delay < 0:
+            raise ValueError(f"extra_inputs[{i}]: delay_ms 不能为负数: {delay}")
+        if "key" in item:
+            vk = item["key"]
+            if isinstance(vk, bool) or not isinstance(vk, int) or not 0 < vk < 256:
+                raise ValueError(f"extra_inputs[{i}]: 非法的虚拟键码: {vk}")
+            inputs.append(key_input(vk, interval / 1000.0, delay / 1000.0))
+        elif isinstance(item.get("sequence"), str) and item["sequence"]:
+            inputs.append(sequence_input(item["sequence"], interval / 1000.0, delay / 1000.0))
+        else:
+            raise ValueError(f"extra_inputs[{i}]: 需要 key 或 sequence: {item}")
+    return inputs
+
+
+class InputLoop:
+    """
+    输入循环线程: 按各输入的截止时间依次执行, 执行耗时不累积到后续周期
+
+    使用方式:
+        loop = InputLoop(context, inputs, stop_token)
+        loop.start()
+        ...检测循环...
+        stop_token.cancel()
+        loop.join()
+
+    ready 为可选的 threading.Event: 设置后才开始计时与输入 (例如等待上一轮的轮后处理完成)
+    """
+
+    def __init__(self, context, inputs, stop_token, clock=time.perf_counter, ready=None):
+        self.context = context
+        self.inputs = inputs
+        self.stop_token = stop_token
+        self.clock = clock
+        self.ready = ready
+        self._thread = None
+
+    def start(self):
+        if not self.inputs:
+            return
+        self._thread = threading.Thread(target=self._run, name="BattleInput", daemon=True)
+        self._thread.start()
+
+    def join(self, timeout=JOIN_TIMEOUT):
+        if self._thread is None:
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("[BattleInput] 等待输入线程结束超时")
+
+    def describe(self):
+        if not self.inputs:
+            return "无"
+        return ", ".join(f"{item.name} 每 {item.interval * 1000:.0f}ms" for item in self.inputs)
+
+    def summary(self):
+        return ", ".join(f"{item.name} {item.count} 次" for item in self.inputs)
+
+    def _run(self):
+        if self.ready is not None:
+            while not self.ready.wait(READY_POLL):
+                if self.stop_token.cancelled:
+                    return
+        start = self.clock()
+        deadlines = [start + item.delay for item in self.inputs]
+        while True:
+            i = min(range(len(deadlines)), key=deadlines.__getitem__)
+            if not self.stop_token.wait_until(deadlines[i], self.clock):
+                return
+            item = self.inputs[i]
+            try:
+                item.fire(self.context)
+                item.count += 1
+                logger.debug(f"[BattleInput] {item.name} (第 {item.count} 次)")
+            except Exception as e:
+                logger.warning(f"[BattleInput] {item.name} 执行异常: {e}")
+            # 按计划周期推进; 执行过慢落后时只立即补一次, 不连续补发
+            deadlines[i] = max(deadlines[i] + item.interval, self.clock())
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+协作式取消
+
+所有自定义动作共用的取消令牌与可中断等待:
+- CancelToken 绑定 context, 以不超过 POLL_INTERVAL 的间隔检查 context.tasker.stopping
+- token.wait(seconds) 代替 time.sleep, 取消时立即返回 False;
+  token.sleep(seconds) 则在取消时抛出 ActionCancelled, 便于配合 try/finally 收尾
+- 从发现停止到动作收尾 (释放按键) 的耗时通过 token.log_stop() 记录
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 停止检查间隔（秒）：决定停止响应延迟的上限
+POLL_INTERVAL = 0.02
+
+# 停止响应耗时告警阈值（秒）
+STOP_LATENCY_WARN = 0.05
+
+
+class ActionCancelled(Exception):
+    """动作因任务停止而中止"""
+
+
+class CancelToken:
+    """
+    取消令牌
+
+    使用方式:
+        token = CancelToken(context)
+        if not token.wait(2.0):      # 等待期间被停止
+            ...释放按键...
+            token.log_stop("[RunWithShift]")
+            return False
+    """
+
+    def __init__(self, context=None):
+        self._context = context
+        self._event = threading.Event()
+        self.cancelled_at = None  # 首次发现取消的时刻 (time.perf_counter)
+
+    def cancel(self):
+        """主动取消 (例如检测到异常需要提前结束)"""
+        if self.cancelled_at is None:
+            self.cancelled_at = time.perf_counter()
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        if self._event.is_set():
+            return True
+        context = self._context
+        if context is not None and context.tasker.stopping:
+            self.cancel()
+            return True
+        return False
+
+    def wait(self, seconds):
+        """
+        可中断等待
+
+        Returns:
+            bool: 完整等待结束返回 True, 被取消返回 False
+        """
+        return self.wait_until(time.perf_counter() + max(0.0, seconds))
+
+    def sleep(self, seconds):
+        """可中断等待, 被取消时抛出 ActionCancelled"""
+        if not self.wait(seconds):
+            raise ActionCancelled()
+
+    def wait_until(self, deadline, clock=time.perf_counter, sleep=None):
+        """
+        可中断地等待到 deadline (clock 时钟), 被取消返回 False
+
+        sleep 为可选的睡眠函数 (如虚拟时钟), 默认在内部事件上等待, cancel() 可立即唤醒
+        """
+        while True:
+            if self.cancelled:
+                return False
+            remaining = deadline - clock()
+            if remaining <= 0:
+                return True
+            if sleep is None:
+                self._event.wait(min(remaining, POLL_INTERVAL))
+            else:
+                sleep(min(remaining, POLL_INTERVAL))
+
+    def stop_latency(self):
+        """从发现取消到现在的耗时（秒），未取消返回 None"""
+        if self.cancelled_at is None:
+            return None
+        return time.perf_counter() - self.cancelled_at
+
+    def log_stop(self, tag):
+        """记录停止响应耗时（应在释放按键等收尾工作完成后调用）"""
+        latency = self.stop_latency()
+        if latency is None:
+            return
+        if latency > STOP_LATENCY_WARN:
+            logger.warning(f"{tag} 任务停止, 收尾耗时 {latency * 1000:.1f}ms (超过 {STOP_LATENCY_WARN * 1000:.0f}ms)")
+        else:
+            logger.info(f"{tag} 任务停止, 收尾耗时 {latency * 1000:.1f}ms")
@@ -4,22 +4,35 @@
 包含各种常用的自定义 Action
 """
 
-from maa.agent.agent_server import AgentServer
+from action_registry import custom_action
 from maa.custom_action import CustomAction
 from maa.context import Context
 import time
 import logging
 import json
 import os
+import threading
 from datetime import datetime
 
 # 导入全局配置
-from config import GAME_CONFIG
+from config_store import CONFIG_STORE
+from cancellation import CancelToken
+from tracing import TRACER, trace_action
+from recognition import RECOGNIZER
+from frame_gate import FRAME_GATE
+from recognition_memo import RECOGNITION_MEMO
+from frame_service import FRAME_SERVICE
+from round_stats import ROUND_STATS, DetectionCadence
+from battle_input import InputLoop, build_inputs
+from round_records import (
+    ROUND_RECORDER, RoundResult, OUTCOME_HIT, OUTCOME_TIMEOUT, OUTCOME_STOPPED, OUTCOME_ERROR,
+)
 
 # 获取日志记录器
 logger = logging.getLogger(__name__)
 
-@AgentServer.custom_action("ResetCharacterPosition")
+@custom_action("ResetCharacterPosition")
+@trace_action
 class ResetCharacterPosition(CustomAction):
     """
     通过 Context.run_task 同步执行节点 "Reset_Entry"
@@ -54,7 +67,8 @@ class ResetCharacterPosition(CustomAction):
                 logger.debug(f"  使用 pipeline_override: {list(pipeline_override.keys())}")
 
             # 同步执行任务：失败将返回 None，成功返回 TaskDetail
-            task_detail = context.run_task("Reset_Entry", pipeline_override=pipeline_override)
+            with TRACER.span("run_task", entry="Reset_Entry"):
+                task_detail = context.run_task("Reset_Entry", pipeline_override=pipeline_override)
 
             if not task_detail:
                 logger.error("[ResetCharacterPosition] 任务执行失败 (task_id = None)")
@@ -70,11 +84,53 @@ class ResetCharacterPosition(CustomAction):
             return False
 
 
-@AgentServer.custom_action("AutoBattle")
+def _load_params(argv, tag):
+    """解析 custom_action_param (JSON 字符串或字典), 失败返回 None"""
+    try:
+        if isinstance(argv.custom_action_param, str):
+            return json.loads(argv.custom_action_param)
+        if isinstance(argv.custom_action_param, dict):
+            return argv.custom_action_param
+        logger.error(f"[{tag}] 参数类型错误: {type(argv.custom_action_param)}")
+        return None
+    except json.JSONDecodeError as e:
+        logger.error(f"[{tag}] JSON 解析失败: {e}")
+        logger.error(f"  参数内容: {argv.custom_action_param}")
+        return None
+
+
+class BattleSettings:
+    """
+    解析后的自动战斗参数 (每次动作解析一次, 多轮战斗的各轮共用)
+
+    检测节奏、单轮超时与输入依赖不断更新的历史时长和配置, 由 AutoBattle.battle() 每轮按配置快照重新计算
+    """
+
+    def __init__(self, target_nodes, stats_key, extra_inputs):
+        self.target_nodes = target_nodes
+        self.stats_key = stats_key
+        self.extra_inputs = extra_inputs
+
+    def build_inputs(self, config):
+        """按配置快照中的自动战斗模式与按 E 周期生成周期输入"""
+        return build_inputs(config.get("auto_battle_mode", 0), float(config.get("auto_e_interval_ms", 5000)),
+                            self.extra_inputs)
+
+
+@custom_action("AutoBattle")
+@trace_action
 class AutoBattle(CustomAction):
     """
     循环检测目标文字，支持超时处理和中断动作
     当未检测到目标时，执行中断动作（自动战斗）
+
+    输入与检测是两个独立的循环, 共享同一个停止信号:
+    - 输入循环 (后台线程, 见 battle_input): 按 E 固定每 auto_e_interval_ms 一次,
+      以及 custom_action_param 中 extra_inputs 配置的额外按键 / 动作序列, 各自按周期执行
+    - 检测循环 (当前线程): 间隔由 DetectionCadence 根据同一任务 (节点名) 的历史战斗时长决定,
+      预计结束前后突发为 detect_interval_min_ms, 其余时间为 detect_interval_max_ms
+    - 检测到目标、超时或任务停止时两个循环一起结束
+    每一轮的结果写入 ROUND_RECORDER (logs_agent/battle_rounds.jsonl)
     """
 
     def run(
@@ -82,127 +138,236 @@ class AutoBattle(CustomAction):
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
-        # 从参数中获取配置（仅需要: check_interval(float), round_timeout(float), target_node(list[str])）
-        # 支持 JSON 字符串或字典，单位按秒传入，这里转换为毫秒以复用原实现
-        try:
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                logger.error(f"[AutoBattle] 参数类型错误: {type(argv.custom_action_param)}")
-                return False
-        except json.JSONDecodeError as e:
-            logger.error(f"[AutoBattle] JSON 解析失败: {e}")
-            logger.error(f"  参数内容: {argv.custom_action_param}")
+        # 从参数中获取配置（仅需要: target_node(list[str]), 可选 extra_inputs）
+        params = _load_params(argv, "AutoBattle")
+        if params is None:
+            return False
+        settings = self.parse_settings(argv, params)
+        if settings is None:
             return False
 
-        # 从全局配置获取周期与超时（毫秒）
-        check_interval = float(GAME_CONFIG.get("auto_e_interval_ms", 5000))
-        round_timeout = float(GAME_CONFIG.get("round_timeout_ms", 180000))
-
+        result = self.battle(context, settings, RoundResult(settings.stats_key, 1, 1))
+        ROUND_RECORDER.record(result)
+        return result.ok
 
+    @staticmethod
+    def parse_settings(argv, params, tag="AutoBattle"):
+        """由动作参数与全局配置生成 BattleSettings, 参数不合法时返回 None"""
         # 仅从参数中读取目标节点
         target_nodes = params.get("target_node", ["again_for_win"])  # 要检测的目标节点（支持数组）
-        if isinstance(target_nodes, str):
-            target_nodes = [target_nodes]
-        # 兼容：保留旧字段以不破坏后续逻辑（但不再依赖 override_next）
-        interrupt_node = params.get("interrupt_node", "autoBattle_for_win")
-        
         # 兼容旧配置：如果 target_node 是字符串，转换为数组
         if isinstance(target_nodes, str):
             target_nodes = [target_nodes]
+
+        # 按任务 (节点名) 学习战斗时长
+        stats_key = getattr(argv, "node_name", None) or ",".join(target_nodes)
+        config = CONFIG_STORE.snapshot()
+        auto_battle_mode = config.get("auto_battle_mode", 0)
+        if auto_battle_mode not in (0, 1):
+            logger.warning(f"[{tag}] 未知模式 {auto_battle_mode}，默认执行模式 0")
+        settings = BattleSettings(target_nodes, stats_key, params.get("extra_inputs"))
+        try:
+            settings.build_inputs(config)
+        except ValueError as e:
+            logger.error(f"[{tag}] 参数错误: {e}")
+            return None
+        return settings
+
+    def battle(self, context, settings, result, ready=None):
+        """
+        执行一轮战斗, 结果填入 result (RoundResult) 并返回
+
+        Args:
+            ready: 可选的 threading.Event, 表示上一轮的轮后处理仍在进行:
+                未设置前照常检测但忽略命中 (结算画面尚未离开), 输入循环也不开始;
+                设置后本轮才开始计时与计数检测次数。等待同样以单轮超时为上限, 超过后按超时结束
+        """
+        target_nodes = settings.target_nodes
+        # 本轮使用同一份配置快照, 轮中的配置变化 (热加载 / 设置节点) 从下一轮生效
+        config = CONFIG_STORE.snapshot()
+        # 按任务 (节点名) 学习的战斗时长决定检测节奏
+        cadence = DetectionCadence(ROUND_STATS.expected(settings.stats_key), config)
+        # 单轮超时: 固定值, 或自动模式下由历史时长分布决定
+        round_timeout, timeout_source = ROUND_STATS.round_timeout(settings.stats_key, config)
+        inputs = settings.build_inputs(config)
+        
+        # 输入循环与检测循环共享的停止信号 (任务停止时同样触发)
+        stop = CancelToken(context)
+        input_loop = InputLoop(context, inputs, stop, ready=ready)
         
         logger.info("=" * 50)
         logger.info("[AutoBattle] 开始战斗循环检测")
-        logger.info(f"  检测间隔: {check_interval}ms, 单轮超时: {round_timeout}ms")
-        # logger.info(f"  目标节点: {target_nodes}, 中断节点: {interrupt_node}")
+        logger.info(f"  配置版本: v{config.version}")
+        logger.info(f"  单轮超时: {round_timeout:.0f}ms ({timeout_source})")
+        logger.info(f"  输入: {input_loop.describe()}")
+        logger.info(f"  检测节奏: {cadence.describe()}")
+        if ready is not None and not ready.is_set():
+            logger.info("  上一轮的轮后处理进行中, 完成后开始计时与输入")
         
+        start_time = time.time()
+        span_start = time.perf_counter()
         try:
             # 开始循环检测目标节点
-            start_time = time.time()
-            loop_count = 0
+            started = ready is None or ready.is_set()
+            input_loop.start()
             
             while True:
-                if context.tasker.stopping:
+                if stop.cancelled:
                     logger.info("[AutoBattle] 任务暂停")
-                    return False
-                loop_count += 1
+                    stop.log_stop("[AutoBattle]")
+                    result.outcome = OUTCOME_STOPPED
+                    return result
+                if not started:
+                    if ready.is_set():
+                        # 轮后处理完成, 本轮开始计时
+                        started = True
+                        start_time = time.time()
+                    elif (time.time() - start_time) * 1000 >= round_timeout:
+                        logger.warning(f"[AutoBattle] 轮后处理超过 {round_timeout:.0f}ms 仍未完成，跳转到 on_error")
+                        result.outcome = OUTCOME_TIMEOUT
+                        return result
+                if started:
+                    result.ticks += 1
                 elapsed = (time.time() - start_time) * 1000  # 已经过的时间（毫秒）
                 
                 # 检查是否超时
-                if elapsed >= round_timeout:
-                    logger.warning(f"[AutoBattle] 超时 {round_timeout}ms，跳转到 on_error")
-                    logger.info(f"  总循环次数: {loop_count}")
-                    return False
+                if started and elapsed >= round_timeout:
+                    logger.warning(f"[AutoBattle] 超时 {round_timeout:.0f}ms，跳转到 on_error")
+                    logger.info(f"  总循环次数: {result.ticks}")
+                    result.outcome = OUTCOME_TIMEOUT
+                    return result
                 
                 # 尝试检测目标节点
-                logger.info(f"[AutoBattle] 第 {loop_count} 次检测 {target_nodes}... (已用时: {int(elapsed)}ms / {round_timeout}ms)")
+                logger.debug(f"[AutoBattle] 第 {result.ticks} 次检测 {target_nodes}... (已用时: {int(elapsed)}ms / {round_timeout:.0f}ms)")
                 
-                # 获取最新截图
-                sync_job = context.tasker.controller.post_screencap()
-                sync_job.wait()
-                image = context.tasker.controller.cached_image  # 这是属性,不是方法
+                # 获取最新截图 (本次检测之后提交的截图, 与其他同时发起的截图请求合并)
+                frame = FRAME_SERVICE.get(context.tasker.controller, max_age_ms=0)
+                image = frame.image if frame is not None else context.tasker.controller.cached_image
                 
-                # 依次对所有目标节点进行识别
-                detected_node = None
-                reco_result = None
-                
-                for target_node in target_nodes:
-                    logger.debug(f"[AutoBattle] -> 尝试识别节点: '{target_node}'")
-                    # 新版 run_recognition 总是返回 RecognitionDetail，使用 .hit 判断是否命中
-                    current_reco_result = context.run_recognition(target_node, image)
-
-                    # RecognitionDetail.hit 表示是否命中；额外检查 box 保持向后兼容
-                    if getattr(current_reco_result, "hit", False):
-                        if current_reco_result.box and current_reco_result.box.w > 0 and current_reco_result.box.h > 0:
-                            logger.info(f"[AutoBattle] -> [OK] 识别到节点: '{target_node}'")
-                            detected_node = target_node
-                            reco_result = current_reco_result
-                            break
-                        else:
-                            # hit 为 True 但没有有效 box 时，也认为命中（容错）
-                            logger.info(f"[AutoBattle] -> [OK] 识别到节点(无 box): '{target_node}'")
-                            detected_node = target_node
-                            reco_result = current_reco_result
-                            break
-                    else:
-                        logger.debug(f"[AutoBattle] -> [X] 未识别到节点: '{target_node}'")
+                # 在同一帧上并发识别所有目标节点，第一个命中的节点胜出
+                with TRACER.span("detect", tick=result.ticks):
+                    tick = RECOGNIZER.first_hit(context, target_nodes, image, config)
+                detected_node = tick.node
+                reco_result = tick.detail
+                logger.debug(f"[AutoBattle] -> 检测耗时 {tick.elapsed * 1000:.0f}ms "
+                             f"(依次识别约 {tick.serial_cost * 1000:.0f}ms): "
+                             + ", ".join(f"{n} {d * 1000:.0f}ms" for n, d in tick.durations.items()))
                 
                 # 检查是否有任何一个节点被识别到
-                if detected_node:
-                    # 新逻辑：直接返回 True，不再 override_next
-                    return True
-                else:
-                    # 从全局配置获取自动战斗模式
-                    auto_battle_mode = GAME_CONFIG.get("auto_battle_mode", 0)
-                    
-                    if auto_battle_mode == 0:
-                        # 模式 0: 循环按 E 键（默认）
-                        logger.debug(f"[AutoBattle] -> 模式 0: 执行自动战斗（按 E 键）")
-                        click_job = context.tasker.controller.post_click_key(69)  # E 键
-                        click_job.wait()
-                    elif auto_battle_mode == 1:
-                        # 模式 1: 什么也不做
-                        logger.debug(f"[AutoBattle] -> 模式 1: 什么也不做，仅等待")
+                if detected_node and not started:
+                    logger.debug(f"[AutoBattle] -> 轮后处理未完成, 忽略命中 '{detected_node}' (上一轮结算画面)")
+                elif detected_node:
+                    # 先停止输入循环, 避免结束画面上继续按键
+                    stop.cancel()
+                    # RecognitionDetail.hit 表示是否命中；box 无效时也认为命中（容错）
+                    if reco_result.box and reco_result.box.w > 0 and reco_result.box.h > 0:
+                        logger.info(f"[AutoBattle] -> [OK] 识别到节点: '{detected_node}'")
                     else:
-                        logger.warning(f"[AutoBattle] -> 未知模式 {auto_battle_mode}，默认执行模式 0")
-                        click_job = context.tasker.controller.post_click_key(69)  # E 键
-                        click_job.wait()
+                        logger.info(f"[AutoBattle] -> [OK] 识别到节点(无 box): '{detected_node}'")
+                    result.outcome = OUTCOME_HIT
+                    result.node = detected_node
+                    round_seconds = time.time() - start_time
+                    ROUND_STATS.record(settings.stats_key, round_seconds)
+                    logger.info(f"  本轮用时: {round_seconds:.1f}s, 检测 {result.ticks} 次")
+                    if inputs:
+                        logger.info(f"  输入: {input_loop.summary()}")
+                    self._log_recognition_stats(target_nodes)
+                    # 新逻辑：直接返回 True，不再 override_next
+                    return result
 
-                    # 等待检测间隔
-                    logger.debug(f"[AutoBattle] -> 等待检测间隔 {check_interval}ms...")
-                    time.sleep(check_interval / 1000.0)
+                # 等待到下一次检测（可被任务停止中断）; 等待轮后处理期间使用快速间隔
+                if started:
+                    wait_seconds = cadence.interval(time.time() - start_time)
+                else:
+                    wait_seconds = cadence.min_interval
+                logger.debug(f"[AutoBattle] -> 等待 {wait_seconds * 1000:.0f}ms...")
+                stop.wait(wait_seconds)
                     
         except Exception as e:
             logger.error(f"[AutoBattle] 发生异常: {e}", exc_info=True)
-            return False
+            result.outcome = OUTCOME_ERROR
+            return result
+        finally:
+            stop.cancel()
+            input_loop.join()
+            result.started_at = datetime.fromtimestamp(start_time)
+            result.duration = time.time() - start_time
+            result.inputs = {item.name: item.count for item in inputs}
+            TRACER.complete("battle_round", span_start, time.perf_counter(), "battle",
+                            {"round": result.round_num, "outcome": result.outcome, "ticks": result.ticks})
+
+    @staticmethod
+    def _log_recognition_stats(target_nodes):
+        """输出各目标节点的累计识别耗时、画面门控跳过次数与识别缓存命中情况"""
+        counters = FRAME_GATE.counters()
+        for node in target_nodes:
+            summary = RECOGNIZER.stats.summary(node)
+            if summary:
+                gate = counters.get(node, {"skipped": 0})
+                logger.info(f"  识别耗时 '{node}': 平均 {summary['mean_ms']:.0f}ms, 最大 {summary['max_ms']:.0f}ms "
+                            f"({summary['count']} 次, 命中 {summary['hits']} 次, 画面未变跳过 {gate['skipped']} 次)")
+        memo = RECOGNITION_MEMO.counters()
+        logger.info(f"  识别缓存: 命中 {memo['hits']} 次, 未命中 {memo['misses']} 次, "
+                    f"过期 {memo['expired']} 次, 当前 {memo['size']} 条")
 
-@AgentServer.custom_action("MultiRoundsAutoBattle")
+
+class _PostRound:
+    """
+    一轮结束后的处理节点 (context.run_task 依次执行)
+
+    同步模式下在当前线程执行; 重叠模式下在后台线程执行, 完成时设置 done,
+    下一轮的检测在此期间已经开始 (命中被忽略, 输入与计时等待 done)
+    """
+
+    def __init__(self, context, nodes, token, result):
+        self.context = context
+        self.nodes = nodes
+        self.token = token
+        self.result = result
+        self.done = threading.Event()
+        self.finished_at = None
+        self._thread = None
+
+    def run(self):
+        begin = time.time()
+        try:
+            for post_node in self.nodes:
+                if self.token.cancelled:
+                    break
+                try:
+                    with TRACER.span("run_task", entry=post_node):
+                        self.context.run_task(post_node)
+                except Exception as e:
+                    logger.warning(f"[MultiRoundsAutoBattle] 执行 post_round '{post_node}' 时出错: {e}")
+        finally:
+            self.finished_at = time.time()
+            self.result.post_round = self.finished_at - begin
+            self.done.set()
+
+    def start(self):
+        self.result.overlapped = True
+        self._thread = threading.Thread(target=self.run, name="PostRound", daemon=True)
+        self._thread.start()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+
+@custom_action("MultiRoundsAutoBattle")
+@trace_action
 class MultiRoundsAutoBattle(CustomAction):
     """
     多轮自动战斗动作
     循环执行 AutoBattle，直到达到指定轮数或超时
+
+    参数:
+    {
+        "target_node": [...],            // 同 AutoBattle
+        "post_rounds": ["node", ...],    // 每轮 (除最后一轮) 后执行的处理节点
+        "overlap_post_rounds": false     // 为 true 时处理节点在后台执行, 同时开始下一轮的检测
+    }
+    每轮的 用时 / 检测次数 / 输入次数 / 轮后处理耗时 / 轮间间隔 写入 logs_agent/battle_rounds.jsonl
     """
 
     def run(
@@ -210,64 +375,117 @@ class MultiRoundsAutoBattle(CustomAction):
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
-        # 从参数中获取配置（仅 target_node 与 post_rounds）
-        try:
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                logger.error(f"[MultiRoundsAutoBattle] 参数类型错误: {type(argv.custom_action_param)}")
-                return False
-        except json.JSONDecodeError as e:
-            logger.error(f"[MultiRoundsAutoBattle] JSON 解析失败: {e}")
-            logger.error(f"  参数内容: {argv.custom_action_param}")
+        # 从参数中获取配置（target_node / post_rounds / overlap_post_rounds）
+        params = _load_params(argv, "MultiRoundsAutoBattle")
+        if params is None:
             return False
         
         # 从全局配置获取战斗轮数，确保是整数且至少 1
+        config = CONFIG_STORE.snapshot()
         try:
-            total_rounds = int(GAME_CONFIG.get("battle_rounds", 3))
+            total_rounds = int(config.get("battle_rounds", 3))
         except Exception:
             total_rounds = 3
         if total_rounds < 1:
             total_rounds = 1
 
-        # 每轮超时优先使用全局配置，否则回退到总超时或默认
-        round_timeout = GAME_CONFIG.get("round_timeout_ms", 420000)
+        # 参数只解析一次, 各轮共用
+        auto_battle_action = AutoBattle()
+        settings = auto_battle_action.parse_settings(argv, params, "MultiRoundsAutoBattle")
+        if settings is None:
+            return False
         post_rounds = params.get("post_rounds", [])  # 每轮后的处理节点列表
+        overlap = bool(params.get("overlap_post_rounds", False))
+        
+        # 每轮超时由 AutoBattle 按同一任务键决定 (固定值或自动)
+        round_timeout, timeout_source = ROUND_STATS.round_timeout(settings.stats_key, config)
         
         logger.info("=" * 50)
         logger.info("[MultiRoundsAutoBattle] 开始多轮自动战斗")
-        logger.info(f"  总轮数: {total_rounds} (来自全局配置), 每轮超时: {round_timeout}ms")
+        logger.info(f"  总轮数: {total_rounds} (来自全局配置), 每轮超时: {round_timeout:.0f}ms ({timeout_source})")
+        if post_rounds:
+            mode = "与下一轮检测重叠" if overlap else "同步"
+            logger.info(f"  轮后处理: {post_rounds} ({mode})")
+        learned = ROUND_STATS.learned(settings.stats_key)
+        if learned:
+            logger.info(f"  历史时长: {learned['count']} 轮, p50 {learned['p50']:.1f}s, "
+                        f"p90 {learned['p90']:.1f}s, p99 {learned['p99']:.1f}s")
         
-        # 提前创建 AutoBattle 实例，避免在 total_rounds == 1 时未定义变量的问题
-        auto_battle_action = AutoBattle()
+        token = CancelToken(context)
+        pending = None  # 重叠模式下仍在后台执行的上一轮轮后处理
+        previous_end = None
+        results = []
+        try:
+            for round_num in range(1, total_rounds + 1):
+                logger.info(f"[MultiRoundsAutoBattle] 第 {round_num}/{total_rounds} 轮战斗开始")
+                result = RoundResult(settings.stats_key, round_num, total_rounds)
+                ready = pending.done if pending is not None else None
+                auto_battle_action.battle(context, settings, result, ready)
+                results.append(result)
+                if previous_end is not None:
+                    result.gap = max(0.0, result.started_at.timestamp() - previous_end)
 
-        # 执行前 (total_rounds-1) 轮，每轮完成后执行 post_rounds
-        for round_num in range(1, total_rounds):
-            logger.info(f"[MultiRoundsAutoBattle] 第 {round_num}/{total_rounds} 轮战斗开始")
+                # 上一轮的轮后处理通常已在本轮开始计时前完成, 其记录此时才完整
+                if pending is not None:
+                    self._finish_post_round(pending)
+                    pending = None
 
-            result = auto_battle_action.run(context, argv)
+                if not result.ok:
+                    self._record(result)
+                    if result.outcome == OUTCOME_STOPPED or token.cancelled:
+                        logger.info("[MultiRoundsAutoBattle] 任务暂停")
+                        token.log_stop("[MultiRoundsAutoBattle]")
+                    elif round_num < total_rounds:
+                        logger.error(f"[MultiRoundsAutoBattle] 第 {round_num} 轮战斗失败或超时，终止多轮战斗")
+                    else:
+                        logger.error(f"[MultiRoundsAutoBattle] 最后一轮战斗失败或超时")
+                    return False
 
-            if not result:
-                logger.error(f"[MultiRoundsAutoBattle] 第 {round_num} 轮战斗失败或超时，终止多轮战斗")
-                return False
+                logger.info(f"[MultiRoundsAutoBattle] 第 {round_num} 轮战斗完成")
+                previous_end = result.started_at.timestamp() + result.duration
 
-            logger.info(f"[MultiRoundsAutoBattle] 第 {round_num} 轮战斗完成")
+                if round_num == total_rounds or not post_rounds:
+                    self._record(result)
+                    continue
 
-            # 执行每轮后的处理节点（异步/同步由 context.run_task 决定）
-            for post_node in post_rounds:
-                try:
-                    context.run_task(post_node)
-                except Exception as e:
-                    logger.warning(f"[MultiRoundsAutoBattle] 执行 post_round '{post_node}' 时出错: {e}")
+                # 执行每轮后的处理节点
+                post = _PostRound(context, post_rounds, token, result)
+                if overlap:
+                    post.start()
+                    pending = post
+                else:
+                    post.run()
+                    self._record(result)
 
-        # 最后一轮（或仅有的一轮）
-        logger.info(f"[MultiRoundsAutoBattle] 第 {total_rounds}/{total_rounds} 轮战斗开始")
-        last_result = auto_battle_action.run(context, argv)
-        if not last_result:
-            logger.error(f"[MultiRoundsAutoBattle] 最后一轮战斗失败或超时")
-            return False
+                if token.cancelled:
+                    logger.info("[MultiRoundsAutoBattle] 任务暂停")
+                    token.log_stop("[MultiRoundsAutoBattle]")
+                    return False
+        finally:
+            if pending is not None:
+                self._finish_post_round(pending)
+
+        total_time = sum(r.duration for r in results)
+        gaps = [r.gap for r in results if r.gap is not None]
         logger.info(f"[MultiRoundsAutoBattle] [OK] 所有 {total_rounds} 轮战斗已完成")
+        if gaps:
+            logger.info(f"  战斗总用时 {total_time:.1f}s, 轮间间隔合计 {sum(gaps):.1f}s "
+                        f"(平均 {sum(gaps) / len(gaps):.1f}s)")
         logger.info("=" * 50)
-        return True
\ No newline at end of file
+        return True
+
+    @classmethod
+    def _finish_post_round(cls, pending):
+        """
+        记录重叠执行的轮后处理; 仍未完成时 (等待超时、任务停止或异常) 不等待可能卡住的后台线程
+        """
+        if pending.done.is_set():
+            pending.join()
+        else:
+            logger.warning("[MultiRoundsAutoBattle] 上一轮的轮后处理仍未完成, 不再等待")
+        cls._record(pending.result)
+
+    @staticmethod
+    def _record(result):
+        logger.info(f"[MultiRoundsAutoBattle] {result}")
+        ROUND_RECORDER.record(result)
@@ -2,15 +2,42 @@
 全局配置模块
 
 定义游戏相关的全局配置，避免循环导入问题。
+这里的值为默认值；./config/agent_config.json 中的覆盖项在启动时由 config_store.CONFIG_STORE 加载并支持热加载，
+写入配置请使用 CONFIG_STORE.update()，循环中读取配置请使用 CONFIG_STORE.snapshot()。
 """
 
-import win32con
+import keycodes
 
 GAME_CONFIG = {
-    "dodge_key": win32con.VK_RBUTTON,  # 默认闪避键为 右键 (0x02)
+    "dodge_key": keycodes.VK_RBUTTON,  # 默认闪避键为 右键 (0x02)
     "auto_battle_mode": 0,  # 自动战斗模式：0=循环按E键, 1=什么也不做
     "battle_rounds": 3,  # 战斗轮数
     # 新增：自动E周期与单轮战斗超时（毫秒）
     "auto_e_interval_ms": 5000,
-    "round_timeout_ms": 200000
+    "round_timeout_ms": 200000,
+    # 自动单轮超时：按历史战斗时长 p99 加余量（毫秒）设置超时，不超过 round_timeout_ms；
+    # 历史不足 round_timeout_auto_min_rounds 轮时使用 round_timeout_ms
+    "round_timeout_auto": False,
+    "round_timeout_auto_margin_ms": 30000,
+    "round_timeout_auto_min_rounds": 5,
+    # 动作序列回放：截止时间前的自旋预算（毫秒），其余时间使用 sleep
+    "sequence_spin_ms": 2,
+    # 动作序列回放：按测得的控制器延迟提前触发，以及提前量上限（毫秒）
+    "latency_compensation": True,
+    "latency_compensation_max_ms": 30,
+    # 自动战斗：多目标并发识别的线程数
+    "recognition_workers": 4,
+    # 自动战斗：自适应检测间隔上下限，以及预计结束时间前后的突发检测余量（毫秒）
+    "detect_interval_min_ms": 500,
+    "detect_interval_max_ms": 5000,
+    "detect_burst_margin_ms": 8000,
+    # 识别：画面（ROI）未变化时复用上一次识别结果；复用的最长时间（毫秒）与最多连续复用次数，超过后重新识别
+    "frame_gate": True,
+    "frame_gate_max_age_ms": 2000,
+    "frame_gate_max_skips": 10,
+    # 识别结果缓存：(节点, ROI, 画面内容) 相同时复用结果；容量（条）与过期时间（毫秒）
+    "recognition_memo_size": 256,
+    "recognition_memo_ttl_ms": 2000,
+    # 设置节点：刷新截图时可复用的最大帧龄（毫秒），连续的设置节点共享一次截图
+    "settings_frame_max_age_ms": 500
 }
\ No newline at end of file
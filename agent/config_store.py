@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+持久化、带版本号的配置存储
+
+说明:
+- CONFIG_STORE 包装 config.GAME_CONFIG (原地更新, 现有的 "from config import GAME_CONFIG" 继续可用),
+  所有写入都经 CONFIG_STORE.update(), 每次实际变化时版本号 +1
+- 持久化文件 CONFIG_STORE_FILE (./config/agent_config.json) 只保存需要覆盖默认值的项:
+  {"version": 版本号, "settings": {"sequence_spin_ms": 3, ...}}
+  写入时先写临时文件再替换 (原子写入), 文件中的未知键与类型不符的值会被忽略并告警
+- 监视线程按 WATCH_INTERVAL 轮询文件的修改时间与大小, 文件被修改后热加载到运行中的 Agent, 无需重启;
+  从文件中删除的键恢复为默认值
+- 读取方 (AutoBattle / JsonActionSequence 等) 在一次战斗 / 回放开始时取 snapshot():
+  不可变的配置快照, 同一版本号共享同一个快照对象, 循环中途的配置变化从下一次开始生效
+- Pipeline 设置节点 (setting.apply_settings) 写入的是本次会话的值, 不写回文件
+"""
+
+import json
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+
+# 导入全局配置
+from config import GAME_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 持久化文件
+CONFIG_STORE_FILE = os.path.join(".", "config", "agent_config.json")
+
+# 文件监视的轮询间隔（秒）
+WATCH_INTERVAL = 1.0
+
+
+class ConfigSnapshot(Mapping):
+    """某一版本配置的不可变快照 (只读映射, 附带版本号)"""
+
+    __slots__ = ("_values", "_version")
+
+    def __init__(self, values, version):
+        self._values = MappingProxyType(dict(values))
+        self._version = version
+
+    @property
+    def version(self):
+        return self._version
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"ConfigSnapshot(v{self._version}, {dict(self._values)})"
+
+
+def _check_value(key, value, default):
+    """按默认值的类型校验文件中的值, 不合法时抛出 ValueError"""
+    if isinstance(default, bool):
+        ok = isinstance(value, bool)
+    elif isinstance(default, int):
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    elif isinstance(default, float):
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        ok = isinstance(value, type(default))
+    if not ok:
+        raise ValueError(f"{key} 的类型应为 {type(default).__name__}: {value!r}")
+    return float(value) if isinstance(default, float) else value
+
+
+class ConfigStore:
+    """
+    配置存储 (线程安全)
+
+    Args:
+        config: 被包装的配置字典 (原地更新), 其初始内容作为默认值
+        path: 持久化文件路径, None 表示不持久化
+    """
+
+    def __init__(self, config=GAME_CONFIG, path=CONFIG_STORE_FILE):
+        self._config = config
+        self._defaults = dict(config)
+        self.path = path
+        self._lock = threading.RLock()
+        self._version = 0
+        self._snapshot = None
+        self._file_values = {}  # 上一次从文件读取 / 写入文件的设置
+        self._file_stat = None  # (mtime_ns, size), 用于判断文件是否被修改
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def get(self, key, default=None):
+        return self.snapshot().get(key, default)
+
+    def snapshot(self):
+        """当前配置的不可变快照 (按版本号缓存)"""
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != self._version:
+                self._snapshot = ConfigSnapshot(self._config, self._version)
+            return self._snapshot
+
+    def defaults(self):
+        return dict(self._defaults)
+
+    def update(self, values, persist=False):
+        """
+        写入一组配置, 有变化时版本号 +1
+
+        Args:
+            values: {键: 值}, 调用方负责校验
+            persist: 是否同时写入持久化文件
+
+        Returns:
+            dict: 实际变化的配置 {键: (旧值, 新值)}
+        """
+        with self._lock:
+            changes = self._apply(values)
+            if persist:
+                self._file_values.update(values)
+                self._save()
+        return changes
+
+    def _apply(self, values):
+        changes = {k: (self._config.get(k), v) for k, v in values.items() if self._config.get(k) != v}
+        if changes:
+            self._config.update({k: new for k, (_, new) in changes.items()})
+            self._version += 1
+        return changes
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self):
+        """
+        读取持久化文件并应用与上一次读取不同的项
+
+        Returns:
+            dict: 实际变化的配置 {键: (旧值, 新值)}; 文件损坏时返回 None (保持当前配置)
+        """
+        if self.path is None:
+            return {}
+        with self._lock:
+            stat = self._stat()
+            if stat is None:
+                data = {}
+            else:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    if not isinstance(data, dict) or not isinstance(data.get("settings", {}), dict):
+                        raise ValueError("文件格式应为 {\"version\": ..., \"settings\": {...}}")
+                except (OSError, ValueError) as e:
+                    # 编辑中途保存的半个文件等: 记下状态, 等下一次修改
+                    self._file_stat = stat
+                    logger.warning(f"[ConfigStore] 读取配置文件失败, 保持当前配置: {e}")
+                    return None
+
+            settings = {}
+            for key, value in data.get("settings", {}).items():
+                if key not in self._defaults:
+                    logger.warning(f"[ConfigStore] 忽略未知的配置项: {key}")
+                    continue
+                try:
+                    settings[key] = _check_value(key, value, self._defaults[key])
+                except ValueError as e:
+                    logger.warning(f"[ConfigStore] 忽略配置项: {e}")
+
+            values = {}
+            for key in set(self._file_values) | set(settings):
+                new = settings.get(key, self._defaults[key])
+                if key not in self._file_values or self._file_values[key] != new:
+                    values[key] = new
+            self._file_values = settings
+            self._file_stat = stat
+            file_version = data.get("version")
+            if isinstance(file_version, int) and file_version > self._version:
+                # 版本号跨会话单调递增
+                self._version = file_version
+            return self._apply(values)
+
+    def _save(self):
+        """原子写入持久化文件 (先写临时文件再替换)"""
+        if self.path is None:
+            return
+        data = {"version": self._version, "settings": dict(sorted(self._file_values.items()))}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            # 自己写入的文件不触发热加载
+            self._file_stat = self._stat()
+        except OSError as e:
+            logger.warning(f"[ConfigStore] 保存配置文件失败: {e}")
+
+    def check(self):
+        """文件被修改时热加载; 返回变化 (未修改时为空)"""
+        with self._lock:
+            if self._stat() == self._file_stat:
+                return {}
+        changes = self.load()
+        if changes:
+            logger.info(f"[ConfigStore] 配置已热加载 (v{self.version}): "
+                        + ", ".join(f"{k} {old} -> {new}" for k, (old, new) in changes.items()))
+        return changes or {}
+
+    def start_watching(self, interval=WATCH_INTERVAL):
+        """启动文件监视线程 (重复调用无效)"""
+        if self.path is None or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="ConfigWatcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"[ConfigStore] 热加载异常: {e}")
+
+    def log_summary(self):
+        """输出文件中覆盖默认值的配置"""
+        with self._lock:
+            overrides = dict(self._file_values)
+            version = self._version
+        if overrides:
+            logger.info(f"[ConfigStore] 已加载 {self.path} (v{version}): "
+                        + ", ".join(f"{k}={v}" for k, v in overrides.items()))
+        else:
+            logger.info(f"[ConfigStore] 未找到覆盖配置, 使用默认值 ({self.path})")
+
+
+# 全局配置存储
+CONFIG_STORE = ConfigStore()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+画面变化门控
+
+说明:
+- 对每个节点的识别区域 (ROI) 计算廉价的感知签名: 灰度化后按 SIGNATURE_GRID 网格取块均值, 再量化
+- 签名与该节点上一次实际识别时的签名一致时, 跳过识别并复用上一次的结果;
+  结果超过 frame_gate_max_age_ms 或已连续复用 frame_gate_max_skips 次后重新识别,
+  避免签名察觉不到的细微变化 (量化步长以内) 使旧结果一直被复用
+- ROI 通过 context.get_node_data 读取并缓存, 读取不到时使用整帧
+- FRAME_GATE.counters() 提供各节点的 识别/跳过 次数
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from config_store import CONFIG_STORE
+
+logger = logging.getLogger(__name__)
+
+# 签名网格 (行, 列)
+SIGNATURE_GRID = (16, 16)
+
+# 计算签名时每块每个方向的抽样像素数
+SAMPLES_PER_BLOCK = 8
+
+# 量化步长: 块均值差异小于该值 (0~255 灰度) 视为未变化
+QUANT_STEP = 8
+
+DEFAULT_MAX_AGE_MS = 2000
+DEFAULT_MAX_SKIPS = 10
+
+
+def frame_signature(image, roi=None):
+    """
+    计算图像 (或 ROI) 的感知签名
+
+    Args:
+        image: HxW 或 HxWxC 的 ndarray (MaaFramework cached_image 为 BGR)
+        roi: [x, y, w, h], None 表示整帧
+
+    Returns:
+        bytes
+    """
+    if roi is not None:
+        x, y, w, h = roi
+        height, width = image.shape[:2]
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(width, x + w), min(height, y + h)
+        image = image[y0:y1, x0:x1]
+    height, width = image.shape[:2]
+    rows, cols = min(SIGNATURE_GRID[0], height), min(SIGNATURE_GRID[1], width)
+    if rows == 0 or cols == 0:
+        return b""
+    # 大区域先按步长抽样 (每块每个方向约 SAMPLES_PER_BLOCK 个像素), 再灰度化
+    sy = max(1, height // (rows * SAMPLES_PER_BLOCK))
+    sx = max(1, width // (cols * SAMPLES_PER_BLOCK))
+    image = image[::sy, ::sx]
+    if image.ndim == 3:
+        image = image.mean(axis=2)
+    height, width = image.shape[:2]
+    # 裁掉除不尽的边缘后按块取均值
+    bh, bw = height // rows, width // cols
+    blocks = image[:rows * bh, :cols * bw].reshape(rows, bh, cols, bw).mean(axis=(1, 3))
+    quantized = (blocks // QUANT_STEP).astype(np.uint8)
+    return bytes((rows, cols)) + quantized.tobytes()
+
+
+def node_roi(node_data):
+    """从节点定义中取出固定 ROI [x, y, w, h] (兼容 Pipeline V1 / V2 格式), 没有时返回 None"""
+    if not isinstance(node_data, dict):
+        return None
+    roi = node_data.get("roi")
+    if roi is None:
+        recognition = node_data.get("recognition")
+        if isinstance(recognition, dict):
+            roi = (recognition.get("param") or {}).get("roi")
+    if isinstance(roi, (list, tuple)) and len(roi) == 4 and all(isinstance(v, int) for v in roi):
+        return list(roi)
+    return None
+
+
+class FrameGate:
+    """
+    按节点缓存最近一次识别的 (签名, 结果) (线程安全)
+
+    使用方式:
+        detail, evaluated = FRAME_GATE.recognize(context, "common_again", image)
+
+    Args:
+        max_age / max_skips: 结果可复用的最长时间 (秒) 与最多连续复用次数,
+            默认读取配置 frame_gate_max_age_ms / frame_gate_max_skips
+        clock: 单调时钟函数
+    """
+
+    def __init__(self, max_age=None, max_skips=None, clock=time.monotonic):
+        self._max_age = max_age
+        self._max_skips = max_skips
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._last = {}  # 节点名 -> [签名, 识别结果, 识别时刻, 已连续复用次数]
+        self._rois = {}  # 节点名 -> ROI 或 None
+        self._evaluated = {}  # 节点名 -> 实际识别次数
+        self._skipped = {}  # 节点名 -> 跳过次数
+
+    def limits(self, config=None):
+        """(最长复用时间 秒, 最多连续复用次数); config 为配置快照, 默认读取 CONFIG_STORE"""
+        source = config if config is not None else CONFIG_STORE
+        max_age = self._max_age
+        if max_age is None:
+            max_age = source.get("frame_gate_max_age_ms", DEFAULT_MAX_AGE_MS) / 1000.0
+        max_skips = self._max_skips
+        if max_skips is None:
+            max_skips = int(source.get("frame_gate_max_skips", DEFAULT_MAX_SKIPS))
+        return max_age, max_skips
+
+    def roi(self, context, node):
+        with self._lock:
+            if node in self._rois:
+                return self._rois[node]
+        roi = None
+        get_node_data = getattr(context, "get_node_data", None)
+        if get_node_data is not None:
+            try:
+                roi = node_roi(get_node_data(node))
+            except Exception as e:
+                logger.debug(f"[FrameGate] 读取节点 '{node}' 定义失败: {e}")
+        with self._lock:
+            self._rois[node] = roi
+        return roi
+
+    def recognize(self, context, node, image, run=None, config=None):
+        """
+        识别节点; 画面 (ROI) 与上一次识别时相同则直接返回上一次的结果
+        (结果过期或连续复用次数达到上限时重新识别)
+
+        Args:
+            run: 实际执行识别的函数 run(context, node, image), 默认 context.run_recognition
+            config: 配置快照 (复用上限), 默认读取 CONFIG_STORE
+
+        Returns:
+            (识别结果, 是否实际执行了识别)
+        """
+        if run is None:
+            run = lambda ctx, n, img: ctx.run_recognition(n, img)
+        if image is None:
+            return run(context, node, image), True
+        signature = frame_signature(image, self.roi(context, node))
+        max_age, max_skips = self.limits(config)
+        with self._lock:
+            last = self._last.get(node)
+            if (last is not None and last[0] == signature and last[3] < max_skips
+                    and self.clock() - last[2] <= max_age):
+                last[3] += 1
+                self._skipped[node] = self._skipped.get(node, 0) + 1
+                return last[1], False
+
+        detail = run(context, node, image)
+        with self._lock:
+            self._last[node] = [signature, detail, self.clock(), 0]
+            self._evaluated[node] = self._evaluated.get(node, 0) + 1
+        return detail, True
+
+    def invalidate(self, node=None):
+        """丢弃缓存的结果 (节点定义被覆盖或需要强制重新识别时)"""
+        with self._lock:
+            if node is None:
+                self._last.clear()
+                self._rois.clear()
+            else:
+                self._last.pop(node, None)
+                self._rois.pop(node, None)
+
+    def counters(self):
+        """{节点名: {"evaluated": 识别次数, "skipped": 跳过次数}}"""
+        with self._lock:
+            nodes = set(self._evaluated) | set(self._skipped)
+            return {n: {"evaluated": self._evaluated.get(n, 0), "skipped": self._skipped.get(n, 0)}
+                    for n in sorted(nodes)}
+
+
+# 全局画面门控
+FRAME_GATE = FrameGate()
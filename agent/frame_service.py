@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+共享截图服务
+
+说明:
+- 最近的截图保存在小型环形缓冲区中 (按需截图, 由第一个需要新帧的调用者执行 post_screencap)
+- 调用者通过 max_age_ms 声明可接受的最大帧龄: 缓冲区中的最新帧足够新时直接复用, 不再截图
+- 并发请求合并: 正在进行的截图足够新时, 其他调用者等待其完成并共享结果, 而不是各自排队截图
+- 帧时间取截图提交时刻 (画面内容不会早于该时刻), 帧龄因此只会被高估
+- 连续执行的设置节点 (SetDodgeKey / SetBattleRounds 等) 共享同一次截图, 不再逐个等待截图
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+# 环形缓冲区保留的帧数
+FRAME_BUFFER_SIZE = 4
+
+
+class Frame:
+    """一帧截图 (captured_at 为截图提交时刻, seq 为服务内递增序号)"""
+
+    __slots__ = ("image", "captured_at", "seq")
+
+    def __init__(self, image, captured_at, seq):
+        self.image = image
+        self.captured_at = captured_at
+        self.seq = seq
+
+    def age(self, now):
+        return now - self.captured_at
+
+
+class FrameService:
+    """
+    带帧龄要求的截图服务 (线程安全)
+
+    使用方式:
+        frame = FRAME_SERVICE.get(context.tasker.controller, max_age_ms=500)
+        if frame is not None:
+            image = frame.image
+
+    Args:
+        capacity: 环形缓冲区大小
+        clock: 单调时钟函数
+    """
+
+    def __init__(self, capacity=FRAME_BUFFER_SIZE, clock=time.perf_counter):
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._frames = deque(maxlen=capacity)
+        self._controller = None
+        self._inflight = None  # 正在进行的截图的提交时刻
+        self._seq = 0
+        self._captures = 0
+        self._reused = 0
+        self._coalesced = 0
+
+    def get(self, controller, max_age_ms=0):
+        """
+        获取不早于 max_age_ms 毫秒前的截图
+
+        max_age_ms 为 0 时总是使用本次请求之后提交的截图 (可与同时发起的请求合并)
+
+        Returns:
+            Frame, 截图失败时返回 None
+        """
+        request = self.clock()
+        oldest = request - max(0, max_age_ms) / 1000.0
+        with self._cond:
+            if controller is not self._controller:
+                # 换了控制器 (重新连接), 旧帧作废
+                self._frames.clear()
+                self._controller = controller
+            waited = False
+            while True:
+                latest = self._frames[-1] if self._frames else None
+                if latest is not None and latest.captured_at >= oldest:
+                    if waited:
+                        self._coalesced += 1
+                    else:
+                        self._reused += 1
+                    return latest
+                if self._inflight is None:
+                    break
+                # 等待正在进行的截图; 它足够新则共享结果, 否则在其后自行截图
+                waited = waited or self._inflight >= oldest
+                self._cond.wait()
+            started = self._inflight = self.clock()
+
+        frame = None
+        succeeded = False
+        try:
+            with TRACER.span("screencap"):
+                job = controller.post_screencap()
+                job.wait()
+            succeeded = getattr(job, "succeeded", True)
+            if not succeeded:
+                logger.warning("[FrameService] 截图失败")
+        finally:
+            with self._cond:
+                if succeeded:
+                    self._seq += 1
+                    self._captures += 1
+                    frame = Frame(controller.cached_image, started, self._seq)
+                    self._frames.append(frame)
+                self._inflight = None
+                self._cond.notify_all()
+        return frame
+
+    def latest(self):
+        """缓冲区中的最新帧 (不截图), 没有时返回 None"""
+        with self._cond:
+            return self._frames[-1] if self._frames else None
+
+    def invalidate(self):
+        """丢弃缓冲区中的全部帧, 下一次请求必定重新截图"""
+        with self._cond:
+            self._frames.clear()
+
+    def counters(self):
+        """{"captures": 实际截图次数, "reused": 直接复用次数, "coalesced": 合并到进行中截图的次数}"""
+        with self._cond:
+            return {"captures": self._captures, "reused": self._reused, "coalesced": self._coalesced}
+
+
+# 全局截图服务
+FRAME_SERVICE = FrameService()
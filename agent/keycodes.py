@@ -0,0 +1,33 @@
+"""
+平台无关的虚拟键码表
+
+取值与 Windows 虚拟键码 (win32con.VK_*) 一致, 但不依赖 pywin32,
+使 Agent 可以在 Linux 构建/基准测试机上导入和运行。
+"""
+
+VK_LBUTTON = 0x01
+VK_RBUTTON = 0x02
+VK_MBUTTON = 0x04
+VK_XBUTTON1 = 0x05
+VK_XBUTTON2 = 0x06
+VK_BACK = 0x08
+VK_TAB = 0x09
+VK_RETURN = 0x0D
+VK_SHIFT = 0x10
+VK_CONTROL = 0x11
+VK_MENU = 0x12
+VK_ESCAPE = 0x1B
+VK_SPACE = 0x20
+VK_LEFT = 0x25
+VK_UP = 0x26
+VK_RIGHT = 0x27
+VK_DOWN = 0x28
+VK_LSHIFT = 0xA0
+VK_RSHIFT = 0xA1
+VK_LCONTROL = 0xA2
+VK_RCONTROL = 0xA3
+VK_LMENU = 0xA4
+VK_RMENU = 0xA5
+
+# 字母与数字键的虚拟键码即其大写 ASCII 码
+VK_E = ord('E')
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+异步日志: 队列 + 后台写入线程, 滚动压缩与保留策略
+
+说明:
+- 各线程的 logger 调用只把记录放入有界队列 (LogQueueHandler), 文件与控制台 I/O 由
+  QueueListener 的后台线程完成, 不再阻塞按键计时 / 检测循环所在的线程
+- 队列满时: DEBUG / INFO 记录直接丢弃并计数; WARNING 及以上最多等待 BLOCK_TIMEOUT 秒再丢弃;
+  之后第一条成功入队的记录前补一条 "丢弃了 N 条日志" 的警告
+- CompressingFileHandler: 文件超过 max_bytes 或打开超过 rotate_seconds 时滚动,
+  滚动出的文件 gzip 压缩为 <文件名>.1.gz, .2.gz ... (最多 backup_count 个)
+- prune_logs: 日志目录的保留策略, 按数量与天数删除旧的 agent_*.log* (含以前每次启动的日志文件),
+  以前未压缩的日志文件顺便压缩; 其他文件类型 (滚动出的记录文件 / 跟踪文件) 通过 pattern 指定
+- append_line: 记录文件 (sequence_timing.jsonl / battle_rounds.jsonl) 的追加写入,
+  超过大小上限时与日志文件一样滚动为 <文件名>.1.gz, .2.gz ...
+"""
+
+import glob
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 队列容量 (条)
+DEFAULT_QUEUE_SIZE = 10000
+
+# WARNING 及以上的记录在队列满时最多等待的秒数
+BLOCK_TIMEOUT = 0.5
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    有界队列的 QueueHandler: 不阻塞调用线程, 统计丢弃数与队列深度 (线程安全)
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self._lock = threading.Lock()
+        self._enqueued = 0
+        self._dropped = 0
+        self._unreported = 0
+        self._max_depth = 0
+
+    def enqueue(self, record):
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=BLOCK_TIMEOUT)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+                self._unreported += 1
+            return
+
+        with self._lock:
+            self._enqueued += 1
+            depth = self.queue.qsize()
+            if depth > self._max_depth:
+                self._max_depth = depth
+            dropped, self._unreported = self._unreported, 0
+        if dropped:
+            notice = logging.LogRecord(logger.name, logging.WARNING, __file__, 0,
+                                       f"[Logging] 日志队列已满, 丢弃了 {dropped} 条日志", None, None)
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                with self._lock:
+                    self._unreported += dropped
+
+    def counters(self):
+        """{"enqueued", "dropped", "depth", "max_depth"}"""
+        with self._lock:
+            return {"enqueued": self._enqueued, "dropped": self._dropped,
+                    "depth": self.queue.qsize(), "max_depth": self._max_depth}
+
+
+def _gzip_rotator(source, dest):
+    """滚动时把旧文件压缩为 dest (.gz) 并删除原文件"""
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def rotate_file(path, backup_count):
+    """把 path 滚动压缩为 path.1.gz, 已有的 .1.gz ~ .(N-1).gz 依次后移, 最多保留 backup_count 个"""
+    if backup_count <= 0:
+        os.remove(path)
+        return
+    for i in range(backup_count - 1, 0, -1):
+        source = f"{path}.{i}.gz"
+        if os.path.exists(source):
+            os.replace(source, f"{path}.{i + 1}.gz")
+    _gzip_rotator(path, f"{path}.1.gz")
+
+
+def append_line(path, line, max_bytes=0, backup_count=0):
+    """
+    向记录文件追加一行; 追加后会超过 max_bytes 时先滚动 (0 表示不限制)
+
+    非线程安全, 由调用方加锁
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = line + "\n"
+    if max_bytes > 0:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if size and size + len(data.encode("utf-8")) > max_bytes:
+            rotate_file(path, backup_count)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(data)
+
+
+class CompressingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    按大小或时间滚动并 gzip 压缩的文件处理器
+
+    Args:
+        filename: 日志文件路径
+        max_bytes: 单个文件的大小上限, 0 表示不按大小滚动
+        rotate_seconds: 单个文件的时间跨度上限, 0 表示不按时间滚动
+        backup_count: 保留的滚动文件数
+        on_rollover: 可选的回调, 每次滚动后调用 (例如执行保留策略)
+    """
+
+    def __init__(self, filename, max_bytes=0, rotate_seconds=0, backup_count=0, encoding="utf-8",
+                 on_rollover=None, clock=time.time):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.rotate_seconds = rotate_seconds
+        self.on_rollover = on_rollover
+        self.clock = clock
+        self.namer = lambda name: name + ".gz"
+        self.rotator = _gzip_rotator
+        self._opened_at = clock()
+
+    def shouldRollover(self, record):
+        if self.rotate_seconds > 0 and self.clock() - self._opened_at >= self.rotate_seconds:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._opened_at = self.clock()
+        if self.on_rollover is not None:
+            try:
+                self.on_rollover()
+            except Exception as e:
+                # 运行在监听线程中, 不再经日志队列输出
+                print(f"[Logging] 滚动后处理失败: {e}", file=sys.stderr)
+
+
+def prune_logs(log_dir, pattern="agent_*.log*", keep_files=0, keep_days=0, active=None, now=None):
+    """
+    日志目录的保留策略
+
+    - 未压缩的旧日志文件 (非 active) 压缩为 .gz
+    - 超过 keep_days 天的文件删除; 其余按修改时间保留最新的 keep_files 个 (0 表示不限制)
+
+    Returns:
+        (压缩的文件数, 删除的文件数)
+    """
+    now = time.time() if now is None else now
+    active = os.path.abspath(active) if active else None
+    compressed = removed = 0
+    files = []
+    for path in glob.glob(os.path.join(log_dir, pattern)):
+        if active and os.path.abspath(path) == active:
+            continue
+        if not path.endswith(".gz") and path.endswith(".log"):
+            try:
+                mtime = os.path.getmtime(path)
+                _gzip_rotator(path, path + ".gz")
+                path += ".gz"
+                # 保留原修改时间, 按天数保留时仍以原文件为准
+                os.utime(path, (mtime, mtime))
+                compressed += 1
+            except OSError:
+                continue
+        try:
+            files.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+
+    files.sort(reverse=True)
+    for i, (mtime, path) in enumerate(files):
+        expired = keep_days > 0 and now - mtime > keep_days * 86400
+        if expired or (keep_files > 0 and i >= keep_files):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return compressed, removed
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """队列满时停止信号同样等待入队, 保证 stop() 写完剩余记录后返回"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class AsyncLogging:
+    """
+    已启动的异步日志: 队列处理器 + 后台监听线程
+
+    使用方式:
+        handle = AsyncLogging(root_logger, [file_handler, console_handler])
+        handle.start()
+        ...
+        handle.stop()   # 写完队列中剩余的记录
+    """
+
+    def __init__(self, root_logger, handlers, queue_size=DEFAULT_QUEUE_SIZE):
+        self.root_logger = root_logger
+        self.handlers = handlers
+        self.queue_handler = LogQueueHandler(queue.Queue(queue_size))
+        self.listener = _QueueListener(self.queue_handler.queue, *handlers, respect_handler_level=True)
+        self._started = False
+
+    def start(self):
+        self.root_logger.addHandler(self.queue_handler)
+        self.listener.start()
+        self._started = True
+
+    def stop(self):
+        if not self._started:
+            return
+        self._started = False
+        self.root_logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+    def counters(self):
+        return self.queue_handler.counters()
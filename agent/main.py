@@ -1,6 +1,13 @@
 import sys
+import time
+
+# 启动计时起点 (--profile-startup)
+_START = time.perf_counter()
+
 import logging
 import os
+import threading
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
 import locale
@@ -13,22 +20,59 @@ if str(script_dir) not in sys.path:
 
 # 设置 GBK 编码（在所有导入之前）
 # set_utf8_encoding()
-    
-print(f"脚本目录: {script_dir}")
-print(f"工作目录: {os.getcwd()}")
-print(f"Python 路径: {sys.path[:3]}")  # 只打印前3个
 
-from maa.agent.agent_server import AgentServer
-from maa.toolkit import Toolkit
+# 只依赖标准库; maa 与各 Agent 模块在 main() 中按阶段导入 (--profile-startup 可分别计时)
+from startup_profile import StartupProfiler
+
+# 启动选项
+PROFILE_STARTUP = "--profile-startup"  # 输出启动阶段与导入耗时, 可写作 --profile-startup=<json 路径>
+DRY_RUN = "--dry-run"  # 完成启动准备后不启动 AgentServer 直接退出 (用于启动基准测试)
 
-# 导入全局配置
-from config import GAME_CONFIG
+# --profile-startup 未指定路径时的报告文件
+DEFAULT_PROFILE_FILE = os.path.join(".", "logs_agent", "startup_profile.json")
 
-# 重要：必须在 AgentServer.start_up() 之前导入，以便装饰器注册自定义 Action 和 Recognition
-import common
-import setting
-from movement_action import RunWithShift, LongPressKey, PressMultipleKeys, RunWithJump, JsonActionSequence
-import tools
+
+def parse_args(argv):
+    """
+    拆分启动选项与位置参数
+
+    Returns:
+        (socket_id 或 None, 启动分析报告路径或 None, 是否 dry-run)
+    """
+    profile_path = None
+    dry_run = False
+    positional = []
+    for arg in argv:
+        if arg == PROFILE_STARTUP:
+            profile_path = DEFAULT_PROFILE_FILE
+        elif arg.startswith(PROFILE_STARTUP + "="):
+            profile_path = arg.split("=", 1)[1] or DEFAULT_PROFILE_FILE
+        elif arg == DRY_RUN:
+            dry_run = True
+        else:
+            positional.append(arg)
+    return (positional[-1] if positional else None), profile_path, dry_run
+
+
+def warm_up(logger):
+    """AgentServer 就绪后在后台导入各动作模块, 并建立动作序列索引"""
+    import action_registry
+    try:
+        begin = time.perf_counter()
+        timings = action_registry.warm_up()
+
+        # 建立动作序列索引并预编译，避免首次执行时的加载开销
+        from movement_action.sequence_cache import SEQUENCE_CACHE
+        SEQUENCE_CACHE.build_index()
+
+        # 读取跨会话累积的战斗时长统计 (自动单轮超时与检测节奏)
+        from round_stats import ROUND_STATS
+        ROUND_STATS.log_summary()
+
+        logger.info(f"[Startup] 后台预热完成 ({(time.perf_counter() - begin) * 1000:.0f}ms): "
+                    + ", ".join(f"{m} {t * 1000:.0f}ms" for m, t in timings.items()))
+    except Exception as e:
+        logger.error(f"[Startup] 后台预热失败: {e}", exc_info=True)
 
 
 def is_admin():
@@ -78,8 +122,11 @@ def run_as_admin():
 
 
 def main():
-    # 检查管理员权限
-    if not is_admin():
+    socket_id, profile_path, dry_run = parse_args(sys.argv[1:])
+
+    # 检查管理员权限 (仅 Windows, PostMessage 输入需要; dry-run 不发送输入, 跳过)
+    check_admin = sys.platform == "win32" and not dry_run
+    if check_admin and not is_admin():
         print("=" * 60)
         print("[!] 检测到未以管理员权限运行")
         print("PostMessage 输入需要管理员权限才能向游戏窗口发送消息")
@@ -100,33 +147,93 @@ def main():
             input("按 Enter 键退出...")
             sys.exit(1)
     
+    if socket_id is None and not dry_run:
+        print("Usage: python main.py [--profile-startup[=<json>]] [--dry-run] <socket_id>")
+        print("socket_id is provided by AgentIdentifier.")
+        sys.exit(1)
+
+    profiler = StartupProfiler(_START) if profile_path else None
+    if profiler is not None:
+        profiler.install()
+
+    def phase(name):
+        return profiler.phase(name) if profiler is not None else nullcontext()
+
+    with phase("import maa"):
+        from maa.agent.agent_server import AgentServer
+        from maa.toolkit import Toolkit
+
+    with phase("import agent"):
+        import tools
+        from config_store import CONFIG_STORE
+        from tracing import TRACER
+        import action_registry
+
     # 初始化日志系统
-    log_file = tools.setup_logging()
+    with phase("setup_logging"):
+        log_file = tools.setup_logging()
     logger = logging.getLogger(__name__)
     
     logger.info("=" * 60)
     logger.info("MdaDuetAssistant Agent 启动")
     logger.info("=" * 60)
-    logger.info("[OK] 以管理员权限运行")
+    if check_admin:
+        logger.info("[OK] 以管理员权限运行")
     logger.info(f"脚本目录: {script_dir}")
     logger.info(f"工作目录: {os.getcwd()}")
+    logger.debug(f"Python 路径: {sys.path[:3]}")  # 只打印前3个
+
+    # 设置环境变量 MAD_AGENT_TRACE 时记录 trace-event 跟踪 (chrome://tracing / Perfetto)
+    TRACER.enable_from_env()
     
+    with phase("Toolkit.init_option"):
+        Toolkit.init_option("./")
 
-    Toolkit.init_option("./")
+    # 读取持久化配置 (./config/agent_config.json), 运行中修改文件会被热加载
+    with phase("config"):
+        CONFIG_STORE.load()
+        CONFIG_STORE.log_summary()
+        CONFIG_STORE.start_watching()
+
+    # 重要：必须在 AgentServer.start_up() 之前注册自定义 Action;
+    # 注册的是轻量代理, 各动作模块在就绪后后台预热或首次使用时导入
+    with phase("register actions"):
+        count = action_registry.install_lazy_actions()
+    logger.info(f"已注册 {count} 个自定义动作 (延迟加载)")
+
+    def finish_profile():
+        if profiler is None:
+            return
+        profiler.uninstall()
+        profiler.report(logger.info)
+        try:
+            profiler.save(profile_path)
+            logger.info(f"[StartupProfile] 报告已写入 {profile_path}")
+        except OSError as e:
+            logger.warning(f"[StartupProfile] 写入报告失败: {e}")
+
+    if dry_run:
+        # 基准测试: 不启动 AgentServer, 就绪之后同步预热并单独计时
+        if profiler is not None:
+            profiler.mark_ready()
+        with phase("warm_up (dry-run)"):
+            warm_up(logger)
+        finish_profile()
+        CONFIG_STORE.stop_watching()
+        tools.shutdown_logging()
+        return
 
-    if len(sys.argv) < 2:
-        logger.error("缺少 socket_id 参数")
-        print("Usage: python main.py <socket_id>")
-        print("socket_id is provided by AgentIdentifier.")
-        sys.exit(1)
-        
-    socket_id = sys.argv[-1]
     logger.info(f"Socket ID: {socket_id}")
 
     try:
         logger.info("启动 AgentServer...")
-        AgentServer.start_up(socket_id)
+        with phase("AgentServer.start_up"):
+            AgentServer.start_up(socket_id)
         logger.info("AgentServer 已启动，等待任务...")
+        if profiler is not None:
+            profiler.mark_ready()
+        finish_profile()
+        threading.Thread(target=warm_up, args=(logger,), name="WarmUp", daemon=True).start()
         AgentServer.join()
         logger.info("AgentServer 正常退出")
     except Exception as e:
@@ -135,9 +242,17 @@ def main():
     finally:
         logger.info("关闭 AgentServer...")
         AgentServer.shut_down()
+        CONFIG_STORE.stop_watching()
+        counters = tools.logging_counters()
+        if counters:
+            logger.info(f"[Logging] 日志队列: 入队 {counters['enqueued']} 条, 丢弃 {counters['dropped']} 条, "
+                        f"最大深度 {counters['max_depth']}")
         logger.info("=" * 60)
         logger.info("MdaDuetAssistant Agent 已退出")
         logger.info("=" * 60)
+        # 写完跟踪文件与队列中剩余的日志
+        TRACER.disable()
+        tools.shutdown_logging()
         
         # 还原原始编码
         # restore_original_encoding()
@@ -3,15 +3,31 @@ PostMessage 自定义动作模块
 
 说明: 旧版的 PostMessageInputHelper 已移除，
 当前仅导出使用 Maa 控制器 API 的自定义动作。
+
+子模块 (actions / action_sequence) 在首次访问对应名称时才导入,
+导入包本身或其中一个子模块不会连带导入另一个 (见 action_registry.ACTION_MODULES)。
 """
 
-from .actions import RunWithShift, LongPressKey, PressMultipleKeys, RunWithJump
-from .action_sequence import JsonActionSequence
+import importlib
+
+# 导出名 -> 定义它的子模块
+_EXPORTS = {
+    'RunWithShift': '.actions',
+    'LongPressKey': '.actions',
+    'PressMultipleKeys': '.actions',
+    'RunWithJump': '.actions',
+    'JsonActionSequence': '.action_sequence',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
+
 
-__all__ = [
-    'RunWithShift',
-    'LongPressKey',
-    'PressMultipleKeys',
-    'RunWithJump',
-    'JsonActionSequence',
-]
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
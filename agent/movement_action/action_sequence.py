@@ -5,57 +5,50 @@
 - 移除窗口句柄查找与 PostMessageInputHelper 依赖
 - 使用 context.tasker.controller.post_key_down/post_key_up 执行动作
 - 仍支持从 JSON 文件加载序列, 并保留对“闪避键(shift)”到全局配置的映射
+- 序列经 SEQUENCE_CACHE 预编译为 (time, type, vk) 时间线, 执行前不再解析/转换
+- 参数可以是 JSON 文件、紧凑二进制 .seqb 文件或序列库 (library.madlib) 中的序列名
+- 由 DeadlineScheduler 按绝对截止时间回放, 并记录每个事件的迟到时间
+- 按键经 KeyDispatcher 非阻塞提交, Job 完成情况在回放结束后统一检查
+- 每次回放的逐事件时序写入 TIMING_RECORDER (logs_agent/sequence_timing.jsonl)
+- 回放期间响应任务停止, 停止或异常时松开所有仍按住的按键
+- 持续测量控制器往返延迟 (LATENCY_ESTIMATOR), 回放时将后续事件按预测延迟提前 (有上限)
+- 参数可以是 JSON 对象: {"file": 序列名, "time_scale": 时间缩放, "compensate": 是否补偿}
+- 组合模式: {"sequence": [...]} 或序列名数组, 多个序列预编译为一条时间线, 由一次调度连续回放
+- 路径点校验: 回放同时在后台按路径点时刻截图识别, 未命中时提前中止或转入纠正序列
 """
 
 import json
 import logging
 import time
 import os
+from functools import partial
 from maa.custom_action import CustomAction
 from maa.context import Context
-from maa.agent.agent_server import AgentServer
-import win32con
+from action_registry import custom_action
+import keycodes
 import sys
 
 # 导入全局配置
-from config import GAME_CONFIG
+from config_store import CONFIG_STORE
+from cancellation import CancelToken
+from tracing import trace_action
+
+from .sequence_cache import SEQUENCE_CACHE, EVENT_NAMES
+from .scheduler import DeadlineScheduler
+from .dispatch import KeyDispatcher
+from .telemetry import PlaybackTiming, TIMING_RECORDER, OUTCOME_COMPLETED, OUTCOME_STOPPED, OUTCOME_ERROR
+from .latency import LATENCY_ESTIMATOR
+from .waypoints import (
+    WaypointMonitor, parse_waypoints, ON_MISS_POLICIES, ON_MISS_ABORT, ON_MISS_CONTINUE, ON_MISS_CORRECT,
+)
 
 logger = logging.getLogger(__name__)
 
 # 本文件不再使用 PostMessageInputHelper
 
 
-########################
-# 键名/方向 -> VK 辅助
-########################
-
-def _char_to_vk(ch: str) -> int:
-    if len(ch) != 1:
-        raise ValueError(f"char 必须是单个字符: {ch}")
-    return ord(ch.upper())
-
-def _name_to_vk(name: str, dodge_vk: int) -> int:
-    n = name.lower()
-    special = {
-        "shift": dodge_vk,  # shift 按 JSON 语义映射为配置的闪避键
-        "ctrl": win32con.VK_CONTROL,
-        "alt": win32con.VK_MENU,
-        "space": win32con.VK_SPACE,
-        "enter": win32con.VK_RETURN,
-        "esc": win32con.VK_ESCAPE,
-        "tab": win32con.VK_TAB,
-        "up": win32con.VK_UP,
-        "down": win32con.VK_DOWN,
-        "left": win32con.VK_LEFT,
-        "right": win32con.VK_RIGHT,
-    }
-    if n in special:
-        return special[n]
-    if len(name) == 1:
-        return _char_to_vk(name)
-    raise ValueError(f"不支持的按键: {name}")
-
-@AgentServer.custom_action("JsonActionSequence")
+@custom_action("JsonActionSequence")
+@trace_action
 class JsonActionSequence(CustomAction):
     """
     从JSON文件加载动作序列
@@ -73,8 +66,50 @@ class JsonActionSequence(CustomAction):
         "custom_action_param": "JJCoin_map2_1aend.json",
         "next": ["JJcoin_finish"]
     }
+    
+    对象参数 (整体加速 10%, 并关闭延迟补偿):
+        "custom_action_param": {"file": "jj_60_part1_1", "time_scale": 0.9, "compensate": false}
+    
+    time_scale 为时间戳缩放系数 (所有事件时间乘以该值, <1 为加速), 默认 1.0;
+    compensate 默认 true, 受 GAME_CONFIG["latency_compensation"] 总开关控制
+    
+    组合模式 (多个序列拼接为一条时间线, 中间不经过 Pipeline 节点切换):
+        "custom_action_param": {
+            "sequence": ["jj_60_part1_1", {"file": "jj_60_part2_1", "repeat": 2, "gap": 0.3}],
+            "gap": 0.0
+        }
+    也可以直接写为序列名数组: ["jj_60_part1_1", "jj_60_part2_1"]
+    
+    每一部分在前一部分的 total_time + gap 秒后开始; 顶层 gap 为各部分的默认间隔 (默认 0),
+    repeat 为该部分连续播放次数 (默认 1)。拼接处按键状态保持, 仅在全部播放结束时松开。
+    
+    路径点校验 (未命中时松开按键并执行纠正序列):
+        "custom_action_param": {
+            "file": "jj_60_part1_1",
+            "waypoints": [{"time": 4.5, "node": "JJcoin_wp_bridge"}],
+            "on_miss": "correct",
+            "correction": "jj_60_part1_1_fix"
+        }
+    
+    waypoints 未给出时使用序列 JSON 中的 "waypoints"; on_miss 可为
+    abort (默认, 立即中止并返回失败) / continue (仅记录) / correct (中止后回放 correction)
     """
     
+    def __init__(self, clock=time.perf_counter, sleep=None, spin_ms=None, recorder=None, estimator=None):
+        """
+        Args:
+            clock / sleep: 回放时钟与睡眠函数, 基准测试可替换为虚拟时钟
+            spin_ms: 调度器自旋预算, 默认读取 GAME_CONFIG["sequence_spin_ms"]
+            recorder: 时序记录器, 默认 TIMING_RECORDER
+            estimator: 控制器延迟估计器, 默认 LATENCY_ESTIMATOR
+        """
+        super().__init__()
+        self.clock = clock
+        self.sleep = sleep
+        self.spin_ms = spin_ms
+        self.recorder = recorder or TIMING_RECORDER
+        self.estimator = estimator or LATENCY_ESTIMATOR
+    
     def run(
         self,
         context: Context,
@@ -122,50 +157,49 @@ class JsonActionSequence(CustomAction):
                 logger.info(f"[JsonActionSequence] 可用的属性: {[attr for attr in dir(argv) if not attr.startswith('_')]}")
                 return False
             
-            # 清理文件名：去除多余的引号
-            json_file = self._clean_filename(json_file)
-            logger.info(f"[JsonActionSequence] 清理后的文件名: {json_file}")
-            
-            logger.info(f"[JsonActionSequence] 从文件加载动作序列: {json_file}")
-            
-            # 构建完整的JSON文件路径
-            json_file_path = self._get_json_file_path(json_file)
-            if not json_file_path:
-                logger.error(f"[JsonActionSequence] 无法找到JSON文件: {json_file}")
-                return False
-            
-            # 加载JSON文件
+            # 清理文件名：去除多余的引号; 对象参数解析出各部分与回放选项
             try:
-                with open(json_file_path, 'r', encoding='utf-8') as f:
-                    sequence_data = json.load(f)
-            except Exception as e:
-                logger.error(f"[JsonActionSequence] 加载JSON文件失败: {e}")
+                parts, options = self._parse_param(json_file)
+            except ValueError as e:
+                logger.error(f"[JsonActionSequence] 参数错误: {e}")
                 return False
+            logger.info(f"[JsonActionSequence] 清理后的文件名: {', '.join(name for name, _, _ in parts)}")
             
-            # 提取动作序列信息
-            sequence_name = sequence_data.get("name", "未知序列")
-            total_time = sequence_data.get("total_time", 0)
-            actions = sequence_data.get("actions", [])
-            
-            if not actions:
-                logger.error(f"[JsonActionSequence] JSON文件中没有动作序列: {sequence_name}")
+            # 整次执行 (编译 / 回放 / 纠正) 使用同一份配置快照, 热更新不会在中途混用新旧值
+            config = CONFIG_STORE.snapshot()
+            compiled = self._load_compiled(parts, config)
+            if compiled is None:
                 return False
             
+            sequence_name = compiled.name
             logger.info(f"[JsonActionSequence] 加载序列: {sequence_name}")
-            logger.info(f"  总时长: {total_time:.3f}秒")
-            logger.info(f"  动作数量: {len(actions)} 个")
+            logger.info(f"  总时长: {compiled.total_time:.3f}秒")
+            logger.info(f"  动作数量: {len(compiled)} 个")
             
-            # 从全局配置获取闪避键
-            dodge_vk = GAME_CONFIG.get("dodge_key", win32con.VK_SHIFT)
+            dodge_vk = compiled.dodge_vk
             logger.info(f"[JsonActionSequence] 使用闪避键: VK={dodge_vk} (0x{dodge_vk:02X}) - {self._vk_to_name(dodge_vk)}")
             
-            # 处理动作序列，将按键字符串转换为虚拟键码，并映射闪避键
-            processed_actions = self._process_actions(actions, dodge_vk)
-            if processed_actions is None:
-                return False
+            time_scale = options["time_scale"]
+            events = compiled.events
+            waypoints = options["waypoints"] if options["waypoints"] is not None else compiled.waypoints
+            if time_scale != 1.0:
+                events = tuple((t * time_scale, action_type, key) for t, action_type, key in events)
+                waypoints = tuple((t * time_scale, node) for t, node in waypoints)
+                logger.info(f"[JsonActionSequence] 时间缩放: x{time_scale:g} (总时长 {compiled.total_time * time_scale:.3f}秒)")
+            
+            # 路径点校验在后台线程进行, 不阻塞按键时间线
+            monitor = None
+            if waypoints:
+                on_miss = options["on_miss"]
+                monitor = WaypointMonitor(context, waypoints, on_miss != ON_MISS_CONTINUE, self.clock)
+                logger.info(f"[JsonActionSequence] 路径点校验: {len(waypoints)} 个, 未命中策略: {on_miss}")
             
             # 执行动作序列
-            success = self._execute_action_sequence(context, processed_actions, sequence_name)
+            success = self._execute_action_sequence(context, events, sequence_name, options["compensate"], monitor,
+                                                    config)
+            
+            if monitor is not None and monitor.missed is not None and options["on_miss"] == ON_MISS_CORRECT:
+                success = self._run_correction(context, options["correction"], options["compensate"], config)
             
             if success:
                 logger.info(f"[JsonActionSequence] [OK] 动作序列 '{sequence_name}' 执行完成")
@@ -181,6 +215,127 @@ class JsonActionSequence(CustomAction):
             logger.info("=" * 60)
             return False
     
+    def _load_compiled(self, parts, config=None):
+        """
+        按 [(序列名, repeat, gap)] 取得编译后的序列, 多个部分时取组合时间线
+        config 为配置快照 (闪避键), 默认读取 CONFIG_STORE
+        
+        Returns:
+            CompiledSequence, 找不到或加载失败返回 None
+        """
+        # 优先使用启动时建立的索引 (JSON / .seqb / 序列库), 未命中再搜索文件系统
+        specs = []
+        for name, repeat, gap in parts:
+            logger.info(f"[JsonActionSequence] 从文件加载动作序列: {name}")
+            source = SEQUENCE_CACHE.resolve(name)
+            if source is None:
+                json_file_path = self._get_json_file_path(name)
+                if not json_file_path:
+                    logger.error(f"[JsonActionSequence] 无法找到JSON文件: {name}")
+                    return None
+                source = (json_file_path, None)
+            specs.append((source, repeat, gap))
+        
+        # 获取编译后的序列 (按 来源/mtime/闪避键 缓存)
+        try:
+            if len(specs) == 1 and specs[0][1] == 1:
+                return SEQUENCE_CACHE.get(*specs[0][0], config=config)
+            return SEQUENCE_CACHE.get_composite(specs, config)
+        except Exception as e:
+            logger.error(f"[JsonActionSequence] 加载JSON文件失败: {e}")
+            return None
+    
+    def _run_correction(self, context, correction, compensate, config=None):
+        """路径点未命中后回放纠正序列 (不再做路径点校验)"""
+        compiled = self._load_compiled([(correction, 1, 0.0)], config)
+        if compiled is None:
+            return False
+        logger.info(f"[JsonActionSequence] 路径点未命中, 执行纠正序列: {compiled.name}")
+        return self._execute_action_sequence(context, compiled.events, compiled.name, compensate, config=config)
+    
+    def _parse_param(self, param):
+        """
+        解析参数: 序列名字符串 / 序列名数组 / {"file" 或 "sequence", "gap", "time_scale", "compensate",
+        "waypoints", "on_miss", "correction"} 对象
+        
+        Returns:
+            ([(序列名, repeat, gap), ...], 选项字典)
+            
+        Raises:
+            ValueError: 对象参数不合法
+        """
+        options = {
+            "time_scale": 1.0,
+            "compensate": True,
+            "waypoints": None,  # None 表示使用序列 JSON 中的路径点
+            "on_miss": ON_MISS_ABORT,
+            "correction": None,
+        }
+        if isinstance(param, str):
+            cleaned = param.strip()
+            if not cleaned.startswith(('{', '[')):
+                return [(self._clean_filename(cleaned), 1, 0.0)], options
+            try:
+                param = json.loads(cleaned)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"无法解析 JSON 参数: {e}")
+        if isinstance(param, list):
+            param = {"sequence": param}
+        if not isinstance(param, dict):
+            return [(self._clean_filename(param), 1, 0.0)], options
+        
+        default_gap = self._parse_number(param, "gap", 0.0, 0, 60)
+        if "sequence" in param:
+            items = param["sequence"]
+            if not isinstance(items, list) or not items:
+                raise ValueError(f"sequence 必须是非空数组: {items}")
+        else:
+            items = [param]
+        
+        parts = []
+        for item in items:
+            if isinstance(item, str):
+                item = {"file": item}
+            if not isinstance(item, dict):
+                raise ValueError(f"不支持的序列项: {item}")
+            name = item.get("file") or item.get("name")
+            if not name or not isinstance(name, str):
+                raise ValueError(f"缺少序列名 (file): {item}")
+            repeat = item.get("repeat", 1)
+            if isinstance(repeat, bool) or not isinstance(repeat, int) or not 1 <= repeat <= 100:
+                raise ValueError(f"repeat 必须是 1~100 的整数: {repeat}")
+            gap = self._parse_number(item, "gap", default_gap, 0, 60)
+            parts.append((self._clean_filename(name), repeat, gap))
+        
+        time_scale = self._parse_number(param, "time_scale", 1.0, 0, 10)
+        if time_scale == 0:
+            raise ValueError("time_scale 必须大于 0")
+        options["time_scale"] = time_scale
+        compensate = param.get("compensate", True)
+        if not isinstance(compensate, bool):
+            raise ValueError(f"compensate 必须是布尔值: {compensate}")
+        options["compensate"] = compensate
+        
+        if "waypoints" in param:
+            options["waypoints"] = parse_waypoints(param["waypoints"])
+        on_miss = param.get("on_miss", ON_MISS_ABORT)
+        if on_miss not in ON_MISS_POLICIES:
+            raise ValueError(f"on_miss 必须是 {'/'.join(ON_MISS_POLICIES)} 之一: {on_miss}")
+        options["on_miss"] = on_miss
+        correction = param.get("correction")
+        if on_miss == ON_MISS_CORRECT and (not correction or not isinstance(correction, str)):
+            raise ValueError("on_miss 为 correct 时必须提供纠正序列 (correction)")
+        options["correction"] = self._clean_filename(correction) if correction else None
+        return parts, options
+    
+    @staticmethod
+    def _parse_number(param, key, default, low, high):
+        """读取 [low, high] 范围内的数值参数"""
+        value = param.get(key, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+            raise ValueError(f"{key} 必须是 [{low}, {high}] 之间的数值: {value}")
+        return float(value)
+    
     def _clean_filename(self, filename):
         """
         清理文件名，去除多余的引号
@@ -264,108 +419,97 @@ class JsonActionSequence(CustomAction):
             logger.error(f"[JsonActionSequence] 获取JSON文件路径失败: {e}")
             return None
     
-    def _process_actions(self, actions, dodge_vk):
-        """
-        处理动作序列，将按键字符串转换为虚拟键码
-        特别处理：将JSON中的"shift"映射为配置的闪避键
-        
-        Args:
-            actions: 原始动作序列
-            dodge_vk: 闪避键虚拟键码
-            
-            
-        Returns:
-            list: 处理后的动作序列，如果转换失败返回None
-        """
-        processed_actions = []
-        
-        for action in actions:
-            processed_action = action.copy()
-            key = action.get("key")
-            
-            # 如果按键是字符串，需要转换为虚拟键码
-            if isinstance(key, str):
-                # 特殊按键映射
-                special_keys = {
-                    "shift": dodge_vk,  # 关键：将"shift"映射为配置的闪避键
-                    "ctrl": win32con.VK_CONTROL,
-                    "alt": win32con.VK_MENU,
-                    "space": win32con.VK_SPACE,
-                    "enter": win32con.VK_RETURN,
-                    "esc": win32con.VK_ESCAPE,
-                    "tab": win32con.VK_TAB
-                }
-                
-                key_lower = key.lower()
-                
-                # 检查是否为特殊按键
-                if key_lower in special_keys:
-                    processed_action["key"] = special_keys[key_lower]
-                    # 记录闪避键映射信息
-                    if key_lower == "shift":
-                        logger.debug(f"[JsonActionSequence] 映射闪避键: 'shift' -> VK={dodge_vk} (0x{dodge_vk:02X})")
-                else:
-                    try:
-                        vk_code = _name_to_vk(key_lower, dodge_vk)
-                        processed_action["key"] = vk_code
-                    except Exception as e:
-                        logger.error(f"[JsonActionSequence] 转换按键 '{key}' 时发生异常: {e}")
-                        return None
-            
-            # 如果按键已经是整数，保持不变
-            processed_actions.append(processed_action)
-        
-        return processed_actions
-    
-    def _execute_action_sequence(self, context: Context, actions, sequence_name):
+    def _execute_action_sequence(self, context: Context, actions, sequence_name, compensate=True, monitor=None,
+                                 config=None):
         """
         执行动作序列
         
         Args:
             
-            actions: 动作序列列表
+            actions: 编译后的 (time, type, vk) 时间线
             sequence_name: 序列名称，用于日志
+            compensate: 是否按预测的控制器延迟提前触发
+            monitor: 可选的 WaypointMonitor, 与回放同时开始
             
         Returns:
             bool: 执行是否成功
         """
+        # 回放结果 (completed / stopped / error), 无论如何结束都写入时序记录
+        outcome = OUTCOME_ERROR
+        timing = None
         try:
-            start_time = time.time()
-            last_action_time = 0.0
+            # 整次回放使用同一份配置快照 (自旋预算 / 延迟补偿开关与上限)
+            if config is None:
+                config = CONFIG_STORE.snapshot()
+            spin_ms = self.spin_ms if self.spin_ms is not None else config.get("sequence_spin_ms")
+            dispatcher = KeyDispatcher(context.tasker.controller, self.clock, self.estimator)
+            token = CancelToken(context)
+            total = len(actions)
+            
+            def fire(i, action):
+                # 非阻塞提交按键 (类型已在编译阶段校验)
+                _, action_type, key = action
+                dispatcher.post(action_type, key, i)
+            
+            # 按绝对截止时间触发，等待误差不会随序列累积
+            result = None
+            # 回放起点: 调度器与路径点校验共用
+            begin = self.clock()
+            try:
+                scheduler = DeadlineScheduler(spin_ms, self.clock, self.sleep, cancel_token=token)
+                if monitor is not None:
+                    monitor.start(token, begin)
+                result = scheduler.run(actions, fire,
+                                       partial(self.estimator.compensation, config=config) if compensate else None,
+                                       start=begin)
+            finally:
+                # 正常结束时不会有残留；停止或异常时保证松开
+                released = dispatcher.release_all()
+                if monitor is not None:
+                    # 回放完成时校验最后一个按键之后的路径点, 否则记为未校验
+                    monitor.stop(drain=result is not None and result.completed)
+                failures = dispatcher.finish()
+                # 逐事件时序: 计划 / 派发 / 完成 (相对回放起点)
+                timing = PlaybackTiming.from_playback(
+                    sequence_name, actions, begin,
+                    dispatcher.posted_at, dispatcher.completed_at,
+                    result.compensation if result is not None else None
+                )
+            
+            if monitor is not None:
+                for waypoint in monitor.results:
+                    logger.info(f"[{sequence_name}] 路径点 {waypoint}")
+                if monitor.unchecked:
+                    logger.warning(f"[{sequence_name}] 未校验的路径点: "
+                                   + ", ".join(f"{node} @{t:.2f}s" for t, node in monitor.unchecked))
+            
+            if monitor is not None and monitor.missed is not None and monitor.abort_on_miss:
+                # 回放中途未命中 (已取消回放) 或回放完成后校验的路径点未命中
+                outcome = OUTCOME_STOPPED
+                logger.warning(f"[{sequence_name}] 路径点未命中, 回放中止 ({len(result.lateness)}/{total} 个动作), "
+                               f"已松开按键: {released}")
+                return False
             
-            for i, action in enumerate(actions):
-                action_time = action["time"]
-                action_type = action["type"]
-                key = action["key"]
-                
-                # 计算需要等待的时间
-                wait_time = action_time - last_action_time
-                
-                # 等待到指定时间点
-                if wait_time > 0:
-                    logger.debug(f"[{sequence_name}] 动作 {i+1:2d}/{len(actions)}: 等待 {wait_time:.3f}秒")
-                    time.sleep(wait_time)
-                
-                # 执行按键操作
-                # current_relative_time = time.time() - start_time
-                # logger.debug(f"[{sequence_name}] 动作 {i+1:2d}/{len(actions)}: {action_type:8} {self._key_to_str(key):5} "
-                #           f"(计划: {action_time:6.3f}s, 实际: {current_relative_time:6.3f}s)")
-                
-                # 执行按键操作
-                controller = context.tasker.controller
-                if action_type == "key_down":
-                    controller.post_key_down(key).wait()
-                elif action_type == "key_up":
-                    controller.post_key_up(key).wait()
-                else:
-                    logger.error(f"[{sequence_name}] 不支持的操作类型: {action_type}")
-                    return False
-                
-                last_action_time = action_time
+            if not result.completed:
+                outcome = OUTCOME_STOPPED
+                logger.info(f"[{sequence_name}] 回放被停止 ({len(result.lateness)}/{total} 个动作), 已松开按键: {released}")
+                token.log_stop(f"[{sequence_name}]")
+                return False
+            
+            if failures:
+                for failure in failures:
+                    logger.error(f"[{sequence_name}] 按键派发失败: {failure}")
+                return False
+            
+            outcome = OUTCOME_COMPLETED
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, (action_time, action_type, key) in enumerate(actions):
+                    logger.debug(f"[{sequence_name}] 动作 {i+1:2d}/{total}: {EVENT_NAMES[action_type]:8} {self._key_to_str(key):5} "
+                                 f"(计划: {action_time:6.3f}s, 派发: {timing.dispatched[i]:6.3f}s, 完成: {timing.completed[i]:6.3f}s)")
             
             # 检查总执行时间
-            total_execution_time = time.time() - start_time
-            last_action_time = actions[-1]["time"]
+            total_execution_time = result.elapsed
+            last_action_time = actions[-1][0]
             time_difference = total_execution_time - last_action_time
             
             logger.info(f"[{sequence_name}] 执行完成统计:")
@@ -373,6 +517,15 @@ class JsonActionSequence(CustomAction):
             logger.info(f"  实际总时间: {total_execution_time:.3f}秒")
             logger.info(f"  时间误差: {time_difference:+.3f}秒")
             
+            # 延迟补偿: 平均提前量 / 当前延迟估计 / 生效误差 (Job 完成 - 计划)
+            mean_ms, std_ms, samples = self.estimator.snapshot()
+            effective = timing.effective_error()
+            if effective:
+                effective_mean = sum(effective) / len(effective) * 1000
+                logger.info(f"  延迟补偿: 平均提前 {result.mean_compensation * 1000:.2f}ms, "
+                            f"估计延迟 {mean_ms:.2f}±{std_ms:.2f}ms ({samples} 个样本), "
+                            f"生效误差均值 {effective_mean:+.2f}ms")
+            
             if abs(time_difference) > 0.5:  # 允许0.5秒误差
                 logger.warning(f"[{sequence_name}] 时间误差较大，建议优化系统负载")
             
@@ -381,6 +534,26 @@ class JsonActionSequence(CustomAction):
         except Exception as e:
             logger.error(f"[{sequence_name}] 执行动作序列时发生异常: {e}", exc_info=True)
             return False
+        
+        finally:
+            if timing is not None:
+                self._record_timing(sequence_name, timing, outcome)
+    
+    def _record_timing(self, sequence_name, timing, outcome):
+        """写入一次回放的时序记录 (含 outcome); 正常完成时输出派发迟到统计"""
+        try:
+            record = self.recorder.record(timing, outcome)
+        except Exception as e:
+            logger.warning(f"[{sequence_name}] 记录回放时序失败: {e}")
+            return
+        if outcome != OUTCOME_COMPLETED:
+            logger.debug(f"[{sequence_name}] 已记录时序 (outcome={outcome})")
+            return
+        logger.info(f"  派发迟到: p50 {record['p50_ms']:.2f}ms, p95 {record['p95_ms']:.2f}ms, p99 {record['p99_ms']:.2f}ms")
+        summary = self.recorder.summary(sequence_name)
+        if summary and summary["runs"] > 1:
+            logger.info(f"  累计 {summary['runs']} 次回放: p50 {summary['p50_ms']:.2f}ms, "
+                        f"p95 {summary['p95_ms']:.2f}ms, p99 {summary['p99_ms']:.2f}ms")
     
     def _key_to_str(self, key):
         """
@@ -415,21 +588,21 @@ class JsonActionSequence(CustomAction):
             str: 可读的按键名称
         """
         vk_to_name = {
-            win32con.VK_SHIFT: "shift",
-            win32con.VK_CONTROL: "ctrl",
-            win32con.VK_MENU: "alt",
-            win32con.VK_SPACE: "space",
-            win32con.VK_RETURN: "enter",
-            win32con.VK_ESCAPE: "esc",
-            win32con.VK_TAB: "tab",
+            keycodes.VK_SHIFT: "shift",
+            keycodes.VK_CONTROL: "ctrl",
+            keycodes.VK_MENU: "alt",
+            keycodes.VK_SPACE: "space",
+            keycodes.VK_RETURN: "enter",
+            keycodes.VK_ESCAPE: "esc",
+            keycodes.VK_TAB: "tab",
             0x57: "w",  # VK_W
             0x41: "a",  # VK_A
             0x53: "s",  # VK_S
             0x44: "d",  # VK_D
-            win32con.VK_UP: "up",
-            win32con.VK_DOWN: "down",
-            win32con.VK_LEFT: "left",
-            win32con.VK_RIGHT: "right",
+            keycodes.VK_UP: "up",
+            keycodes.VK_DOWN: "down",
+            keycodes.VK_LEFT: "left",
+            keycodes.VK_RIGHT: "right",
             0x05: "鼠标侧键1",  # XButton1
             0x06: "鼠标侧键2",  # XButton2
             0x02: "鼠标右键",   # Right mouse button
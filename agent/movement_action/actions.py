@@ -7,7 +7,9 @@
     异步按键接口: post_key_down / post_key_up / post_click_key
 3. 保持与原有参数格式兼容
 
-注意: 这些接口返回 Job, 使用 .wait() 保证顺序与时序可靠。
+注意: 这些接口返回 Job。按键经 KeyDispatcher 非阻塞提交 (控制器按提交顺序执行),
+Job 的完成情况在动作结束时统一检查, 控制器往返延迟不再计入按键时长。
+所有等待均可被任务停止中断, 结束 (含停止/异常) 时保证松开仍按住的按键。
 """
 
 import json
@@ -15,13 +17,18 @@ import logging
 import time
 from maa.custom_action import CustomAction
 from maa.context import Context
-from maa.agent.agent_server import AgentServer
-import win32con
+from action_registry import custom_action
+import keycodes
 import sys
 import os
 
 # 导入全局配置
-from config import GAME_CONFIG
+from config_store import CONFIG_STORE
+from cancellation import CancelToken, ActionCancelled
+from tracing import trace_action
+
+from .dispatch import KeyDispatcher
+from .sequence_cache import KEY_DOWN, KEY_UP
 
 logger = logging.getLogger(__name__)
 
@@ -40,10 +47,10 @@ def direction_to_vk(direction: str) -> int:
         'a': ord('A'),
         's': ord('S'),
         'd': ord('D'),
-        'up': win32con.VK_UP,
-        'down': win32con.VK_DOWN,
-        'left': win32con.VK_LEFT,
-        'right': win32con.VK_RIGHT,
+        'up': keycodes.VK_UP,
+        'down': keycodes.VK_DOWN,
+        'left': keycodes.VK_LEFT,
+        'right': keycodes.VK_RIGHT,
     }
     if d not in mapping:
         raise ValueError(f"不支持的方向: {direction}")
@@ -57,13 +64,13 @@ def char_to_vk(char: str) -> int:
 def name_to_vk(name: str) -> int:
     n = name.lower()
     special = {
-        'shift': win32con.VK_SHIFT,
-        'ctrl': win32con.VK_CONTROL,
-        'alt': win32con.VK_MENU,
-        'space': win32con.VK_SPACE,
-        'enter': win32con.VK_RETURN,
+        'shift': keycodes.VK_SHIFT,
+        'ctrl': keycodes.VK_CONTROL,
+        'alt': keycodes.VK_MENU,
+        'space': keycodes.VK_SPACE,
+        'enter': keycodes.VK_RETURN,
         'esc': 27,
-        'tab': win32con.VK_TAB,
+        'tab': keycodes.VK_TAB,
     }
     if n in special:
         return special[n]
@@ -72,6 +79,23 @@ def name_to_vk(name: str) -> int:
     raise ValueError(f"不支持的键名称: {name}")
 
 
+def finish_keys(dispatcher, token, tag):
+    """
+    动作收尾: 松开所有仍按住的按键, 等待按键 Job 完成并报告失败
+
+    Returns:
+        bool: 按键全部派发成功返回 True
+    """
+    released = dispatcher.release_all()
+    failures = dispatcher.finish()
+    for failure in failures:
+        logger.error(f"{tag} 按键派发失败: {failure}")
+    if token.cancelled_at is not None:
+        logger.info(f"{tag} 已松开按键: {released}")
+        token.log_stop(tag)
+    return not failures
+
+
 def debug_controller_attributes(ctrl, logger_instance=None):
     """
     调试工具：打印控制器对象的所有属性
@@ -136,7 +160,8 @@ def debug_controller_attributes(ctrl, logger_instance=None):
     
     log_func("=" * 60)
 
-@AgentServer.custom_action("RunWithShift")
+@custom_action("RunWithShift")
+@trace_action
 class RunWithShift(CustomAction):
     """
     奔跑动作：先按下方向键,再按下闪避键(可配置),保持指定时长
@@ -148,7 +173,7 @@ class RunWithShift(CustomAction):
         "dodge_delay": 0.05    // 按下方向键后,多久按下闪避键（秒）,默认 0.05
     }
     
-    注意：使用的闪避键从全局配置 main.GAME_CONFIG["dodge_key"] 中读取
+    注意：使用的闪避键从全局配置 dodge_key 中读取 (动作开始时的配置快照, 执行中的配置变化不影响本次动作)
     """
     
     def run(
@@ -156,6 +181,9 @@ class RunWithShift(CustomAction):
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
+        # 整个动作使用同一份配置快照
+        config = CONFIG_STORE.snapshot()
+        
         # 解析参数
         try:
             if isinstance(argv.custom_action_param, str):
@@ -175,8 +203,8 @@ class RunWithShift(CustomAction):
         duration = params.get("duration", 2.0)
         dodge_delay = params.get("dodge_delay", 0.05)
         
-        # 从全局配置获取闪避键(现在是虚拟键码 int)
-        dodge_vk = GAME_CONFIG.get("dodge_key", win32con.VK_SHIFT)
+        # 从配置快照获取闪避键(虚拟键码 int)
+        dodge_vk = config.get("dodge_key", keycodes.VK_SHIFT)
         
         logger.debug("=" * 60)
         logger.info(f"[RunWithShift] 开始奔跑")
@@ -193,42 +221,52 @@ class RunWithShift(CustomAction):
             direction_vk = direction_to_vk(direction)
             
             logger.debug(f"[RunWithShift] 方向键 VK={direction_vk}, 闪避键 VK={dodge_vk}")
+            token = CancelToken(context)
+            dispatcher = KeyDispatcher(controller)
             
-            # 1. 按下方向键
-            logger.debug(f"[RunWithShift] 步骤 1: 按下方向键 '{direction}'")
-            controller.post_key_down(direction_vk).wait()
-            
-            # 2. 短暂延迟
-            if dodge_delay > 0:
-                logger.debug(f"[RunWithShift] 等待 {dodge_delay:.3f}秒...")
-                time.sleep(dodge_delay)
-            
-            # 3. 按下闪避键
-            logger.debug(f"[RunWithShift] 步骤 2: 按下闪避键 (VK=0x{dodge_vk:02X})")
-            controller.post_key_down(dodge_vk).wait()
-            
-            # 4. 保持按下状态
-            logger.debug(f"[RunWithShift] 步骤 3: 保持 {duration:.2f}秒...")
-            time.sleep(duration)
-            
-            # 5. 释放闪避键
-            logger.debug(f"[RunWithShift] 步骤 4: 释放闪避键")
-            controller.post_key_up(dodge_vk).wait()
-            
-            # 6. 释放方向键
-            logger.debug(f"[RunWithShift] 步骤 5: 释放方向键")
-            controller.post_key_up(direction_vk).wait()
+            try:
+                # 1. 按下方向键
+                logger.debug(f"[RunWithShift] 步骤 1: 按下方向键 '{direction}'")
+                dispatcher.key_down(direction_vk)
+                
+                # 2. 短暂延迟
+                if dodge_delay > 0:
+                    logger.debug(f"[RunWithShift] 等待 {dodge_delay:.3f}秒...")
+                    token.sleep(dodge_delay)
+                
+                # 3. 按下闪避键
+                logger.debug(f"[RunWithShift] 步骤 2: 按下闪避键 (VK=0x{dodge_vk:02X})")
+                dispatcher.key_down(dodge_vk)
+                
+                # 4. 保持按下状态
+                logger.debug(f"[RunWithShift] 步骤 3: 保持 {duration:.2f}秒...")
+                token.sleep(duration)
+                
+                # 5. 释放闪避键
+                logger.debug(f"[RunWithShift] 步骤 4: 释放闪避键")
+                dispatcher.key_up(dodge_vk)
+                
+                # 6. 释放方向键
+                logger.debug(f"[RunWithShift] 步骤 5: 释放方向键")
+                dispatcher.key_up(direction_vk)
+            finally:
+                ok = finish_keys(dispatcher, token, "[RunWithShift]")
+            if not ok:
+                return False
             
             logger.info(f"[RunWithShift] [OK] 完成奔跑 {duration:.2f}秒")
             logger.debug("=" * 60)
             
             return True
             
+        except ActionCancelled:
+            return False
         except Exception as e:
             logger.error(f"[RunWithShift] 发生异常: {e}", exc_info=True)
             return False
 
-@AgentServer.custom_action("LongPressKey")
+@custom_action("LongPressKey")
+@trace_action
 class LongPressKey(CustomAction):
     """
     长按单个按键
@@ -282,18 +320,28 @@ class LongPressKey(CustomAction):
                 logger.error(f"[LongPressKey] 不支持的键类型: {key}")
                 return False
 
-            controller.post_key_down(vk_code).wait()
-            time.sleep(duration)
-            controller.post_key_up(vk_code).wait()
+            token = CancelToken(context)
+            dispatcher = KeyDispatcher(controller)
+            try:
+                dispatcher.key_down(vk_code)
+                token.sleep(duration)
+                dispatcher.key_up(vk_code)
+            finally:
+                ok = finish_keys(dispatcher, token, "[LongPressKey]")
+            if not ok:
+                return False
             
             logger.info(f"[LongPressKey] [OK] 完成长按")
             return True
             
+        except ActionCancelled:
+            return False
         except Exception as e:
             logger.error(f"[LongPressKey] 发生异常: {e}", exc_info=True)
             return False
 
-@AgentServer.custom_action("PressMultipleKeys")
+@custom_action("PressMultipleKeys")
+@trace_action
 class PressMultipleKeys(CustomAction):
     """
     同时按下多个按键
@@ -350,20 +398,29 @@ class PressMultipleKeys(CustomAction):
                     logger.error(f"[PressMultipleKeys] 不支持的键类型: {key}")
                     return False
 
-            for vk in vk_codes:
-                controller.post_key_down(vk).wait()
-            time.sleep(duration)
-            for vk in vk_codes:
-                controller.post_key_up(vk).wait()
+            # 所有按键作为一批连续提交，真正做到“同时”按下
+            token = CancelToken(context)
+            dispatcher = KeyDispatcher(controller)
+            try:
+                dispatcher.post_batch([(i, KEY_DOWN, vk) for i, vk in enumerate(vk_codes)])
+                token.sleep(duration)
+                dispatcher.post_batch([(len(vk_codes) + i, KEY_UP, vk) for i, vk in enumerate(vk_codes)])
+            finally:
+                ok = finish_keys(dispatcher, token, "[PressMultipleKeys]")
+            if not ok:
+                return False
             
             logger.info(f"[PressMultipleKeys] [OK] 完成同时按键")
             return True
             
+        except ActionCancelled:
+            return False
         except Exception as e:
             logger.error(f"[PressMultipleKeys] 发生异常: {e}", exc_info=True)
             return False
 
-@AgentServer.custom_action("RunWithJump")
+@custom_action("RunWithJump")
+@trace_action
 class RunWithJump(CustomAction):
     """
     边跑边跳动作：先按下方向键，延迟后按下闪避键（奔跑），然后周期性短按空格键（跳跃）
@@ -377,7 +434,7 @@ class RunWithJump(CustomAction):
         "jump_press_time": 0.1   // 每次跳跃按键时长（秒），默认 0.1 秒
     }
     
-    注意：使用的闪避键从全局配置 main.GAME_CONFIG["dodge_key"] 中读取
+    注意：使用的闪避键从全局配置 dodge_key 中读取 (动作开始时的配置快照, 执行中的配置变化不影响本次动作)
     """
     
     def run(
@@ -385,6 +442,9 @@ class RunWithJump(CustomAction):
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
+        # 整个动作使用同一份配置快照
+        config = CONFIG_STORE.snapshot()
+        
         # 解析参数
         try:
             if isinstance(argv.custom_action_param, str):
@@ -406,8 +466,8 @@ class RunWithJump(CustomAction):
         jump_interval = params.get("jump_interval", 0.5)
         jump_press_time = params.get("jump_press_time", 0.1)
         
-        # 从全局配置获取闪避键(现在是虚拟键码 int)
-        dodge_vk = GAME_CONFIG.get("dodge_key", win32con.VK_SHIFT)
+        # 从配置快照获取闪避键(虚拟键码 int)
+        dodge_vk = config.get("dodge_key", keycodes.VK_SHIFT)
         
         logger.debug("=" * 60)
         logger.info(f"[RunWithJump] 开始边跑边跳")
@@ -423,71 +483,74 @@ class RunWithJump(CustomAction):
             direction_vk = direction_to_vk(direction)
             
             logger.debug(f"[RunWithJump] 方向键 VK={direction_vk}, 闪避键 VK={dodge_vk}")
-            
-            # 1. 按下方向键
-            logger.debug(f"[RunWithJump] 步骤 1: 按下方向键 '{direction}'")
-            controller.post_key_down(direction_vk).wait()
-            
-            # 2. 短暂延迟后按下闪避键
-            if dodge_delay > 0:
-                logger.debug(f"[RunWithJump] 等待 {dodge_delay:.3f}秒...")
-                time.sleep(dodge_delay)
-            
-            logger.debug(f"[RunWithJump] 步骤 2: 按下闪避键 (VK=0x{dodge_vk:02X})")
-            controller.post_key_down(dodge_vk).wait()
-            
-            # 3. 周期性跳跃，直到总时长结束
-            logger.debug(f"[RunWithJump] 步骤 3: 开始周期性跳跃...")
-            start_time = time.time()
+            token = CancelToken(context)
+            dispatcher = KeyDispatcher(controller)
             jump_count = 0
-            next_jump_time = start_time + jump_interval
             
-            while True:
-                current_time = time.time()
-                elapsed_time = current_time - start_time
+            try:
+                # 1. 按下方向键
+                logger.debug(f"[RunWithJump] 步骤 1: 按下方向键 '{direction}'")
+                dispatcher.key_down(direction_vk)
+                
+                # 2. 短暂延迟后按下闪避键
+                if dodge_delay > 0:
+                    logger.debug(f"[RunWithJump] 等待 {dodge_delay:.3f}秒...")
+                    token.sleep(dodge_delay)
                 
-                # 检查是否达到总时长
-                if elapsed_time >= duration:
-                    logger.debug(f"[RunWithJump] 达到总时长 {duration:.2f}秒，停止跳跃")
-                    break
+                logger.debug(f"[RunWithJump] 步骤 2: 按下闪避键 (VK=0x{dodge_vk:02X})")
+                dispatcher.key_down(dodge_vk)
                 
-                # 检查是否该跳跃了
-                if current_time >= next_jump_time:
-                    jump_count += 1
-                    remaining_time = duration - elapsed_time
-                    logger.debug(f"[RunWithJump] -> 第 {jump_count} 次跳跃 (剩余: {remaining_time:.2f}秒)")
+                # 3. 周期性跳跃，直到总时长结束
+                logger.debug(f"[RunWithJump] 步骤 3: 开始周期性跳跃...")
+                start_time = time.time()
+                next_jump_time = start_time + jump_interval
+                
+                while True:
+                    current_time = time.time()
+                    elapsed_time = current_time - start_time
                     
-                    # 按下空格键
-                    controller.post_key_down(win32con.VK_SPACE).wait()
-                    time.sleep(jump_press_time)
-                    controller.post_key_up(win32con.VK_SPACE).wait()
+                    # 检查是否达到总时长
+                    if elapsed_time >= duration:
+                        logger.debug(f"[RunWithJump] 达到总时长 {duration:.2f}秒，停止跳跃")
+                        break
                     
-                    # 计算下一次跳跃时间
-                    next_jump_time = current_time + jump_interval
-                else:
-                    # 短暂休眠，避免 CPU 占用过高
-                    time.sleep(0.01)
-            
-            # 4. 释放闪避键
-            logger.debug(f"[RunWithJump] 步骤 4: 释放闪避键")
-            controller.post_key_up(dodge_vk).wait()
-            
-            # 5. 释放方向键
-            logger.debug(f"[RunWithJump] 步骤 5: 释放方向键")
-            controller.post_key_up(direction_vk).wait()
+                    # 检查是否该跳跃了
+                    if current_time >= next_jump_time:
+                        jump_count += 1
+                        remaining_time = duration - elapsed_time
+                        logger.debug(f"[RunWithJump] -> 第 {jump_count} 次跳跃 (剩余: {remaining_time:.2f}秒)")
+                        
+                        # 按下空格键
+                        dispatcher.key_down(keycodes.VK_SPACE)
+                        token.sleep(jump_press_time)
+                        dispatcher.key_up(keycodes.VK_SPACE)
+                        
+                        # 计算下一次跳跃时间
+                        next_jump_time = current_time + jump_interval
+                    else:
+                        # 等到下一次跳跃或总时长结束（可被停止中断）
+                        token.sleep(min(next_jump_time, start_time + duration) - current_time)
+                
+                # 4. 释放闪避键
+                logger.debug(f"[RunWithJump] 步骤 4: 释放闪避键")
+                dispatcher.key_up(dodge_vk)
+                
+                # 5. 释放方向键
+                logger.debug(f"[RunWithJump] 步骤 5: 释放方向键")
+                dispatcher.key_up(direction_vk)
+            finally:
+                # 异常或停止时同样会松开空格/闪避键/方向键
+                ok = finish_keys(dispatcher, token, "[RunWithJump]")
+            if not ok:
+                return False
             
             logger.info(f"[RunWithJump] [OK] 完成边跑边跳 {duration:.2f}秒，共跳跃 {jump_count} 次")
             logger.debug("=" * 60)
             
             return True
             
+        except ActionCancelled:
+            return False
         except Exception as e:
             logger.error(f"[RunWithJump] 发生异常: {e}", exc_info=True)
-            # 尝试释放所有按键
-            try:
-                controller.post_key_up(win32con.VK_SPACE).wait()
-                controller.post_key_up(dodge_vk).wait()
-                controller.post_key_up(direction_vk).wait()
-            except Exception:
-                pass
             return False
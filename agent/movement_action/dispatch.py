@@ -0,0 +1,169 @@
+"""
+非阻塞按键派发层
+
+说明:
+- post_key_down / post_key_up 提交后立即返回, 不在时序关键路径上调用 .wait()
+- 后台线程按提交顺序等待 Job 完成, 并把结果写入对应的 Future
+- 同一时刻的多个事件可通过 post_batch 连续提交 (中间无任何等待)
+- 失败不会打断回放, 在 finish() 时连同事件序号一并返回
+- posted_at / completed_at 记录每个事件的提交与完成时刻 (默认 time.perf_counter), 供时序遥测使用
+- held 记录当前仍按住的按键, release_all() 用于取消或异常时保证全部松开
+- 可传入 LatencyEstimator, 每个 Job 完成时反馈往返时间 (完成 - 提交)
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from tracing import TRACER
+from .sequence_cache import KEY_DOWN, KEY_UP, EVENT_NAMES
+
+logger = logging.getLogger(__name__)
+
+# 后台线程退出标记
+_STOP = object()
+
+
+class DispatchFailure:
+    """派发失败记录"""
+
+    __slots__ = ("index", "action_type", "vk", "error")
+
+    def __init__(self, index, action_type, vk, error):
+        self.index = index
+        self.action_type = action_type
+        self.vk = vk
+        self.error = error
+
+    def __str__(self):
+        return f"事件 #{self.index} {EVENT_NAMES[self.action_type]} VK=0x{self.vk:02X}: {self.error}"
+
+
+class KeyDispatcher:
+    """
+    非阻塞按键派发器 (每次动作执行创建一个)
+
+    使用方式:
+        dispatcher = KeyDispatcher(context.tasker.controller)
+        dispatcher.key_down(vk)
+        ...
+        failures = dispatcher.finish()   # 等待所有 Job 完成, 返回失败列表
+    """
+
+    def __init__(self, controller, clock=time.perf_counter, estimator=None):
+        self.controller = controller
+        self.clock = clock
+        self.estimator = estimator
+        self.failures = []
+        self.held = set()  # 已提交 key_down 且尚未提交 key_up 的按键
+        self.posted_at = {}  # 事件序号 -> 提交完成时刻
+        self.completed_at = {}  # 事件序号 -> Job 完成时刻
+        self._next_index = 0
+        self._queue = queue.SimpleQueue()
+        self._reaper = threading.Thread(target=self._reap, name="KeyDispatcherReaper", daemon=True)
+        self._reaper.start()
+
+    def post(self, action_type, vk, index=None):
+        """
+        提交单个按键事件, 不等待完成
+
+        Args:
+            action_type: KEY_DOWN / KEY_UP
+            vk: 虚拟键码
+            index: 事件序号 (用于错误定位), 默认按提交顺序自增
+
+        Returns:
+            Future: 完成时结果为 Job 完成时刻 (clock 时钟)
+        """
+        if index is None:
+            index = self._next_index
+        self._next_index = index + 1
+
+        if action_type == KEY_DOWN:
+            self.held.add(vk)
+        else:
+            self.held.discard(vk)
+
+        future = Future()
+        try:
+            if action_type == KEY_DOWN:
+                job = self.controller.post_key_down(vk)
+            else:
+                job = self.controller.post_key_up(vk)
+        except Exception as e:
+            self._fail(future, index, action_type, vk, e)
+            return future
+
+        self.posted_at[index] = self.clock()
+        self._queue.put((index, action_type, vk, job, future))
+        return future
+
+    def post_batch(self, events):
+        """
+        连续提交一组同一时刻的事件
+
+        Args:
+            events: (index, action_type, vk) 序列
+
+        Returns:
+            list[Future]
+        """
+        return [self.post(action_type, vk, index) for index, action_type, vk in events]
+
+    def key_down(self, vk):
+        return self.post(KEY_DOWN, vk)
+
+    def key_up(self, vk):
+        return self.post(KEY_UP, vk)
+
+    def release_all(self):
+        """
+        松开所有仍按住的按键 (非阻塞提交, 由 finish() 等待完成)
+
+        Returns:
+            list[int]: 被松开的按键
+        """
+        released = sorted(self.held)
+        for vk in released:
+            self.key_up(vk)
+        return released
+
+    def finish(self, timeout=None):
+        """
+        等待所有已提交的 Job 完成并停止后台线程
+
+        Returns:
+            list[DispatchFailure]: 失败记录 (按事件序号)
+        """
+        self._queue.put(_STOP)
+        with TRACER.span("key_jobs_finish"):
+            self._reaper.join(timeout)
+        if self._reaper.is_alive():
+            logger.warning("[KeyDispatcher] 等待按键 Job 完成超时")
+        return sorted(self.failures, key=lambda f: f.index)
+
+    def _reap(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            index, action_type, vk, job, future = item
+            try:
+                with TRACER.span("key_job", index=index, type=EVENT_NAMES.get(action_type, action_type), vk=vk):
+                    job.wait()
+                if job.succeeded:
+                    done = self.clock()
+                    self.completed_at[index] = done
+                    if self.estimator is not None and index in self.posted_at:
+                        self.estimator.update(done - self.posted_at[index])
+                    future.set_result(done)
+                else:
+                    self._fail(future, index, action_type, vk, RuntimeError("Job 执行失败"))
+            except Exception as e:
+                self._fail(future, index, action_type, vk, e)
+
+    def _fail(self, future, index, action_type, vk, error):
+        self.failures.append(DispatchFailure(index, action_type, vk, error))
+        future.set_exception(error)
@@ -0,0 +1,98 @@
+"""
+控制器延迟估计与补偿 (动作序列回放)
+
+说明:
+- 每个按键 Job 的往返时间 (提交 -> 完成) 由 KeyDispatcher 反馈给 LATENCY_ESTIMATOR
+- 估计器维护 EWMA 均值与方差, 跨回放持续更新
+- 超过 均值 + OUTLIER_SIGMA * 标准差 的样本 (卡顿尖峰) 截断后再计入, 避免单次尖峰拉偏估计
+- 回放时把后续事件提前 "预测延迟", 提前量不超过 GAME_CONFIG["latency_compensation_max_ms"]
+- GAME_CONFIG["latency_compensation"] 为 False 时只测量不补偿
+"""
+
+import math
+import threading
+
+# 导入全局配置
+from config_store import CONFIG_STORE
+
+# EWMA 平滑系数 (越大越跟随最近样本)
+DEFAULT_ALPHA = 0.1
+
+# 样本数达到此值前不补偿 (估计尚不可靠)
+MIN_SAMPLES = 5
+
+# 尖峰截断阈值 (标准差倍数)
+OUTLIER_SIGMA = 4.0
+
+# 默认补偿上限 (毫秒)
+DEFAULT_MAX_COMPENSATION_MS = 30
+
+
+class LatencyEstimator:
+    """
+    控制器往返延迟的 EWMA 估计器 (线程安全)
+
+    使用方式:
+        LATENCY_ESTIMATOR.update(rtt)          # 由派发器在 Job 完成时调用
+        lead = LATENCY_ESTIMATOR.compensation() # 回放时每个事件提前的秒数
+    """
+
+    def __init__(self, alpha=DEFAULT_ALPHA):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.mean = 0.0
+            self.variance = 0.0
+            self.samples = 0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def update(self, rtt):
+        """计入一个往返时间样本 (秒)"""
+        if rtt < 0 or math.isnan(rtt):
+            return
+        with self._lock:
+            if self.samples == 0:
+                self.mean = rtt
+                self.variance = 0.0
+            else:
+                if self.samples >= MIN_SAMPLES:
+                    rtt = min(rtt, self.mean + OUTLIER_SIGMA * math.sqrt(self.variance))
+                diff = rtt - self.mean
+                incr = self.alpha * diff
+                self.mean += incr
+                self.variance = (1 - self.alpha) * (self.variance + diff * incr)
+            self.samples += 1
+
+    def compensation(self, max_seconds=None, config=None):
+        """
+        当前应提前的秒数: 预测延迟 (EWMA 均值), 限制在 [0, max_seconds]
+
+        Args:
+            max_seconds: 补偿上限, 默认读取配置 latency_compensation_max_ms
+            config: 配置快照, 默认取 CONFIG_STORE 的当前快照
+        """
+        if config is None:
+            config = CONFIG_STORE.snapshot()
+        if not config.get("latency_compensation", True):
+            return 0.0
+        if max_seconds is None:
+            max_seconds = config.get("latency_compensation_max_ms", DEFAULT_MAX_COMPENSATION_MS) / 1000.0
+        with self._lock:
+            if self.samples < MIN_SAMPLES:
+                return 0.0
+            return max(0.0, min(max_seconds, self.mean))
+
+    def snapshot(self):
+        """(均值毫秒, 标准差毫秒, 样本数)"""
+        with self._lock:
+            return self.mean * 1000, math.sqrt(self.variance) * 1000, self.samples
+
+
+# 全局延迟估计器 (进程内跨回放共享)
+LATENCY_ESTIMATOR = LatencyEstimator()
@@ -0,0 +1,324 @@
+"""
+紧凑二进制动作序列格式
+
+单序列文件 (*.seqb) 与序列库文件 (library.madlib) 均为小端序:
+
+单序列文件:
+    header   <4sHHIi>   magic b"MADS", version, name_len, count, total_time_us
+    name     utf-8 字节 (name_len), 之后补齐到 4 字节
+    times    int32[count]   事件时间 (微秒, 量化)
+    keys     uint16[count]  虚拟键码, KEY_DODGE 表示“闪避键”(执行时按配置映射)
+    types    uint8[count]   事件类型 (KEY_DOWN / KEY_UP)
+
+序列库文件:
+    header   <4sHHI>    magic b"MADL", version, reserved, entry_count
+    目录项   <HIIi> + name   name_len, data_offset, count, total_time_us, 随后 name 字节
+    数据区   每个序列的 times / keys / types, 起始偏移按 4 字节对齐
+
+序列库整体读入内存后立即关闭文件 (不保持映射或句柄, Windows 下打包工具在 Agent 运行时也能替换文件,
+替换后按 mtime 自动重新读取); 按名称查找只需解析目录, 事件数组为内存中的零拷贝视图。
+编译结果的名称为序列名 (文件名去扩展名, 与序列库条目名一致), 与 JSON 来源相同。
+JSON 中的路径点 (waypoints) 不写入二进制格式, 需要时通过 custom_action_param 提供。
+"""
+
+import json
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from .sequence_cache import EVENT_TYPES, CompiledSequence, _name_to_vk, route_name
+
+PACKED_SUFFIX = ".seqb"
+LIBRARY_FILE_NAME = "library.madlib"
+
+FORMAT_VERSION = 1
+
+# 闪避键占位码: JSON 中的 "shift" 在打包时写为此值, 编译时映射为配置的闪避键
+KEY_DODGE = 0xFFFF
+
+_SEQ_HEADER = struct.Struct("<4sHHIi")
+_SEQ_MAGIC = b"MADS"
+_LIB_HEADER = struct.Struct("<4sHHI")
+_LIB_MAGIC = b"MADL"
+_LIB_ENTRY = struct.Struct("<HIIi")
+
+# 时间量化上限 (int32 微秒, 约 35 分钟)
+_MAX_TIME_US = 2 ** 31 - 1
+
+
+def _align4(n):
+    return (n + 3) & ~3
+
+
+def _to_little_endian(arr):
+    if sys.byteorder == "big":
+        arr = arr[:]
+        arr.byteswap()
+    return arr
+
+
+def encode_actions(sequence_data):
+    """
+    将 JSON 序列数据转换为打包用的平行数组
+
+    Returns:
+        (name, total_time_us, times, keys, types): times/keys/types 为小端序字节串
+
+    Raises:
+        ValueError: 序列为空或存在非法动作
+    """
+    name = sequence_data.get("name", "未知序列")
+    actions = sequence_data.get("actions", [])
+    if not actions:
+        raise ValueError(f"JSON文件中没有动作序列: {name}")
+
+    times = array("i")
+    keys = array("H")
+    types = array("B")
+    for i, action in enumerate(actions):
+        action_type = action.get("type")
+        if action_type not in EVENT_TYPES:
+            raise ValueError(f"动作 {i + 1}: 不支持的操作类型: {action_type}")
+
+        action_time = action.get("time")
+        if not isinstance(action_time, (int, float)) or action_time < 0:
+            raise ValueError(f"动作 {i + 1}: 非法的时间: {action_time}")
+        time_us = int(round(action_time * 1_000_000))
+        if time_us > _MAX_TIME_US:
+            raise ValueError(f"动作 {i + 1}: 时间超出可量化范围: {action_time}")
+
+        key = action.get("key")
+        if isinstance(key, str):
+            vk = _name_to_vk(key, KEY_DODGE)
+        elif isinstance(key, int):
+            vk = key
+        else:
+            raise ValueError(f"动作 {i + 1}: 不支持的键类型: {key}")
+        if not 0 <= vk <= 0xFFFF:
+            raise ValueError(f"动作 {i + 1}: 键码超出范围: {vk}")
+
+        times.append(time_us)
+        keys.append(vk)
+        types.append(EVENT_TYPES[action_type])
+
+    total_time = sequence_data.get("total_time", actions[-1]["time"])
+    total_time_us = min(int(round(total_time * 1_000_000)), _MAX_TIME_US)
+    return (
+        name,
+        total_time_us,
+        _to_little_endian(times).tobytes(),
+        _to_little_endian(keys).tobytes(),
+        types.tobytes(),
+    )
+
+
+def _decode_events(buf, offset, count):
+    """从缓冲区解析三组平行数组 (零拷贝 memoryview)"""
+    view = memoryview(buf)
+    times_end = offset + 4 * count
+    keys_end = times_end + 2 * count
+    times = view[offset:times_end].cast("i")
+    keys = view[times_end:keys_end].cast("H")
+    types = view[keys_end:keys_end + count]
+    if sys.byteorder == "big":
+        # 大端平台上拷贝并翻转字节序 (x86/ARM Windows 不会走到这里)
+        times = array("i", times.tobytes())
+        times.byteswap()
+        keys = array("H", keys.tobytes())
+        keys.byteswap()
+    return times, keys, types
+
+
+def compile_packed(name, total_time_us, times, keys, types, dodge_vk, path=None):
+    """将打包数组编译为 CompiledSequence (与 JSON 编译结果一致)"""
+    events = tuple(
+        (t / 1_000_000, types[i], dodge_vk if keys[i] == KEY_DODGE else keys[i])
+        for i, t in enumerate(times)
+    )
+    return CompiledSequence(name, path, total_time_us / 1_000_000, dodge_vk, events)
+
+
+########################
+# 单序列文件
+########################
+
+def pack_sequence(sequence_data):
+    """JSON 序列数据 -> 单序列文件字节串"""
+    name, total_time_us, times, keys, types = encode_actions(sequence_data)
+    name_bytes = name.encode("utf-8")
+    header = _SEQ_HEADER.pack(_SEQ_MAGIC, FORMAT_VERSION, len(name_bytes), len(types), total_time_us)
+    head = header + name_bytes
+    head += b"\0" * (_align4(len(head)) - len(head))
+    return head + times + keys + types
+
+
+def load_packed_file(path, dodge_vk):
+    """读取单序列文件并编译 (序列名取自文件名, 与 JSON / 序列库来源一致)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _SEQ_HEADER.size:
+        raise ValueError(f"文件过短, 不是有效的序列文件: {path}")
+    magic, version, name_len, count, total_time_us = _SEQ_HEADER.unpack_from(data, 0)
+    if magic != _SEQ_MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"不支持的序列文件格式: {path}")
+    name_start = _SEQ_HEADER.size
+    offset = _align4(name_start + name_len)
+    if len(data) < offset + 7 * count:
+        raise ValueError(f"序列文件已截断: {path}")
+    times, keys, types = _decode_events(data, offset, count)
+    return compile_packed(route_name(path), total_time_us, times, keys, types, dodge_vk, path)
+
+
+########################
+# 序列库
+########################
+
+def build_library(sequences):
+    """
+    构建序列库字节串
+
+    Args:
+        sequences: [(route_name, sequence_data), ...], route_name 为查找用的名称 (通常为文件名去扩展名)
+    """
+    encoded = []
+    for route_name, sequence_data in sequences:
+        _, total_time_us, times, keys, types = encode_actions(sequence_data)
+        encoded.append((route_name.encode("utf-8"), total_time_us, len(types), times + keys + types))
+
+    directory_size = _LIB_HEADER.size + sum(_LIB_ENTRY.size + len(n) for n, _, _, _ in encoded)
+    offset = _align4(directory_size)
+
+    directory = [_LIB_HEADER.pack(_LIB_MAGIC, FORMAT_VERSION, 0, len(encoded))]
+    blobs = []
+    for name_bytes, total_time_us, count, blob in encoded:
+        directory.append(_LIB_ENTRY.pack(len(name_bytes), offset, count, total_time_us) + name_bytes)
+        padded = blob + b"\0" * (_align4(len(blob)) - len(blob))
+        blobs.append(padded)
+        offset += len(padded)
+
+    head = b"".join(directory)
+    head += b"\0" * (_align4(len(head)) - len(head))
+    return head + b"".join(blobs)
+
+
+class SequenceLibrary:
+    """
+    读入内存的只读序列库
+
+    使用方式:
+        library = SequenceLibrary(path)
+        if "jj_60_part1_1" in library:
+            compiled = library.compile("jj_60_part1_1", dodge_vk)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # 读完即关闭文件, 不阻止打包工具替换 (os.replace) 序列库
+        with open(path, "rb") as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime_ns
+            self._data = f.read()
+        self._directory = self._read_directory()
+
+    def _read_directory(self):
+        data = self._data
+        if len(data) < _LIB_HEADER.size:
+            raise ValueError(f"文件过短, 不是有效的序列库: {self.path}")
+        magic, version, _, entry_count = _LIB_HEADER.unpack_from(data, 0)
+        if magic != _LIB_MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"不支持的序列库格式: {self.path}")
+        directory = {}
+        pos = _LIB_HEADER.size
+        for _ in range(entry_count):
+            name_len, offset, count, total_time_us = _LIB_ENTRY.unpack_from(data, pos)
+            pos += _LIB_ENTRY.size
+            name = bytes(data[pos:pos + name_len]).decode("utf-8")
+            pos += name_len
+            if offset + 7 * count > len(data):
+                raise ValueError(f"序列库已截断: {self.path} ({name})")
+            directory[name] = (offset, count, total_time_us)
+        return directory
+
+    def __contains__(self, name):
+        return name in self._directory
+
+    def names(self):
+        return list(self._directory)
+
+    def compile(self, name, dodge_vk):
+        """按名称取出序列并编译, 名称不存在时抛出 KeyError"""
+        offset, count, total_time_us = self._directory[name]
+        times, keys, types = _decode_events(self._data, offset, count)
+        try:
+            return compile_packed(name, total_time_us, times, keys, types, dodge_vk, self.path)
+        finally:
+            # 及时释放对缓冲区的导出视图
+            for view in (times, keys, types):
+                if isinstance(view, memoryview):
+                    view.release()
+
+    def close(self):
+        self._data = b""
+        self._directory = {}
+
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+
+def open_library(path):
+    """获取 (必要时重新读取) 序列库; 文件被替换后自动重新读取"""
+    mtime = os.stat(path).st_mtime_ns
+    with _libraries_lock:
+        library = _libraries.get(path)
+        if library is not None and library.mtime == mtime:
+            return library
+        if library is not None:
+            library.close()
+        library = SequenceLibrary(path)
+        _libraries[path] = library
+        return library
+
+
+########################
+# 转换器
+########################
+
+def convert_directory(action_dir, library_path=None, write_files=False):
+    """
+    将目录中的 JSON 序列转换为序列库 (以及可选的单序列文件)
+
+    Args:
+        action_dir: JSON 序列目录
+        library_path: 序列库输出路径, 默认 action_dir/library.madlib
+        write_files: 是否同时为每个 JSON 写出同名 .seqb
+
+    Returns:
+        list[(route_name, json_bytes, packed_bytes)]: 转换统计
+    """
+    library_path = library_path or os.path.join(action_dir, LIBRARY_FILE_NAME)
+    sequences = []
+    stats = []
+    for fname in sorted(os.listdir(action_dir)):
+        if not fname.lower().endswith(".json"):
+            continue
+        json_path = os.path.join(action_dir, fname)
+        with open(json_path, "r", encoding="utf-8") as f:
+            sequence_data = json.load(f)
+        route_name = fname[:-5]
+        packed = pack_sequence(sequence_data)
+        if write_files:
+            _atomic_write(os.path.join(action_dir, route_name + PACKED_SUFFIX), packed)
+        sequences.append((route_name, sequence_data))
+        stats.append((route_name, os.path.getsize(json_path), len(packed)))
+
+    _atomic_write(library_path, build_library(sequences))
+    return stats
+
+
+def _atomic_write(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
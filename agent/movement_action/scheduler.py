@@ -0,0 +1,168 @@
+"""
+绝对截止时间调度器 (动作序列回放)
+
+说明:
+- 每个事件的触发时刻 = 单调时钟起点 + 事件时间, 误差不会随序列累积
+- 等待采用 "粗睡眠 + 细自旋": 距截止时间超过自旋预算时 sleep, 之后忙等到截止时刻
+- 自旋预算可通过 GAME_CONFIG["sequence_spin_ms"] 配置 (越大越准, CPU 占用越高)
+- 时间相同的连续事件共用一个截止时刻, 等待一次后连续触发 (批量提交)
+- 记录每个事件的迟到时间 (实际触发 - 计划触发)
+- 可传入 CancelToken: 粗睡眠阶段可被中断, 取消后不再触发后续事件
+- 可传入 lead 函数 (延迟补偿): 每个时间点的截止时刻提前 lead() 秒, 但不早于上一个截止时刻
+"""
+
+import contextlib
+import logging
+import sys
+import time
+
+# 导入全局配置
+from config_store import CONFIG_STORE
+
+logger = logging.getLogger(__name__)
+
+# 默认自旋预算 (毫秒)
+DEFAULT_SPIN_MS = 2.0
+
+
+@contextlib.contextmanager
+def high_resolution_timer():
+    """
+    Windows 下临时将系统定时器精度提升到 1ms, 使粗睡眠阶段的唤醒更准
+    其他平台不做处理
+    """
+    winmm = None
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            winmm = ctypes.windll.winmm
+            winmm.timeBeginPeriod(1)
+        except Exception:
+            winmm = None
+    try:
+        yield
+    finally:
+        if winmm is not None:
+            try:
+                winmm.timeEndPeriod(1)
+            except Exception:
+                pass
+
+
+class PlaybackResult:
+    """
+    一次回放的结果
+
+    lateness 为每个事件相对 (补偿后) 截止时刻的迟到时间 (秒), 与事件一一对应;
+    compensation 为每个事件实际提前的秒数; start 为回放起点 (调度器时钟)
+    """
+
+    __slots__ = ("start", "lateness", "compensation", "elapsed", "completed")
+
+    def __init__(self, start, lateness, elapsed, completed, compensation=None):
+        self.start = start
+        self.lateness = lateness
+        self.compensation = compensation if compensation is not None else [0.0] * len(lateness)
+        self.elapsed = elapsed
+        self.completed = completed
+
+    @property
+    def max_lateness(self):
+        return max(self.lateness) if self.lateness else 0.0
+
+    @property
+    def mean_lateness(self):
+        return sum(self.lateness) / len(self.lateness) if self.lateness else 0.0
+
+    @property
+    def mean_compensation(self):
+        return sum(self.compensation) / len(self.compensation) if self.compensation else 0.0
+
+
+class DeadlineScheduler:
+    """
+    按绝对截止时间触发事件的调度器
+
+    使用方式:
+        scheduler = DeadlineScheduler()
+        result = scheduler.run(events, fire)   # fire(index, event) 在截止时刻被调用
+
+    Args:
+        spin_ms: 自旋预算 (毫秒), 默认读取 GAME_CONFIG["sequence_spin_ms"]
+        clock: 单调时钟函数, 默认 time.perf_counter
+        sleep: 睡眠函数, 默认 time.sleep (有 cancel_token 时在令牌上等待); 基准测试可传入虚拟时钟
+            (自旋阶段只读时钟不睡眠, 虚拟时钟须在读取时推进, 见 simulation.VirtualClock)
+        cancel_token: 可选的 CancelToken, 取消后回放提前结束
+    """
+
+    def __init__(self, spin_ms=None, clock=time.perf_counter, sleep=None, cancel_token=None):
+        if spin_ms is None:
+            spin_ms = CONFIG_STORE.get("sequence_spin_ms", DEFAULT_SPIN_MS)
+        self.spin = max(0.0, float(spin_ms)) / 1000.0
+        self.clock = clock
+        self.sleep = sleep
+        self.cancel_token = cancel_token
+
+    def wait_until(self, deadline):
+        """
+        等待到截止时刻: 先粗睡眠, 剩余不足自旋预算时忙等
+
+        Returns:
+            bool: 到达截止时刻返回 True, 被取消返回 False
+        """
+        clock = self.clock
+        token = self.cancel_token
+        while True:
+            remaining = deadline - clock()
+            if remaining <= 0:
+                return True
+            if remaining > self.spin:
+                if token is not None:
+                    if not token.wait_until(deadline - self.spin, clock, self.sleep):
+                        return False
+                else:
+                    (self.sleep or time.sleep)(remaining - self.spin)
+            # 否则继续自旋
+
+    def run(self, events, fire, lead=None, start=None):
+        """
+        按事件时间依次触发
+
+        Args:
+            events: (time, ...) 元组序列, time 为相对起点的秒数
+            fire: 回调 fire(index, event), 返回 False 时中止回放
+            lead: 可选的无参函数, 返回当前应提前触发的秒数 (每个时间点取一次)
+            start: 回放起点 (调度器时钟), 默认为调用时刻; 与回放同步的其他组件 (路径点校验) 共用同一起点
+
+        Returns:
+            PlaybackResult
+        """
+        lateness = []
+        compensation = []
+        completed = True
+        with high_resolution_timer():
+            if start is None:
+                start = self.clock()
+            last_time = None
+            deadline = start
+            late = 0.0
+            shift = 0.0
+            for i, event in enumerate(events):
+                if event[0] != last_time:
+                    # 新的时间点: 等待截止时刻; 同一时刻的后续事件直接触发
+                    last_time = event[0]
+                    planned = start + last_time
+                    # 提前量不会使事件早于上一个时间点 (保持事件顺序)
+                    deadline = max(deadline, planned - lead()) if lead is not None else planned
+                    shift = planned - deadline
+                    if not self.wait_until(deadline):
+                        completed = False
+                        break
+                    late = self.clock() - deadline
+                lateness.append(late)
+                compensation.append(shift)
+                if fire(i, event) is False:
+                    completed = False
+                    break
+            elapsed = self.clock() - start
+        return PlaybackResult(start, lateness, elapsed, completed, compensation)
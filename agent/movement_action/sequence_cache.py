@@ -0,0 +1,455 @@
+"""
+动作序列编译缓存
+
+说明:
+- Agent 启动后在后台对 agent/action_json 建立一次索引 (序列名 -> 来源), 并预编译全部序列;
+  索引建立完成前执行的序列在 resolve() 中等待 (或就地建立索引), 不会退回未索引的查找
+- 来源可以是 JSON 文件、紧凑二进制 .seqb 文件或 library.madlib 序列库中的条目
+  (同名时序列库优先于独立文件)
+- 编译结果的名称统一为序列名 (文件名去扩展名 / 序列库条目名), 时序统计按此归并
+- 每个序列被编译为经过校验的 (time, type, vk) 时间线, 执行时无需再解析/转换
+- 缓存键为 (来源, mtime, 闪避键), 文件被修改或闪避键变化时自动失效
+- 条目数量超过上限时按 LRU 淘汰
+- 多个序列可拼接为一条组合时间线 (get_composite), 组成部分重新编译后组合自动重建
+- JSON 中可选的 "waypoints" (路径点校验) 随序列一起编译
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import keycodes
+
+# 导入配置存储 (读取快照)
+from config_store import CONFIG_STORE
+
+from .waypoints import parse_waypoints
+
+logger = logging.getLogger(__name__)
+
+
+# 编译后的事件类型 (整数, 避免执行时的字符串比较)
+KEY_DOWN = 0
+KEY_UP = 1
+
+EVENT_TYPES = {
+    "key_down": KEY_DOWN,
+    "key_up": KEY_UP,
+}
+EVENT_NAMES = {v: k for k, v in EVENT_TYPES.items()}
+
+
+########################
+# 键名/方向 -> VK 辅助
+########################
+
+def _char_to_vk(ch: str) -> int:
+    if len(ch) != 1:
+        raise ValueError(f"char 必须是单个字符: {ch}")
+    return ord(ch.upper())
+
+def _name_to_vk(name: str, dodge_vk: int) -> int:
+    n = name.lower()
+    special = {
+        "shift": dodge_vk,  # shift 按 JSON 语义映射为配置的闪避键
+        "ctrl": keycodes.VK_CONTROL,
+        "alt": keycodes.VK_MENU,
+        "space": keycodes.VK_SPACE,
+        "enter": keycodes.VK_RETURN,
+        "esc": keycodes.VK_ESCAPE,
+        "tab": keycodes.VK_TAB,
+        "up": keycodes.VK_UP,
+        "down": keycodes.VK_DOWN,
+        "left": keycodes.VK_LEFT,
+        "right": keycodes.VK_RIGHT,
+    }
+    if n in special:
+        return special[n]
+    if len(name) == 1:
+        return _char_to_vk(name)
+    raise ValueError(f"不支持的按键: {name}")
+
+
+def default_action_dir():
+    """默认序列目录: 运行时工作目录下的 agent/action_json"""
+    return os.path.join(os.getcwd(), 'agent', 'action_json')
+
+
+class CompiledSequence:
+    """
+    编译后的动作序列
+
+    events 为按原顺序排列的 (time, type, vk) 元组, type 为 KEY_DOWN / KEY_UP;
+    waypoints 为 (time, 识别节点名) 元组, 按时间排序
+    """
+
+    __slots__ = ("name", "path", "total_time", "dodge_vk", "events", "waypoints")
+
+    def __init__(self, name, path, total_time, dodge_vk, events, waypoints=()):
+        self.name = name
+        self.path = path
+        self.total_time = total_time
+        self.dodge_vk = dodge_vk
+        self.events = events
+        self.waypoints = waypoints
+
+    def __len__(self):
+        return len(self.events)
+
+
+def route_name(path):
+    """来源文件对应的序列名: 文件名去扩展名 (与 Pipeline 中的写法及序列库条目名一致)"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def compile_sequence(sequence_data, dodge_vk, path=None):
+    """
+    将 JSON 序列数据编译为 CompiledSequence
+
+    Args:
+        sequence_data: JSON 解析后的序列字典 (含 name / total_time / actions)
+        dodge_vk: 闪避键虚拟键码, JSON 中的 "shift" 映射到此键
+        path: 来源文件路径; 给出时序列名取自文件名 (route_name), 否则取 JSON 中的 "name"
+
+    Returns:
+        CompiledSequence
+
+    Raises:
+        ValueError: 序列为空或存在非法动作
+    """
+    name = route_name(path) if path else sequence_data.get("name", "未知序列")
+    actions = sequence_data.get("actions", [])
+    if not actions:
+        raise ValueError(f"JSON文件中没有动作序列: {name}")
+
+    events = []
+    for i, action in enumerate(actions):
+        action_type = action.get("type")
+        if action_type not in EVENT_TYPES:
+            raise ValueError(f"动作 {i + 1}: 不支持的操作类型: {action_type}")
+
+        action_time = action.get("time")
+        if not isinstance(action_time, (int, float)) or action_time < 0:
+            raise ValueError(f"动作 {i + 1}: 非法的时间: {action_time}")
+
+        key = action.get("key")
+        if isinstance(key, str):
+            vk = _name_to_vk(key, dodge_vk)
+        elif isinstance(key, int):
+            vk = key
+        else:
+            raise ValueError(f"动作 {i + 1}: 不支持的键类型: {key}")
+
+        events.append((float(action_time), EVENT_TYPES[action_type], vk))
+
+    waypoints = parse_waypoints(sequence_data.get("waypoints", []))
+
+    total_time = sequence_data.get("total_time", events[-1][0])
+    return CompiledSequence(name, path, float(total_time), dodge_vk, tuple(events), waypoints)
+
+
+def compose_sequences(parts):
+    """
+    将多个编译后的序列按顺序拼接为一条连续时间线
+
+    后一部分从前一部分的 total_time + gap 开始; 拼接处同一时刻 "松开后立即按下" 同一按键的
+    事件对被抵消, 按键在边界上保持按住
+
+    Args:
+        parts: [(CompiledSequence, repeat, gap), ...], gap 为该部分每次播放后的间隔 (秒)
+
+    Returns:
+        CompiledSequence
+
+    Raises:
+        ValueError: parts 为空
+    """
+    if not parts:
+        raise ValueError("组合序列为空")
+
+    events = []
+    waypoints = []
+    names = []
+    offset = 0.0
+    seam_start = 0  # 上一部分在 events 中的起始下标
+    for compiled, repeat, gap in parts:
+        names.append(compiled.name if repeat == 1 else f"{compiled.name}x{repeat}")
+        for _ in range(repeat):
+            seam_events = [(offset + t, action_type, vk) for t, action_type, vk in compiled.events]
+            if events and seam_events:
+                _merge_seam(events, seam_events, offset, seam_start)
+            seam_start = len(events)
+            events.extend(seam_events)
+            waypoints.extend((offset + t, node) for t, node in compiled.waypoints)
+            offset += compiled.total_time + gap
+
+    total_time = offset - parts[-1][2]
+    first = parts[0][0]
+    return CompiledSequence(" + ".join(names), None, total_time, first.dodge_vk, tuple(events), tuple(waypoints))
+
+
+def _merge_seam(events, next_events, seam, start):
+    """抵消拼接处同一时刻的 key_up(k) (前一部分) 与 key_down(k) (后一部分)"""
+    released = {}
+    for i in range(len(events) - 1, start - 1, -1):
+        t, action_type, vk = events[i]
+        if t < seam:
+            break
+        if action_type == KEY_UP and vk not in released:
+            released[vk] = i
+    if not released:
+        return
+    drop = []
+    for j, (t, action_type, vk) in enumerate(next_events):
+        if t > seam:
+            break
+        if action_type == KEY_DOWN and vk in released:
+            drop.append((released.pop(vk), j))
+    for i, j in sorted(drop, reverse=True):
+        del events[i]
+    for _, j in sorted(drop, key=lambda d: d[1], reverse=True):
+        del next_events[j]
+
+
+class SequenceCache:
+    """
+    动作序列编译缓存 (线程安全)
+
+    使用方式:
+        SEQUENCE_CACHE.build_index()            # Agent 启动时在后台预热中调用一次
+        path, entry = SEQUENCE_CACHE.resolve("jj_60_part1_1")  # 索引尚未建立时等待 / 就地建立
+        compiled = SEQUENCE_CACHE.get(path, entry)
+
+    entry 为序列库中的条目名, 独立文件 (JSON / .seqb) 时为 None
+
+    来源优先级: 目录中有 library.madlib 时, 库中的序列优先于同名的 JSON / .seqb 文件
+    ("jj_60_part1_1" / "jj_60_part1_1.json" / "jj_60_part1_1.seqb" 均解析到库中的条目);
+    修改 JSON 后需重新打包, 否则仍回放库中的版本 (库中不含 JSON 的 waypoints, 需要时通过
+    custom_action_param 提供)。库中没有的序列使用独立文件, .json 优先于 .seqb
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (path, entry, mtime, dodge_vk) -> CompiledSequence
+        self._index = {}  # 序列名 (含/不含扩展名) -> (完整路径, 序列库条目名或 None)
+        self._indexed = False
+        self._index_lock = threading.Lock()  # 串行化索引建立 (后台预热与首次使用)
+        self._composites = OrderedDict()  # ((来源, repeat, gap), ...) -> (组成部分, 组合序列)
+        self._dodge_vk = None
+        self.hits = 0
+        self.misses = 0
+
+    def build_index(self, action_dir=None, warm=True):
+        """
+        扫描序列目录建立索引, 可选预编译全部序列
+
+        Args:
+            action_dir: 序列目录, 默认为 cwd/agent/action_json
+            warm: 是否立即按当前闪避键预编译
+
+        Returns:
+            int: 索引到的序列数量
+        """
+        with self._index_lock:
+            count = self._build_index(action_dir)
+        if warm:
+            self.warm()
+        return count
+
+    def ensure_index(self):
+        """
+        确保索引已建立: 后台预热正在建立时等待其完成, 尚未开始时按默认目录就地建立 (不预编译)
+        """
+        if self._indexed:
+            return
+        with self._index_lock:
+            if not self._indexed:
+                self._build_index(None)
+
+    def _build_index(self, action_dir):
+        """扫描序列目录并替换索引 (调用方持有 _index_lock)"""
+        from .packed_sequence import PACKED_SUFFIX, LIBRARY_FILE_NAME, open_library
+
+        action_dir = action_dir or default_action_dir()
+        index = {}
+        try:
+            fnames = sorted(os.listdir(action_dir))
+        except OSError as e:
+            logger.warning(f"[SequenceCache] 无法建立索引, 目录不可用: {action_dir} ({e})")
+            fnames = []
+
+        # 序列库优先: 库中的条目同时登记为 <名称> / <名称>.json / <名称>.seqb (Pipeline 中的写法),
+        # 独立文件只在序列库中没有同名序列时使用
+        library_names = set()
+        library_mtime = None
+        if LIBRARY_FILE_NAME in fnames:
+            library_path = os.path.join(action_dir, LIBRARY_FILE_NAME)
+            try:
+                library_mtime = os.path.getmtime(library_path)
+                for name in open_library(library_path).names():
+                    source = (library_path, name)
+                    library_names.add(name)
+                    for alias in (name, name + '.json', name + PACKED_SUFFIX):
+                        index[alias] = source
+            except Exception as e:
+                logger.warning(f"[SequenceCache] 序列库不可用: {library_path} ({e})")
+
+        # .seqb 与 .json 同名时以 .json 为准 (排序后 .json 在后)
+        stale = []
+        for fname in sorted(fnames, key=lambda n: n.lower().endswith('.json')):
+            stem, ext = os.path.splitext(fname)
+            if ext.lower() not in ('.json', PACKED_SUFFIX):
+                continue
+            path = os.path.join(action_dir, fname)
+            if stem in library_names:
+                # 已由序列库提供 (不登记, 预编译时也不再解析)
+                try:
+                    if os.path.getmtime(path) > library_mtime:
+                        stale.append(fname)
+                except OSError:
+                    pass
+                continue
+            source = (path, None)
+            index[fname] = source
+            index[stem] = source
+
+        if stale:
+            logger.warning(f"[SequenceCache] 以下文件比序列库新, 仍使用序列库中的版本 "
+                           f"(请运行 tools/pack_action_json.py 重新打包): {stale}")
+
+        with self._lock:
+            self._index = index
+        self._indexed = True
+
+        count = len(set(index.values()))
+        logger.info(f"[SequenceCache] 已索引 {count} 个动作序列: {action_dir}")
+        return count
+
+    def resolve(self, name):
+        """按序列名查找索引中的 (路径, 条目名), 未命中返回 None (索引尚未建立时先等待 / 建立)"""
+        self.ensure_index()
+        with self._lock:
+            return self._index.get(name)
+
+    def warm(self):
+        """按当前闪避键预编译索引中的全部序列"""
+        with self._lock:
+            sources = sorted(set(self._index.values()), key=lambda s: (s[0], s[1] or ""))
+        for path, entry in sources:
+            try:
+                self.get(path, entry)
+            except Exception as e:
+                logger.warning(f"[SequenceCache] 预编译失败: {path} {entry or ''} ({e})")
+
+    def get(self, path, entry=None, config=None):
+        """
+        获取编译后的序列, 未命中时从文件加载并编译
+
+        Args:
+            path: JSON / .seqb 文件路径, 或序列库路径
+            entry: 序列库中的条目名 (path 为序列库时必填)
+            config: 配置快照 (闪避键), 默认读取 CONFIG_STORE
+
+        Raises:
+            OSError / ValueError: 文件不可读或序列非法
+        """
+        mtime = os.stat(path).st_mtime_ns
+        source = config if config is not None else CONFIG_STORE
+        dodge_vk = source.get("dodge_key", keycodes.VK_SHIFT)
+
+        with self._lock:
+            if dodge_vk != self._dodge_vk:
+                # 闪避键变化: 旧条目全部失效
+                if self._entries:
+                    logger.debug(f"[SequenceCache] 闪避键变化 -> VK=0x{dodge_vk:02X}, 清空 {len(self._entries)} 个条目")
+                self._entries.clear()
+                self._dodge_vk = dodge_vk
+
+            key = (path, entry, mtime, dodge_vk)
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = self._load(path, entry, dodge_vk)
+
+        with self._lock:
+            # 同一来源的旧版本 (mtime 不同) 直接移除
+            for stale in [k for k in self._entries if k[:2] == (path, entry)]:
+                del self._entries[stale]
+            if dodge_vk == self._dodge_vk:
+                self._entries[key] = compiled
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        logger.debug(f"[SequenceCache] 编译序列: {compiled.name} ({len(compiled)} 个动作) <- {path}")
+        return compiled
+
+    def get_composite(self, specs, config=None):
+        """
+        获取组合序列: 各部分按 get() 取得, 组合结果缓存到任一部分重新编译为止
+
+        Args:
+            specs: [((path, entry), repeat, gap), ...]
+            config: 配置快照 (闪避键), 各部分共用同一份, 默认取一次 CONFIG_STORE 快照
+
+        Raises:
+            OSError / ValueError: 任一部分不可读或非法
+        """
+        key = tuple((tuple(source), repeat, gap) for source, repeat, gap in specs)
+        if config is None:
+            config = CONFIG_STORE.snapshot()
+        parts = tuple(self.get(*source, config=config) for source, _, _ in key)
+
+        with self._lock:
+            cached = self._composites.get(key)
+            if cached is not None and all(a is b for a, b in zip(cached[0], parts)):
+                self._composites.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        composite = compose_sequences([(part, repeat, gap) for part, (_, repeat, gap) in zip(parts, key)])
+        with self._lock:
+            self._composites[key] = (parts, composite)
+            while len(self._composites) > self.max_entries:
+                self._composites.popitem(last=False)
+        logger.debug(f"[SequenceCache] 组合序列: {composite.name} ({len(composite)} 个动作)")
+        return composite
+
+    def _load(self, path, entry, dodge_vk):
+        """按来源类型加载并编译"""
+        from .packed_sequence import PACKED_SUFFIX, load_packed_file, open_library
+
+        if entry is not None:
+            return open_library(path).compile(entry, dodge_vk)
+        if path.lower().endswith(PACKED_SUFFIX):
+            return load_packed_file(path, dodge_vk)
+        with open(path, 'r', encoding='utf-8') as f:
+            sequence_data = json.load(f)
+        return compile_sequence(sequence_data, dodge_vk, path)
+
+    def set_dodge_key(self, dodge_vk):
+        """闪避键变更时调用: 使缓存失效并按新闪避键重新预编译"""
+        with self._lock:
+            if dodge_vk == self._dodge_vk:
+                return
+            self._entries.clear()
+            self._composites.clear()
+            self._dodge_vk = dodge_vk
+        self.warm()
+
+    def invalidate(self):
+        """清空全部编译条目 (保留索引)"""
+        with self._lock:
+            self._entries.clear()
+            self._composites.clear()
+
+
+# 全局序列缓存
+SEQUENCE_CACHE = SequenceCache()
@@ -0,0 +1,170 @@
+"""
+动作序列离线优化器 (action_json 格式)
+
+优化步骤 (按顺序):
+1. 合并同一按键的重叠按住: 已按住时的重复 key_down 与未按住时的 key_up 被丢弃
+2. 合并短暂松开后又按下的同一按键 (间隔 <= merge_gap)
+3. 丢弃按住时长 <= min_hold 的无效按下/松开对
+4. (可选) 压缩中间空闲段: 无任何按键按住的间隔按 idle_ratio 缩短, 不短于 min_idle
+5. 裁剪首尾空闲: 第一个事件移到 lead 秒, total_time 收紧到最后一个事件
+
+仅在“无按键按住”的区间内移动时间, 按住期间的相对时序 (即移动距离) 保持不变。
+"""
+
+import copy
+
+
+class OptimizeReport:
+    """单个序列的优化结果统计"""
+
+    __slots__ = ("name", "original_time", "optimized_time", "original_events", "optimized_events")
+
+    def __init__(self, name, original_time, optimized_time, original_events, optimized_events):
+        self.name = name
+        self.original_time = original_time
+        self.optimized_time = optimized_time
+        self.original_events = original_events
+        self.optimized_events = optimized_events
+
+    @property
+    def saved(self):
+        return self.original_time - self.optimized_time
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "original_time": round(self.original_time, 6),
+            "optimized_time": round(self.optimized_time, 6),
+            "saved": round(self.saved, 6),
+            "original_events": self.original_events,
+            "optimized_events": self.optimized_events,
+        }
+
+
+def _key_id(key):
+    return key.lower() if isinstance(key, str) else key
+
+
+def _merge_overlaps(actions):
+    """
+    按键盘语义合并同一按键的重叠按住:
+    已按住时的 key_down 只是重复按下 (丢弃), 第一个 key_up 即松开, 未按住时的 key_up 无效 (丢弃)
+    """
+    held = set()
+    result = []
+    for action in actions:
+        k = _key_id(action["key"])
+        if action["type"] == "key_down":
+            if k not in held:
+                held.add(k)
+                result.append(action)
+        elif k in held:
+            held.discard(k)
+            result.append(action)
+    return result
+
+
+def _pair_holds(actions):
+    """返回 [(down_index, up_index 或 None)], 要求输入已去除重叠"""
+    open_downs = {}
+    pairs = []
+    for i, action in enumerate(actions):
+        k = _key_id(action["key"])
+        if action["type"] == "key_down":
+            open_downs[k] = len(pairs)
+            pairs.append([i, None])
+        else:
+            pairs[open_downs.pop(k)][1] = i
+    return pairs
+
+
+def _merge_repress(actions, merge_gap):
+    """松开后 merge_gap 秒内又按下同一按键: 视为一直按住"""
+    if merge_gap <= 0:
+        return actions
+    drop = set()
+    last_up = {}  # 按键 -> 最近一次 key_up 的下标
+    for i, action in enumerate(actions):
+        k = _key_id(action["key"])
+        if action["type"] == "key_up":
+            last_up[k] = i
+        elif k in last_up:
+            j = last_up.pop(k)
+            if action["time"] - actions[j]["time"] <= merge_gap:
+                drop.add(j)
+                drop.add(i)
+    return [a for i, a in enumerate(actions) if i not in drop]
+
+
+def _drop_empty_holds(actions, min_hold):
+    drop = set()
+    for down, up in _pair_holds(actions):
+        if up is not None and actions[up]["time"] - actions[down]["time"] <= min_hold:
+            drop.add(down)
+            drop.add(up)
+    return [a for i, a in enumerate(actions) if i not in drop]
+
+
+def _compress_idle(actions, idle_ratio, min_idle):
+    """缩短无按键按住的中间间隔: 新间隔 = max(min_idle, 原间隔 * idle_ratio)"""
+    held = set()
+    shift = 0.0
+    result = []
+    prev_time = None
+    for action in actions:
+        t = action["time"]
+        if prev_time is not None and not held:
+            gap = t - prev_time
+            if gap > min_idle:
+                shift += gap - max(min_idle, gap * idle_ratio)
+        prev_time = t
+        new_action = dict(action)
+        new_action["time"] = t - shift
+        result.append(new_action)
+
+        k = _key_id(action["key"])
+        if action["type"] == "key_down":
+            held.add(k)
+        else:
+            held.discard(k)
+    return result
+
+
+def optimize_sequence(sequence_data, min_hold=0.0, merge_gap=0.0, lead=0.0, idle_ratio=None, min_idle=0.0):
+    """
+    优化一个 action_json 序列
+
+    Args:
+        sequence_data: JSON 序列字典 (不会被修改)
+        min_hold: 按住时长不超过此值 (秒) 的按下/松开对被丢弃
+        merge_gap: 同一按键松开后在此时间 (秒) 内再次按下则合并
+        lead: 第一个事件的起始时间 (秒)
+        idle_ratio: 中间空闲段缩放比例 (0~1), None 表示不压缩
+        min_idle: 压缩后空闲段的最短时长 (秒)
+
+    Returns:
+        (optimized_data, OptimizeReport)
+    """
+    name = sequence_data.get("name", "未知序列")
+    actions = sequence_data.get("actions", [])
+    original_time = float(sequence_data.get("total_time", actions[-1]["time"] if actions else 0.0))
+
+    result = sorted(actions, key=lambda a: a["time"])
+    result = _merge_overlaps(result)
+    result = _merge_repress(result, merge_gap)
+    result = _drop_empty_holds(result, min_hold)
+    if idle_ratio is not None and result:
+        result = _compress_idle(result, max(0.0, min(1.0, idle_ratio)), min_idle)
+
+    if result:
+        offset = max(0.0, result[0]["time"] - max(0.0, lead))
+        result = [dict(a, time=round(a["time"] - offset, 6)) for a in result]
+        optimized_time = result[-1]["time"]
+    else:
+        optimized_time = 0.0
+
+    optimized = copy.deepcopy(sequence_data)
+    optimized["actions"] = result
+    optimized["total_time"] = optimized_time
+    report = OptimizeReport(name, original_time, optimized_time, len(actions), len(result))
+    return optimized, report
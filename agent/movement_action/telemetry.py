@@ -0,0 +1,192 @@
+"""
+动作序列回放时序遥测
+
+说明:
+- 每次回放记录每个事件的 计划时间 / 派发时间 / Job 完成时间 (紧凑 array('d'), 相对回放起点, 秒)
+- 启用延迟补偿时另记录每个事件的提前量, 派发时间因此可能早于计划时间
+- 每个序列输出迟到时间 (派发 - 计划) 的 p50/p95/p99
+- 记录追加写入日志目录下的 sequence_timing.jsonl, 便于离线分析
+  (超过 tools.RECORD_MAX_BYTES 时滚动压缩为 sequence_timing.jsonl.1.gz ...);
+  被停止或出错的回放同样记录, outcome 字段区分 completed / stopped / error
+- 进程内按序列名跨多次回放汇总, 并导出迟到时间直方图
+"""
+
+import logging
+import math
+import os
+import threading
+from array import array
+from collections import deque
+from datetime import datetime
+
+from tools import LOG_DIR, append_record
+
+logger = logging.getLogger(__name__)
+
+TIMING_FILE_NAME = "sequence_timing.jsonl"
+
+# 回放结果 (记录中的 outcome 字段)
+OUTCOME_COMPLETED = "completed"
+OUTCOME_STOPPED = "stopped"
+OUTCOME_ERROR = "error"
+
+# 直方图分桶上界 (毫秒), 最后一个桶收纳其余全部
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# 每个序列在内存中保留的迟到样本数上限
+MAX_SAMPLES_PER_SEQUENCE = 5000
+
+
+def percentile(values, p):
+    """线性插值百分位数, values 为空时返回 nan"""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * p / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def histogram(values_ms):
+    """按 HISTOGRAM_BOUNDS_MS 分桶计数, 返回 [(标签, 数量), ...]"""
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for v in values_ms:
+        for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if v < bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<{b}ms" for b in HISTOGRAM_BOUNDS_MS] + [f">={HISTOGRAM_BOUNDS_MS[-1]}ms"]
+    return list(zip(labels, counts))
+
+
+class PlaybackTiming:
+    """
+    一次回放的逐事件时序记录
+
+    planned / dispatched / completed 均为相对回放起点的秒数, 未完成的事件为 nan;
+    compensation 为每个事件的延迟补偿提前量 (秒)
+    """
+
+    __slots__ = ("sequence_name", "planned", "dispatched", "completed", "compensation")
+
+    def __init__(self, sequence_name, planned, dispatched, completed, compensation=None):
+        self.sequence_name = sequence_name
+        self.planned = array('d', planned)
+        self.dispatched = array('d', dispatched)
+        self.completed = array('d', completed)
+        self.compensation = array('d', compensation if compensation is not None else [0.0] * len(self.planned))
+
+    @classmethod
+    def from_playback(cls, sequence_name, events, start, posted_at, completed_at, compensation=None):
+        """
+        由调度结果与派发器记录构造
+
+        Args:
+            events: (time, ...) 事件序列
+            start: 回放起点 (与 posted_at / completed_at 同一时钟)
+            posted_at / completed_at: 事件序号 -> 绝对时刻
+            compensation: 每个已触发事件的提前量 (秒), 可选
+        """
+        n = len(events)
+        planned = [e[0] for e in events]
+        dispatched = [posted_at[i] - start if i in posted_at else math.nan for i in range(n)]
+        completed = [completed_at[i] - start if i in completed_at else math.nan for i in range(n)]
+        if compensation is not None:
+            compensation = list(compensation) + [0.0] * (n - len(compensation))
+        return cls(sequence_name, planned, dispatched, completed, compensation)
+
+    def lateness(self):
+        """每个已派发事件的迟到时间 (秒)"""
+        return [d - p for p, d in zip(self.planned, self.dispatched) if not math.isnan(d)]
+
+    def completion_latency(self):
+        """每个已完成事件的 Job 往返时间 (秒)"""
+        return [c - d for d, c in zip(self.dispatched, self.completed)
+                if not math.isnan(d) and not math.isnan(c)]
+
+    def effective_error(self):
+        """每个已完成事件的生效误差 (秒): Job 完成时刻 - 计划时刻, 补偿理想时接近 0"""
+        return [c - p for p, c in zip(self.planned, self.completed) if not math.isnan(c)]
+
+    def to_record(self, outcome=OUTCOME_COMPLETED):
+        late = self.lateness()
+        rtt = self.completion_latency()
+        comp = list(self.compensation)
+
+        def r(v):
+            return None if math.isnan(v) else round(v, 6)
+
+        return {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "sequence": self.sequence_name,
+            "outcome": outcome,
+            "p50_ms": r(percentile(late, 50) * 1000),
+            "p95_ms": r(percentile(late, 95) * 1000),
+            "p99_ms": r(percentile(late, 99) * 1000),
+            "rtt_p50_ms": r(percentile(rtt, 50) * 1000),
+            "compensation_ms": r(sum(comp) / len(comp) * 1000) if comp else 0.0,
+            "events": [[r(p), r(d), r(c)] for p, d, c in zip(self.planned, self.dispatched, self.completed)],
+        }
+
+
+class TimingRecorder:
+    """
+    回放时序汇总器 (线程安全)
+
+    record() 写入 JSONL 并更新进程内汇总; summary() 返回跨回放的统计
+    """
+
+    def __init__(self, log_dir=LOG_DIR, file_name=TIMING_FILE_NAME):
+        self.path = os.path.join(log_dir, file_name)
+        self._lock = threading.Lock()
+        self._samples = {}  # 序列名 -> deque[迟到毫秒]
+        self._runs = {}  # 序列名 -> 回放次数
+
+    def record(self, timing, outcome=OUTCOME_COMPLETED):
+        """记录一次回放 (outcome: completed / stopped / error), 返回该次的 JSON 记录"""
+        record = timing.to_record(outcome)
+        late_ms = [v * 1000 for v in timing.lateness()]
+
+        with self._lock:
+            samples = self._samples.setdefault(timing.sequence_name, deque(maxlen=MAX_SAMPLES_PER_SEQUENCE))
+            samples.extend(late_ms)
+            self._runs[timing.sequence_name] = self._runs.get(timing.sequence_name, 0) + 1
+            try:
+                append_record(self.path, record)
+            except OSError as e:
+                logger.warning(f"[TimingRecorder] 写入时序文件失败: {e}")
+        return record
+
+    def summary(self, sequence_name):
+        """
+        跨回放汇总
+
+        Returns:
+            dict: runs / samples / p50_ms / p95_ms / p99_ms / histogram, 无记录时返回 None
+        """
+        with self._lock:
+            samples = list(self._samples.get(sequence_name, ()))
+            runs = self._runs.get(sequence_name, 0)
+        if not samples:
+            return None
+        return {
+            "runs": runs,
+            "samples": len(samples),
+            "p50_ms": percentile(samples, 50),
+            "p95_ms": percentile(samples, 95),
+            "p99_ms": percentile(samples, 99),
+            "histogram": histogram(samples),
+        }
+
+    def sequence_names(self):
+        with self._lock:
+            return sorted(self._runs)
+
+
+# 全局时序记录器
+TIMING_RECORDER = TimingRecorder()
@@ -0,0 +1,163 @@
+"""
+动作序列路径点校验 (闭环回放)
+
+说明:
+- 路径点 = (相对回放起点的时间, Pipeline 识别节点名)
+- WaypointMonitor 在后台线程中于每个路径点时刻截图并调用 context.run_recognition,
+  不阻塞按键时间线
+- 未命中时按策略处理: abort (取消回放) / continue (仅记录); correct 策略由调用方在
+  回放中止后执行纠正序列
+- 时间以调度器的回放起点为基准 (start 传入同一起点); 回放完成后, 晚于最后一个按键的路径点
+  在 stop(drain=True) 时立即校验, 回放被停止时剩余路径点记入 unchecked
+- 路径点可写在序列 JSON 中 ("waypoints" 字段), 也可由 custom_action_param 覆盖
+"""
+
+import logging
+import threading
+import time
+
+from cancellation import CancelToken
+from frame_service import FRAME_SERVICE
+from recognition_memo import memo_recognition
+
+logger = logging.getLogger(__name__)
+
+# 未命中处理策略
+ON_MISS_ABORT = "abort"
+ON_MISS_CONTINUE = "continue"
+ON_MISS_CORRECT = "correct"
+ON_MISS_POLICIES = (ON_MISS_ABORT, ON_MISS_CONTINUE, ON_MISS_CORRECT)
+
+
+def parse_waypoints(items):
+    """
+    校验并规范化路径点列表
+
+    Args:
+        items: [{"time": 秒, "node": 节点名}, ...]
+
+    Returns:
+        tuple[(time, node)]: 按时间排序
+
+    Raises:
+        ValueError: 格式不合法
+    """
+    if not isinstance(items, list):
+        raise ValueError(f"waypoints 必须是数组: {items}")
+    waypoints = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"路径点 {i + 1}: 必须是对象: {item}")
+        t = item.get("time")
+        node = item.get("node")
+        if isinstance(t, bool) or not isinstance(t, (int, float)) or t < 0:
+            raise ValueError(f"路径点 {i + 1}: 非法的时间: {t}")
+        if not node or not isinstance(node, str):
+            raise ValueError(f"路径点 {i + 1}: 缺少识别节点 (node): {item}")
+        waypoints.append((float(t), node))
+    return tuple(sorted(waypoints))
+
+
+class WaypointResult:
+    """单个路径点的校验结果 (时间均相对回放起点, 秒)"""
+
+    __slots__ = ("time", "node", "captured_at", "hit", "duration")
+
+    def __init__(self, time, node, captured_at, hit, duration):
+        self.time = time
+        self.node = node
+        self.captured_at = captured_at
+        self.hit = hit
+        self.duration = duration
+
+    def __str__(self):
+        state = "命中" if self.hit else "未命中"
+        return (f"{self.node} @{self.time:.2f}s: {state} "
+                f"(截图 {self.captured_at:.3f}s, 识别 {self.duration * 1000:.0f}ms)")
+
+
+class WaypointMonitor:
+    """
+    路径点校验线程
+
+    使用方式:
+        monitor = WaypointMonitor(context, waypoints, abort_on_miss=True)
+        start = clock()
+        monitor.start(playback_token, start)    # 与回放使用同一起点
+        ...回放 (scheduler.run(..., start=start))...
+        monitor.stop(drain=completed)            # 回放完成时校验剩余路径点
+        if monitor.missed: ...
+        if monitor.unchecked: ...
+
+    Args:
+        context: MaaFramework Context
+        waypoints: parse_waypoints() 的结果
+        abort_on_miss: 未命中时是否取消 playback_token
+        clock: 与回放一致的时钟函数
+    """
+
+    def __init__(self, context, waypoints, abort_on_miss=True, clock=time.perf_counter):
+        self.context = context
+        self.waypoints = waypoints
+        self.abort_on_miss = abort_on_miss
+        self.clock = clock
+        self.results = []
+        self.missed = None  # 第一个未命中的 WaypointResult
+        self.unchecked = []  # 未校验的路径点 [(time, node)] (回放被停止 / 未命中中止)
+        self._stop = CancelToken()
+        self._drain = False
+        self._thread = None
+
+    def start(self, playback_token, start=None):
+        """开始校验; start 为回放起点 (与调度器同一时钟), 默认为调用时刻"""
+        self._playback_token = playback_token
+        self._start = start if start is not None else self.clock()
+        self._thread = threading.Thread(target=self._run, name="WaypointMonitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0, drain=False):
+        """
+        停止校验线程 (正在进行的识别会先完成)
+
+        Args:
+            drain: 回放已完成时为 True: 尚未到时刻的路径点立即依次校验 (画面即回放结束后的状态);
+                为 False 时剩余路径点记入 unchecked
+        """
+        self._drain = drain
+        self._stop.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("[WaypointMonitor] 等待识别结束超时")
+
+    def _run(self):
+        controller = self.context.tasker.controller
+        for i, (t, node) in enumerate(self.waypoints):
+            if not self._stop.wait_until(self._start + t, self.clock) and not self._drain:
+                self.unchecked = list(self.waypoints[i:])
+                return
+            try:
+                frame = FRAME_SERVICE.get(controller, max_age_ms=0)
+                captured_at = self.clock() - self._start
+                image = frame.image if frame is not None else controller.cached_image
+                begin = time.perf_counter()
+                detail = memo_recognition(self.context, node, image)
+                duration = time.perf_counter() - begin
+                hit = bool(getattr(detail, "hit", False))
+            except Exception as e:
+                logger.error(f"[WaypointMonitor] 路径点 {node} 识别异常: {e}")
+                captured_at, duration, hit = self.clock() - self._start, 0.0, False
+
+            result = WaypointResult(t, node, captured_at, hit, duration)
+            self.results.append(result)
+            if hit:
+                logger.debug(f"[WaypointMonitor] {result}")
+                continue
+
+            logger.warning(f"[WaypointMonitor] {result}")
+            if self.missed is None:
+                self.missed = result
+            if self.abort_on_miss:
+                self._playback_token.cancel()
+                self.unchecked = list(self.waypoints[i + 1:])
+                return
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+多目标并发识别
+
+说明:
+- 对同一帧截图, 多个目标节点的 context.run_recognition 在有界线程池中并发执行
+- 第一个命中的节点胜出: 尚未开始的识别被取消, 正在进行的识别结果被忽略
+- 每个节点的识别耗时计入 RECOGNITION_STATS, 单次检测耗时取决于最慢的识别器而不是总和
+- 线程池大小由 recognition_workers 配置 (首次使用时创建), 进程内共享
+- frame_gate 开启时经 FRAME_GATE 识别: 画面未变化的节点直接复用上一次结果,
+  跳过的识别不计入耗时统计
+- 配置取自调用方传入的快照 (AutoBattle 每轮一份), 未传入时每次检测取一次 CONFIG_STORE 快照
+- 实际识别经 RECOGNITION_MEMO (内容完全相同的画面直接返回缓存结果)
+"""
+
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# 导入全局配置
+from config_store import CONFIG_STORE
+from frame_gate import FRAME_GATE
+from recognition_memo import memo_recognition
+
+logger = logging.getLogger(__name__)
+
+# 默认识别线程数
+DEFAULT_WORKERS = 4
+
+
+def is_hit(detail):
+    """RecognitionDetail.hit 表示是否命中; 旧版本返回 None 表示未命中"""
+    return bool(getattr(detail, "hit", False))
+
+
+class RecognitionStats:
+    """
+    各节点识别耗时统计 (线程安全)
+
+    每个节点记录: 次数 / 命中次数 / 总耗时 / 最大耗时 / 最近一次耗时 (秒)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes = {}
+
+    def record(self, node, duration, hit):
+        with self._lock:
+            s = self._nodes.setdefault(node, {"count": 0, "hits": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+            s["count"] += 1
+            s["hits"] += int(hit)
+            s["total"] += duration
+            s["max"] = max(s["max"], duration)
+            s["last"] = duration
+
+    def summary(self, node):
+        """返回 {count, hits, mean_ms, max_ms, last_ms}, 无记录时返回 None"""
+        with self._lock:
+            s = self._nodes.get(node)
+            if s is None:
+                return None
+            return {
+                "count": s["count"],
+                "hits": s["hits"],
+                "mean_ms": s["total"] / s["count"] * 1000,
+                "max_ms": s["max"] * 1000,
+                "last_ms": s["last"] * 1000,
+            }
+
+    def nodes(self):
+        with self._lock:
+            return sorted(self._nodes)
+
+
+class TickResult:
+    """
+    一次多目标检测的结果
+
+    node / detail 为胜出的节点与识别结果 (未命中时为 None);
+    durations 为已完成节点的识别耗时 (秒), elapsed 为本次检测的总耗时
+    """
+
+    __slots__ = ("node", "detail", "durations", "elapsed")
+
+    def __init__(self, node, detail, durations, elapsed):
+        self.node = node
+        self.detail = detail
+        self.durations = durations
+        self.elapsed = elapsed
+
+    @property
+    def hit(self):
+        return self.node is not None
+
+    @property
+    def serial_cost(self):
+        """若依次识别所需的耗时 (已完成节点的耗时之和)"""
+        return sum(self.durations.values())
+
+
+class ParallelRecognizer:
+    """
+    有界线程池上的多目标识别
+
+    使用方式:
+        result = RECOGNIZER.first_hit(context, ["common_again", "common_again_template"], image)
+        if result.hit: ...
+    """
+
+    def __init__(self, max_workers=None, stats=None):
+        self._max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.stats = stats or RecognitionStats()
+
+    def _get_executor(self, config):
+        with self._lock:
+            if self._executor is None:
+                workers = self._max_workers or int(config.get("recognition_workers", DEFAULT_WORKERS))
+                self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="Recognition")
+            return self._executor
+
+    def _recognize(self, context, node, image, config):
+        begin = time.perf_counter()
+        evaluated = True
+        try:
+            if config.get("frame_gate", True):
+                run = functools.partial(memo_recognition, config=config)
+                detail, evaluated = FRAME_GATE.recognize(context, node, image, run, config)
+            else:
+                detail = memo_recognition(context, node, image, config=config)
+        except Exception as e:
+            logger.warning(f"[Recognition] 节点 '{node}' 识别异常: {e}")
+            detail = None
+        duration = time.perf_counter() - begin
+        hit = is_hit(detail)
+        if evaluated:
+            self.stats.record(node, duration, hit)
+        return node, detail, duration, hit
+
+    def first_hit(self, context, nodes, image, config=None):
+        """
+        在同一帧上并发识别多个节点, 返回第一个命中的节点
+
+        Args:
+            config: 配置快照, 默认取 CONFIG_STORE 的当前快照
+
+        Returns:
+            TickResult
+        """
+        if config is None:
+            config = CONFIG_STORE.snapshot()
+        begin = time.perf_counter()
+        durations = {}
+        if len(nodes) == 1:
+            # 单个节点无需线程切换
+            node, detail, duration, hit = self._recognize(context, nodes[0], image, config)
+            durations[node] = duration
+            return TickResult(node if hit else None, detail if hit else None, durations,
+                              time.perf_counter() - begin)
+
+        executor = self._get_executor(config)
+        pending = {executor.submit(self._recognize, context, node, image, config) for node in nodes}
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node, detail, duration, hit = future.result()
+                    durations[node] = duration
+                    if hit and winner is None:
+                        winner = (node, detail)
+        finally:
+            # 未开始的识别直接取消, 正在进行的识别在后台结束后被忽略
+            for future in pending:
+                future.cancel()
+
+        elapsed = time.perf_counter() - begin
+        if winner is None:
+            return TickResult(None, None, durations, elapsed)
+        return TickResult(winner[0], winner[1], durations, elapsed)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# 全局识别器 (进程内共享线程池)
+RECOGNIZER = ParallelRecognizer()
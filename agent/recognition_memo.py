@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+识别结果缓存
+
+说明:
+- 包装 context.run_recognition: 以 (节点名, ROI, ROI 内容哈希, pipeline_override) 为键缓存识别结果,
+  同一节点在内容完全相同的画面上重复识别时直接返回缓存结果
+- 与 FRAME_GATE 的区别: 画面门控按节点只保留上一次的感知签名 (容忍微小噪声);
+  本缓存使用精确的内容哈希, 多个节点 / 多个动作共享, 容量有界 (LRU), 条目按 TTL 过期
+- 容量与 TTL 由配置快照提供: recognition_memo_size / recognition_memo_ttl_ms
+- 任意自定义动作都可以使用 memo_recognition(context, node, image) 代替 context.run_recognition
+- 节点定义被覆盖 (pipeline_override / 设置变化) 后调用 RECOGNITION_MEMO.invalidate()
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+# 导入配置存储 (读取快照)
+from config_store import CONFIG_STORE
+from frame_gate import FRAME_GATE
+from tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+# 默认容量与 TTL
+DEFAULT_MEMO_SIZE = 256
+DEFAULT_MEMO_TTL_MS = 2000
+
+
+def content_hash(image, roi=None):
+    """图像 (或 ROI) 像素内容的哈希 (含尺寸), 用于判断画面是否完全相同"""
+    if roi is not None:
+        x, y, w, h = roi
+        height, width = image.shape[:2]
+        image = image[max(0, y):min(height, y + h), max(0, x):min(width, x + w)]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(image.shape).encode())
+    # 切片不连续时 tobytes 会先复制
+    digest.update(image.tobytes())
+    return digest.digest()
+
+
+class RecognitionMemo:
+    """
+    有界 LRU + TTL 的识别结果缓存 (线程安全)
+
+    Args:
+        capacity / ttl: 容量与过期时间 (秒), 默认读取配置快照
+        clock: 单调时钟函数
+    """
+
+    def __init__(self, capacity=None, ttl=None, clock=time.monotonic):
+        self._capacity = capacity
+        self._ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 键 -> (识别结果, 写入时刻)
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+
+    def limits(self, config=None):
+        """(容量, TTL 秒); config 为配置快照, 默认读取 CONFIG_STORE"""
+        source = config if config is not None else CONFIG_STORE
+        capacity = self._capacity
+        if capacity is None:
+            capacity = max(1, int(source.get("recognition_memo_size", DEFAULT_MEMO_SIZE)))
+        ttl = self._ttl
+        if ttl is None:
+            ttl = source.get("recognition_memo_ttl_ms", DEFAULT_MEMO_TTL_MS) / 1000.0
+        return capacity, ttl
+
+    @property
+    def capacity(self):
+        return self.limits()[0]
+
+    @property
+    def ttl(self):
+        return self.limits()[1]
+
+    def recognize(self, context, node, image, pipeline_override=None, config=None):
+        """
+        识别节点; 同一键的结果未过期时直接返回
+
+        Args:
+            config: 配置快照 (容量 / TTL), 默认读取 CONFIG_STORE; 一次识别内只读取一次
+
+        Returns:
+            (context.run_recognition 的返回值, 是否命中缓存)
+        """
+        capacity, ttl = self.limits(config)
+        if image is None or capacity <= 0:
+            return self._run(context, node, image, pipeline_override), False
+
+        override = json.dumps(pipeline_override, sort_keys=True, ensure_ascii=False) if pipeline_override else None
+        roi = FRAME_GATE.roi(context, node)
+        key = (node, tuple(roi) if roi else None, content_hash(image, roi), override)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[1] <= ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[0], True
+                del self._entries[key]
+                self._expired += 1
+            self._misses += 1
+
+        detail = self._run(context, node, image, pipeline_override)
+        with self._lock:
+            self._entries[key] = (detail, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > capacity:
+                self._entries.popitem(last=False)
+                self._evicted += 1
+        return detail, False
+
+    @staticmethod
+    def _run(context, node, image, pipeline_override):
+        with TRACER.span("run_recognition", node=node):
+            if pipeline_override:
+                return context.run_recognition(node, image, pipeline_override)
+            return context.run_recognition(node, image)
+
+    def invalidate(self, node=None):
+        """丢弃缓存 (node 为 None 时全部丢弃)"""
+        with self._lock:
+            if node is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == node]:
+                    del self._entries[key]
+
+    def counters(self):
+        """{"hits", "misses", "expired", "evicted", "size"}"""
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "expired": self._expired,
+                    "evicted": self._evicted, "size": len(self._entries)}
+
+
+# 全局识别结果缓存
+RECOGNITION_MEMO = RecognitionMemo()
+
+
+def memo_recognition(context, node, image=None, pipeline_override=None, config=None):
+    """
+    带缓存的 context.run_recognition, 供各自定义动作使用
+
+    image 为空时使用控制器最近一次截图 (cached_image); config 为调用方持有的配置快照
+    """
+    if image is None:
+        image = context.tasker.controller.cached_image
+    detail, _ = RECOGNITION_MEMO.recognize(context, node, image, pipeline_override, config)
+    return detail
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+战斗轮次记录
+
+说明:
+- 每一轮战斗 (AutoBattle / MultiRoundsAutoBattle 的每一轮) 生成一条 RoundResult:
+  结果 / 用时 / 检测次数 / 各输入次数 / 轮后处理耗时 / 与上一轮结束的间隔
+- 记录追加写入日志目录下的 battle_rounds.jsonl, 便于离线分析轮间空档
+  (超过 tools.RECORD_MAX_BYTES 时滚动压缩为 battle_rounds.jsonl.1.gz ...)
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime
+
+from tools import LOG_DIR, append_record
+
+logger = logging.getLogger(__name__)
+
+ROUNDS_FILE_NAME = "battle_rounds.jsonl"
+
+# 轮次结果
+OUTCOME_HIT = "hit"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_STOPPED = "stopped"
+OUTCOME_ERROR = "error"
+
+
+class RoundResult:
+    """
+    一轮战斗的结果 (时间单位: 秒)
+
+    duration 为战斗用时 (从本轮开始计时到检测到目标/超时);
+    post_round 为轮后处理节点耗时, overlapped 表示其与下一轮的检测重叠执行;
+    gap 为上一轮结束到本轮开始计时的间隔 (第一轮为 None)
+    """
+
+    def __init__(self, task, round_num, total_rounds):
+        self.task = task
+        self.round_num = round_num
+        self.total_rounds = total_rounds
+        self.started_at = datetime.now()
+        self.outcome = None
+        self.node = None
+        self.duration = 0.0
+        self.ticks = 0
+        self.inputs = {}
+        self.post_round = None
+        self.overlapped = False
+        self.gap = None
+
+    @property
+    def ok(self):
+        return self.outcome == OUTCOME_HIT
+
+    def to_record(self):
+        r = lambda v: None if v is None else round(v, 3)
+        return {
+            "time": self.started_at.isoformat(timespec="milliseconds"),
+            "task": self.task,
+            "round": self.round_num,
+            "total_rounds": self.total_rounds,
+            "outcome": self.outcome,
+            "node": self.node,
+            "duration_s": r(self.duration),
+            "ticks": self.ticks,
+            "inputs": dict(self.inputs),
+            "post_round_s": r(self.post_round),
+            "overlapped": self.overlapped,
+            "gap_s": r(self.gap),
+        }
+
+    def __str__(self):
+        text = (f"第 {self.round_num}/{self.total_rounds} 轮: {self.outcome}, 用时 {self.duration:.1f}s, "
+                f"检测 {self.ticks} 次")
+        if self.inputs:
+            text += ", " + ", ".join(f"{name} {count} 次" for name, count in self.inputs.items())
+        if self.post_round is not None:
+            text += f", 轮后处理 {self.post_round:.1f}s" + (" (与下一轮重叠)" if self.overlapped else "")
+        if self.gap is not None:
+            text += f", 轮间间隔 {self.gap:.1f}s"
+        return text
+
+
+class RoundRecorder:
+    """轮次记录写入器 (线程安全, 追加写入 JSONL)"""
+
+    def __init__(self, log_dir=LOG_DIR, file_name=ROUNDS_FILE_NAME):
+        self.path = os.path.join(log_dir, file_name)
+        self._lock = threading.Lock()
+
+    def record(self, result):
+        record = result.to_record()
+        with self._lock:
+            try:
+                append_record(self.path, record)
+            except OSError as e:
+                logger.warning(f"[RoundRecorder] 写入轮次记录失败: {e}")
+        return record
+
+
+# 全局轮次记录器
+ROUND_RECORDER = RoundRecorder()
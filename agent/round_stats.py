@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+战斗轮次时长统计、自适应检测节奏与自动单轮超时
+
+说明:
+- ROUND_STATS 按任务键 (Pipeline 节点名) 记录战斗时长:
+  最近若干轮的原始时长 (用于检测节奏), 以及 P² 流式分位数估计 (p50 / p90 / p99, 不保存全部样本)
+- 统计持久化到 ROUND_STATS_FILE, 跨会话累积; 每轮结束后原子写入
+- DetectionCadence 根据历史时长决定下一次检测的间隔:
+  距预计结束较远时慢速检测 (节省 CPU 与截图带宽), 进入预计结束窗口后突发为亚秒级检测
+- 自动超时 (GAME_CONFIG["round_timeout_auto"]): 单轮超时 = max(p99, 最近最长一轮) + round_timeout_auto_margin_ms,
+  不超过 round_timeout_ms; 样本不足 round_timeout_auto_min_rounds 轮时使用 round_timeout_ms
+- 节奏上下限与窗口由 GAME_CONFIG 配置:
+  detect_interval_min_ms / detect_interval_max_ms / detect_burst_margin_ms
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+# 导入全局配置
+from config_store import CONFIG_STORE
+
+logger = logging.getLogger(__name__)
+
+# 每个任务保留的历史轮数
+MAX_HISTORY = 20
+
+# 持久化文件
+ROUND_STATS_FILE = os.path.join(".", "config", "round_stats.json")
+STATS_FORMAT_VERSION = 1
+
+# 流式估计的分位数
+QUANTILES = (0.5, 0.9, 0.99)
+
+# 默认节奏参数 (毫秒)
+DEFAULT_INTERVAL_MIN_MS = 500
+DEFAULT_INTERVAL_MAX_MS = 5000
+DEFAULT_BURST_MARGIN_MS = 8000
+
+# 默认超时参数
+DEFAULT_ROUND_TIMEOUT_MS = 200000
+DEFAULT_AUTO_MARGIN_MS = 30000
+DEFAULT_AUTO_MIN_ROUNDS = 5
+
+
+def _quantile(ordered, q):
+    pos = (len(ordered) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+class P2Quantile:
+    """
+    P² 流式分位数估计 (Jain & Chlamtac, 1985)
+
+    只保存 5 个标记 (高度与位置), 内存与单次更新均为常数; 前 5 个样本直接排序计算
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.count = 0
+        self._q = []  # 标记高度
+        self._n = [0, 1, 2, 3, 4]  # 标记实际位置
+        self._np = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]  # 标记期望位置
+        self._dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x):
+        self.count += 1
+        q, n = self._q, self._n
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._np[i] += self._dn[i]
+
+        # 调整中间三个标记
+        for i in range(1, 4):
+            d = self._np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self._q, self._n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        """当前估计值, 无样本时返回 None"""
+        if not self._q:
+            return None
+        if self.count <= 5:
+            return _quantile(self._q, self.p)
+        return self._q[2]
+
+    def to_dict(self):
+        return {"p": self.p, "count": self.count, "q": list(self._q), "n": list(self._n), "np": list(self._np)}
+
+    @classmethod
+    def from_dict(cls, data):
+        est = cls(float(data["p"]))
+        est.count = int(data.get("count", 0))
+        est._q = [float(v) for v in data.get("q", [])]
+        if len(est._q) == 5:
+            est._n = [int(v) for v in data["n"]]
+            est._np = [float(v) for v in data["np"]]
+        return est
+
+
+class _TaskStats:
+    """单个任务的时长统计"""
+
+    def __init__(self, max_history):
+        self.history = deque(maxlen=max_history)
+        self.quantiles = {p: P2Quantile(p) for p in QUANTILES}
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.history.append(seconds)
+        for est in self.quantiles.values():
+            est.add(seconds)
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "max": self.max,
+            "history": list(self.history),
+            "quantiles": [est.to_dict() for est in self.quantiles.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, data, max_history):
+        stats = cls(max_history)
+        stats.count = int(data.get("count", 0))
+        stats.max = float(data.get("max", 0.0))
+        stats.history.extend(float(v) for v in data.get("history", []))
+        for item in data.get("quantiles", []):
+            est = P2Quantile.from_dict(item)
+            if est.p in stats.quantiles:
+                stats.quantiles[est.p] = est
+        return stats
+
+
+class RoundStats:
+    """
+    各任务的战斗时长统计 (秒, 线程安全)
+
+    Args:
+        max_history: 每个任务保留的最近时长数 (用于检测节奏)
+        path: 持久化文件路径, None 表示仅保存在内存中
+    """
+
+    def __init__(self, max_history=MAX_HISTORY, path=None):
+        self.max_history = max_history
+        self.path = path
+        self._lock = threading.Lock()
+        self._tasks = {}
+        self._loaded = path is None
+
+    def load(self):
+        """从持久化文件读取统计 (仅首次调用生效; 文件不存在或损坏时从空统计开始)"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not os.path.exists(self.path):
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") != STATS_FORMAT_VERSION:
+                    logger.warning(f"[RoundStats] 不支持的统计文件版本: {data.get('version')}, 忽略")
+                    return
+                for key, item in data.get("tasks", {}).items():
+                    self._tasks[key] = _TaskStats.from_dict(item, self.max_history)
+            except Exception as e:
+                logger.warning(f"[RoundStats] 读取统计文件失败, 从空统计开始: {e}")
+                self._tasks.clear()
+
+    def save(self):
+        """原子写入持久化文件 (先写临时文件再替换)"""
+        if self.path is None:
+            return
+        with self._lock:
+            data = {
+                "version": STATS_FORMAT_VERSION,
+                "tasks": {key: stats.to_dict() for key, stats in self._tasks.items()},
+            }
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"[RoundStats] 保存统计文件失败: {e}")
+
+    def record(self, key, seconds):
+        self.load()
+        with self._lock:
+            stats = self._tasks.get(key)
+            if stats is None:
+                stats = self._tasks[key] = _TaskStats(self.max_history)
+            stats.add(float(seconds))
+        self.save()
+
+    def history(self, key):
+        self.load()
+        with self._lock:
+            stats = self._tasks.get(key)
+            return list(stats.history) if stats else []
+
+    def expected(self, key):
+        """
+        预计结束区间
+
+        Returns:
+            (low, median, high) 秒 (最近历史时长的 p10 / p50 / p90), 无历史时返回 None
+        """
+        durations = sorted(self.history(key))
+        if not durations:
+            return None
+        return _quantile(durations, 0.1), _quantile(durations, 0.5), _quantile(durations, 0.9)
+
+    def learned(self, key):
+        """
+        跨会话累积的时长分布
+
+        Returns:
+            {"count", "max", "p50", "p90", "p99"} (秒), 无记录时返回 None
+        """
+        self.load()
+        with self._lock:
+            stats = self._tasks.get(key)
+            if stats is None or stats.count == 0:
+                return None
+            result = {"count": stats.count, "max": stats.max}
+            for p, est in stats.quantiles.items():
+                result[f"p{round(p * 100)}"] = est.value()
+            return result
+
+    def keys(self):
+        self.load()
+        with self._lock:
+            return sorted(self._tasks)
+
+    def round_timeout(self, key, config=None):
+        """
+        决定单轮超时
+
+        Args:
+            config: 配置快照, 默认取 CONFIG_STORE 的当前快照
+
+        Returns:
+            (超时毫秒, 说明)
+        """
+        if config is None:
+            config = CONFIG_STORE.snapshot()
+        fixed = float(config.get("round_timeout_ms", DEFAULT_ROUND_TIMEOUT_MS))
+        if not config.get("round_timeout_auto", False):
+            return fixed, "固定"
+        learned = self.learned(key)
+        min_rounds = int(config.get("round_timeout_auto_min_rounds", DEFAULT_AUTO_MIN_ROUNDS))
+        if learned is None or learned["count"] < min_rounds:
+            count = learned["count"] if learned else 0
+            return fixed, f"自动 (样本 {count}/{min_rounds} 轮不足, 使用固定值)"
+        margin = float(config.get("round_timeout_auto_margin_ms", DEFAULT_AUTO_MARGIN_MS))
+        # 样本较少时 P² 的 p99 偏低, 以最近历史中最长的一轮兜底
+        base = max(learned["p99"], max(self.history(key), default=0.0))
+        timeout = min(fixed, base * 1000 + margin)
+        return timeout, (f"自动 (p99 {learned['p99']:.1f}s, 最近最长 {base:.1f}s + {margin / 1000:.0f}s, "
+                         f"上限 {fixed / 1000:.0f}s)")
+
+    def log_summary(self):
+        """输出各任务的累积时长分布"""
+        keys = self.keys()
+        if not keys:
+            logger.info("[RoundStats] 暂无历史战斗时长")
+            return
+        logger.info(f"[RoundStats] 已学习 {len(keys)} 个任务的战斗时长:")
+        for key in keys:
+            s = self.learned(key)
+            logger.info(f"  {key}: {s['count']} 轮, p50 {s['p50']:.1f}s, p90 {s['p90']:.1f}s, "
+                        f"p99 {s['p99']:.1f}s, 最长 {s['max']:.1f}s")
+
+
+class DetectionCadence:
+    """
+    自适应检测间隔
+
+    - 无历史: 使用慢速间隔 (detect_interval_max_ms)
+    - 有历史: 在 [p10 - margin, p90 + margin] 窗口内使用快速间隔 (detect_interval_min_ms),
+      窗口之前以不超过慢速间隔的步长逼近窗口起点, 窗口之后 (本轮明显偏长) 回到慢速
+    """
+
+    def __init__(self, expected=None, config=None):
+        if config is None:
+            config = CONFIG_STORE.snapshot()
+        self.expected = expected
+        self.min_interval = config.get("detect_interval_min_ms", DEFAULT_INTERVAL_MIN_MS) / 1000.0
+        self.max_interval = max(self.min_interval,
+                                config.get("detect_interval_max_ms", DEFAULT_INTERVAL_MAX_MS) / 1000.0)
+        margin = config.get("detect_burst_margin_ms", DEFAULT_BURST_MARGIN_MS) / 1000.0
+        if expected is None:
+            self.window = None
+        else:
+            low, _, high = expected
+            self.window = (max(0.0, low - margin), high + margin)
+
+    def interval(self, elapsed):
+        """已用时 elapsed 秒时, 距下一次检测的间隔 (秒)"""
+        if self.window is None:
+            return self.max_interval
+        start, end = self.window
+        if elapsed < start:
+            # 不跨过窗口起点
+            return max(self.min_interval, min(self.max_interval, start - elapsed))
+        if elapsed <= end:
+            return self.min_interval
+        return self.max_interval
+
+    def describe(self):
+        if self.window is None:
+            return f"无历史时长, 固定间隔 {self.max_interval * 1000:.0f}ms"
+        low, median, high = self.expected
+        return (f"预计时长 {median:.1f}s (p10 {low:.1f}s, p90 {high:.1f}s), "
+                f"{self.window[0]:.1f}s~{self.window[1]:.1f}s 内间隔 {self.min_interval * 1000:.0f}ms, "
+                f"其余 {self.max_interval * 1000:.0f}ms")
+
+
+# 全局轮次统计 (持久化到 ROUND_STATS_FILE)
+ROUND_STATS = RoundStats(path=ROUND_STATS_FILE)
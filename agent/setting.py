@@ -2,21 +2,165 @@
 """
 设置自定义动作中的参数
 变相实现变量存储流水线中的某些全局设置
+
+- ApplySettings: 一个节点完成全部设置. 从各 set_* 节点 (界面选项通过 pipeline_override 覆盖的就是它们)
+  读取参数, 按 SETTINGS_SCHEMA 统一校验后经 CONFIG_STORE 一次性写入, 任一项不合法则全部不生效;
+  完成后使截图 / 识别缓存失效一次, 不再逐个节点截图
+- SetDodgeKey 等单项设置动作保留以兼容旧的任务入口, 同样经 apply_settings 校验与写入
 """
 
-from maa.agent.agent_server import AgentServer
+from action_registry import custom_action
 from maa.custom_action import CustomAction
 from maa.context import Context
 import logging
 import json
 
-# 导入全局配置
-from config import GAME_CONFIG
+# 导入配置存储 (读取快照)
+from config_store import CONFIG_STORE
+from tracing import trace_action
+from movement_action.sequence_cache import SEQUENCE_CACHE
+from frame_service import FRAME_SERVICE
+from frame_gate import FRAME_GATE
+from recognition_memo import RECOGNITION_MEMO
 
 # 获取日志记录器
 logger = logging.getLogger(__name__)
 
-@AgentServer.custom_action("SetDodgeKey")
+# 设置项校验规则: type 为 int / bool; min / max / choices 为可选的取值约束
+SETTINGS_SCHEMA = {
+    "dodge_key": {"type": int, "min": 1, "max": 255},  # 闪避键虚拟键码
+    "auto_battle_mode": {"type": int, "choices": (0, 1)},  # 0=循环按E键, 1=什么也不做
+    "battle_rounds": {"type": int, "min": 1},
+    "auto_e_interval_ms": {"type": int, "min": 1},
+    "round_timeout_ms": {"type": int, "min": 0},  # 0 表示自动超时
+    "round_timeout_auto": {"type": bool},
+}
+
+# ApplySettings 默认读取参数的设置节点
+DEFAULT_SETTING_NODES = [
+    "set_dodge_key",
+    "set_auto_battle_mode",
+    "set_auto_e_interval",
+    "set_round_timeout",
+    "set_battle_rounds",
+]
+
+
+def _coerce(key, value):
+    """按 SETTINGS_SCHEMA 转换并校验单个设置项, 不合法时抛出 ValueError"""
+    spec = SETTINGS_SCHEMA.get(key)
+    if spec is None:
+        raise ValueError(f"未知的设置项: {key}")
+    if spec["type"] is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+            return value.strip().lower() == "true"
+        raise ValueError(f"{key} 必须为布尔值: {value!r}")
+
+    # 整数: 界面字段替换后可能是字符串
+    if isinstance(value, bool):
+        raise ValueError(f"{key} 必须为整数: {value!r}")
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str):
+        try:
+            value = int(value.strip())
+        except ValueError:
+            raise ValueError(f"{key} 必须为整数: {value!r}") from None
+    if not isinstance(value, int):
+        raise ValueError(f"{key} 必须为整数: {value!r}")
+    if "choices" in spec and value not in spec["choices"]:
+        raise ValueError(f"{key} 仅支持 {list(spec['choices'])}: {value}")
+    if "min" in spec and value < spec["min"]:
+        raise ValueError(f"{key} 不能小于 {spec['min']}: {value}")
+    if "max" in spec and value > spec["max"]:
+        raise ValueError(f"{key} 不能大于 {spec['max']}: {value}")
+    return value
+
+
+def validate_settings(values):
+    """
+    校验一组设置
+
+    Returns:
+        (规范化后的设置, 错误信息列表)
+    """
+    normalized = {}
+    errors = []
+    for key, value in values.items():
+        try:
+            normalized[key] = _coerce(key, value)
+        except ValueError as e:
+            errors.append(str(e))
+    # round_timeout_ms 为 0 表示开启自动超时, 保留原有的固定值作为上限;
+    # 非 0 表示使用该固定值, 同时关闭之前开启的自动超时; 显式的 round_timeout_auto 优先
+    if normalized.get("round_timeout_ms") == 0:
+        del normalized["round_timeout_ms"]
+        normalized.setdefault("round_timeout_auto", True)
+    elif "round_timeout_ms" in normalized:
+        normalized.setdefault("round_timeout_auto", False)
+    return normalized, errors
+
+
+def apply_settings(values, tag):
+    """
+    校验并一次性写入 CONFIG_STORE (任一项不合法则全部不生效; 本次会话有效, 不写回配置文件)
+
+    Returns:
+        dict: 实际变化的设置 {键: (旧值, 新值)}; 校验失败返回 None
+    """
+    normalized, errors = validate_settings(values)
+    if errors:
+        for error in errors:
+            logger.error(f"[{tag}] {error}")
+        return None
+
+    changes = CONFIG_STORE.update(normalized)
+
+    if "dodge_key" in normalized:
+        # 闪避键变化后, 按新键重新预编译动作序列 (未变化时不做任何事)
+        SEQUENCE_CACHE.set_dodge_key(normalized["dodge_key"])
+
+    if changes:
+        logger.info(f"[{tag}] 设置已更新 (v{CONFIG_STORE.version}): "
+                    + ", ".join(f"{k} {old} -> {new}" for k, (old, new) in changes.items()))
+    else:
+        logger.debug(f"[{tag}] 设置未变化")
+    return changes
+
+
+def _node_action_param(node_data):
+    """从节点定义中取出 custom_action_param (兼容 Pipeline V1 / V2 格式), 没有时返回 None"""
+    if not isinstance(node_data, dict):
+        return None
+    param = node_data.get("custom_action_param")
+    if param is None:
+        action = node_data.get("action")
+        if isinstance(action, dict):
+            param = (action.get("param") or {}).get("custom_action_param")
+    if isinstance(param, str):
+        param = json.loads(param) if param.strip() else {}
+    return param if isinstance(param, dict) else None
+
+
+def _refresh_screencap(context, tag):
+    """
+    刷新截图缓存，避免后续节点使用旧图
+    连续的设置节点在 settings_frame_max_age_ms 内共享同一次截图
+    """
+    max_age_ms = CONFIG_STORE.get("settings_frame_max_age_ms", 500)
+    frame = FRAME_SERVICE.get(context.tasker.controller, max_age_ms=max_age_ms)
+    if frame is None:
+        logger.warning(f"[{tag}] 截图缓存刷新失败")
+        return
+    logger.info(f"[{tag}] [OK] 截图缓存已更新 (帧 #{frame.seq}, "
+                f"帧龄 {frame.age(FRAME_SERVICE.clock()) * 1000:.0f}ms)")
+
+@custom_action("SetDodgeKey")
+@trace_action
 class SetDodgeKey(CustomAction):
     """
     设置闪避键配置
@@ -41,17 +185,15 @@ class SetDodgeKey(CustomAction):
             # 获取闪避键虚拟键码(现在直接是 int)
             dodge_key_vk = params.get("dodge_key", 0x10)  # 默认 Shift = 0x10
             
-            # 保存到全局配置
-            GAME_CONFIG["dodge_key"] = dodge_key_vk
+            # 校验并保存到全局配置 (闪避键变化时重新预编译动作序列)
+            if apply_settings({"dodge_key": dodge_key_vk}, "SetDodgeKey") is None:
+                return False
+            dodge_key_vk = CONFIG_STORE.snapshot()["dodge_key"]
             
             logger.info(f"[SetDodgeKey] [OK] 闪避键已设置为: VK=0x{dodge_key_vk:02X} ({dodge_key_vk})")
-            logger.info(f"[SetDodgeKey] 当前配置: {GAME_CONFIG}")
             
-            # 强制刷新截图缓存，避免后续节点使用旧图
-            logger.info(f"[SetDodgeKey] 刷新截图缓存...")
-            screencap_job = context.tasker.controller.post_screencap()
-            screencap_job.wait()
-            logger.info(f"[SetDodgeKey] [OK] 截图缓存已更新")
+            # 刷新截图缓存，避免后续节点使用旧图
+            _refresh_screencap(context, "SetDodgeKey")
             
             return True
             
@@ -60,7 +202,8 @@ class SetDodgeKey(CustomAction):
             return False
 
 
-@AgentServer.custom_action("SetAutoBattleMode")
+@custom_action("SetAutoBattleMode")
+@trace_action
 class SetAutoBattleMode(CustomAction):
     """
     设置自动战斗模式配置
@@ -90,23 +233,16 @@ class SetAutoBattleMode(CustomAction):
             # 获取自动战斗模式（默认为 0）
             auto_battle_mode = params.get("auto_battle_mode", 0)
             
-            # 验证模式值
-            if auto_battle_mode not in [0, 1]:
-                logger.error(f"[SetAutoBattleMode] 无效的模式值: {auto_battle_mode}，仅支持 0 或 1")
+            # 校验并保存到全局配置
+            if apply_settings({"auto_battle_mode": auto_battle_mode}, "SetAutoBattleMode") is None:
                 return False
-            
-            # 保存到全局配置
-            GAME_CONFIG["auto_battle_mode"] = auto_battle_mode
+            auto_battle_mode = CONFIG_STORE.snapshot()["auto_battle_mode"]
             
             mode_desc = "循环按E键" if auto_battle_mode == 0 else "什么也不做"
             logger.info(f"[SetAutoBattleMode] [OK] 自动战斗模式已设置为: {auto_battle_mode} ({mode_desc})")
-            logger.info(f"[SetAutoBattleMode] 当前配置: {GAME_CONFIG}")
             
-            # 强制刷新截图缓存，避免后续节点使用旧图
-            logger.info(f"[SetAutoBattleMode] 刷新截图缓存...")
-            screencap_job = context.tasker.controller.post_screencap()
-            screencap_job.wait()
-            logger.info(f"[SetAutoBattleMode] [OK] 截图缓存已更新")
+            # 刷新截图缓存，避免后续节点使用旧图
+            _refresh_screencap(context, "SetAutoBattleMode")
             
             return True
             
@@ -115,7 +251,8 @@ class SetAutoBattleMode(CustomAction):
             return False
 
 
-@AgentServer.custom_action("SetBattleRounds")
+@custom_action("SetBattleRounds")
+@trace_action
 class SetBattleRounds(CustomAction):
     """
     设置战斗轮数配置
@@ -145,22 +282,14 @@ class SetBattleRounds(CustomAction):
             # 获取战斗轮数（默认为 3）
             battle_rounds = params.get("battle_rounds", 3)
             
-            # 验证轮数值（必须是正整数）
-            if not isinstance(battle_rounds, int) or battle_rounds <= 0:
-                logger.error(f"[SetBattleRounds] 无效的轮数值: {battle_rounds}，必须是正整数")
+            # 校验（必须是正整数）并保存到全局配置
+            if apply_settings({"battle_rounds": battle_rounds}, "SetBattleRounds") is None:
                 return False
             
-            # 保存到全局配置
-            GAME_CONFIG["battle_rounds"] = battle_rounds
-            
-            logger.info(f"[SetBattleRounds] [OK] 战斗轮数已设置为: {battle_rounds}")
-            logger.info(f"[SetBattleRounds] 当前配置: {GAME_CONFIG}")
+            logger.info(f"[SetBattleRounds] [OK] 战斗轮数已设置为: {CONFIG_STORE.snapshot()['battle_rounds']}")
             
-            # 强制刷新截图缓存，避免后续节点使用旧图
-            logger.info(f"[SetBattleRounds] 刷新截图缓存...")
-            screencap_job = context.tasker.controller.post_screencap()
-            screencap_job.wait()
-            logger.info(f"[SetBattleRounds] [OK] 截图缓存已更新")
+            # 刷新截图缓存，避免后续节点使用旧图
+            _refresh_screencap(context, "SetBattleRounds")
             
             return True
             
@@ -169,7 +298,8 @@ class SetBattleRounds(CustomAction):
             return False
 
 
-@AgentServer.custom_action("SetAutoEInterval")
+@custom_action("SetAutoEInterval")
+@trace_action
 class SetAutoEInterval(CustomAction):
     """
     设置自动 E 周期（毫秒）到全局配置
@@ -197,29 +327,21 @@ class SetAutoEInterval(CustomAction):
             if val is None:
                 logger.error("[SetAutoEInterval] 缺少 auto_e_interval_ms")
                 return False
-            try:
-                val = int(val)
-            except Exception:
-                logger.error(f"[SetAutoEInterval] 非法的数值: {val}")
-                return False
-
-            if val <= 0:
-                logger.error(f"[SetAutoEInterval] 必须为正整数毫秒: {val}")
+            # 校验（必须为正整数毫秒）并保存到全局配置
+            if apply_settings({"auto_e_interval_ms": val}, "SetAutoEInterval") is None:
                 return False
-
-            GAME_CONFIG["auto_e_interval_ms"] = val
-            logger.info(f"[SetAutoEInterval] [OK] 自动E周期(ms) = {val}")
+            logger.info(f"[SetAutoEInterval] [OK] 自动E周期(ms) = {CONFIG_STORE.snapshot()['auto_e_interval_ms']}")
 
             # 刷新截图缓存
-            job = context.tasker.controller.post_screencap()
-            job.wait()
+            _refresh_screencap(context, "SetAutoEInterval")
             return True
         except Exception as e:
             logger.error(f"[SetAutoEInterval] 发生异常: {e}", exc_info=True)
             return False
 
 
-@AgentServer.custom_action("SetRoundTimeout")
+@custom_action("SetRoundTimeout")
+@trace_action
 class SetRoundTimeout(CustomAction):
     """
     设置单轮战斗超时（毫秒）到全局配置（统一命名为 round_timeout）
@@ -228,6 +350,9 @@ class SetRoundTimeout(CustomAction):
         "round_timeout_ms": 180000
     }
     备注：多轮战斗每轮超时按本值执行。
+    round_timeout_ms 为 0 时开启自动超时（按历史战斗时长 p99 加余量，
+    上限为当前 round_timeout_ms），非 0 时使用该固定值并关闭自动超时；
+    也可显式传入 "round_timeout_auto": true/false。
     """
 
     def run(
@@ -244,26 +369,88 @@ class SetRoundTimeout(CustomAction):
                 logger.error(f"[SetRoundTimeout] 参数类型错误: {type(argv.custom_action_param)}")
                 return False
 
-            val = params.get("round_timeout_ms", None)
-            if val is None:
+            values = {k: params[k] for k in ("round_timeout_ms", "round_timeout_auto") if params.get(k) is not None}
+            if not values:
                 logger.error("[SetRoundTimeout] 缺少 round_timeout_ms")
                 return False
-            try:
-                val = int(val)
-            except Exception:
-                logger.error(f"[SetRoundTimeout] 非法的数值: {val}")
+            # 校验并保存到全局配置 (0 表示自动超时)
+            if apply_settings(values, "SetRoundTimeout") is None:
                 return False
 
-            if val <= 0:
-                logger.error(f"[SetRoundTimeout] 必须为正整数毫秒: {val}")
+            # 同一份快照读取两项, 避免与并发的热更新混用
+            config = CONFIG_STORE.snapshot()
+            mode = "自动" if config.get("round_timeout_auto") else "固定"
+            logger.info(f"[SetRoundTimeout] [OK] 单轮战斗超时(round_timeout_ms) = "
+                        f"{config['round_timeout_ms']} ({mode})")
+
+            _refresh_screencap(context, "SetRoundTimeout")
+            return True
+        except Exception as e:
+            logger.error(f"[SetRoundTimeout] 发生异常: {e}", exc_info=True)
+            return False
+
+
+@custom_action("ApplySettings")
+@trace_action
+class ApplySettings(CustomAction):
+    """
+    一次性应用全部设置 (代替 set_dodge_key -> ... -> set_battle_rounds 节点链)
+
+    参数说明（均可选）：
+    {
+        "sources": ["set_dodge_key", ...],   // 读取 custom_action_param 的设置节点, 默认 DEFAULT_SETTING_NODES
+        "settings": {"battle_rounds": 5}     // 直接给出的设置, 优先于 sources 中的值
+    }
+    界面选项仍然覆盖各 set_* 节点的参数, 本动作通过 context.get_node_data 读取覆盖后的值;
+    全部设置按 SETTINGS_SCHEMA 校验通过后才写入 CONFIG_STORE, 随后使截图与识别缓存失效一次
+    """
+
+    def run(
+        self,
+        context: Context,
+        argv: CustomAction.RunArg,
+    ) -> bool:
+        try:
+            if isinstance(argv.custom_action_param, str):
+                params = json.loads(argv.custom_action_param) if argv.custom_action_param.strip() else {}
+            elif isinstance(argv.custom_action_param, dict):
+                params = argv.custom_action_param
+            else:
+                params = {}
+            if not isinstance(params, dict):
+                logger.error(f"[ApplySettings] 参数必须是对象: {params}")
                 return False
 
-            GAME_CONFIG["round_timeout_ms"] = val
-            logger.info(f"[SetRoundTimeout] [OK] 单轮战斗超时(round_timeout_ms) = {val}")
+            # 依次收集各设置节点的参数 (后面的节点覆盖前面的同名设置)
+            values = {}
+            sources = params.get("sources", DEFAULT_SETTING_NODES)
+            for node in sources:
+                try:
+                    node_param = _node_action_param(context.get_node_data(node))
+                except (json.JSONDecodeError, TypeError) as e:
+                    logger.error(f"[ApplySettings] 节点 '{node}' 的参数不是有效 JSON: {e}")
+                    return False
+                if node_param is None:
+                    logger.debug(f"[ApplySettings] 节点 '{node}' 不存在或没有参数, 跳过")
+                    continue
+                values.update(node_param)
+            values.update(params.get("settings") or {})
+
+            changes = apply_settings(values, "ApplySettings")
+            if changes is None:
+                logger.error("[ApplySettings] 设置校验失败, 未应用任何设置")
+                return False
 
-            job = context.tasker.controller.post_screencap()
-            job.wait()
+            # 设置可能改变识别与输入的行为, 丢弃旧的截图与识别缓存 (一次)
+            FRAME_SERVICE.invalidate()
+            FRAME_GATE.invalidate()
+            RECOGNITION_MEMO.invalidate()
+
+            config = CONFIG_STORE.snapshot()
+            current = ", ".join(f"{k}={config.get(k)}" for k in SETTINGS_SCHEMA if k in config)
+            logger.info(f"[ApplySettings] [OK] 已应用 {len(values)} 项设置 ({len(changes)} 项变化): {current}")
             return True
+
         except Exception as e:
-            logger.error(f"[SetRoundTimeout] 发生异常: {e}", exc_info=True)
+            logger.error(f"[ApplySettings] 发生异常: {e}", exc_info=True)
             return False
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+无界面模拟后端
+
+提供与 MaaFramework Context / Tasker / Controller 接口兼容的替身对象,
+使 common.py、setting.py 与 movement_action 中的自定义动作可以在没有游戏窗口
+(包括 Linux 构建/基准测试机) 的环境下运行, 用于性能分析与回归基准:
+
+- FakeController: 记录每个提交的 Job (类型/参数/提交与完成时刻), 截图从磁盘读取
+- FakeTasker:     持有控制器与 stopping 标记
+- FakeContext:    按脚本返回识别结果, 记录 run_task 调用
+- VirtualClock:   虚拟时钟, sleep 只推进时间 (可注入唤醒误差), 可远快于实时地回放整个序列库
+- constant_latency / lognormal_latency / spike_latency: Job 耗时模型
+
+使用方式:
+    context = FakeContext(screenshots="tests/frames", recognition={"common_again": [False, False, True]})
+    ok = run_action("AutoBattle", {"target_node": ["common_again"]}, context)
+    for job in context.tasker.controller.jobs: ...
+"""
+
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp")
+
+# 虚拟时钟每次读取推进的时间 (秒)
+DEFAULT_READ_COST = 1e-6
+
+
+class Box:
+    """识别结果框 (与 maa.define.Rect 字段一致)"""
+
+    __slots__ = ("x", "y", "w", "h")
+
+    def __init__(self, x=0, y=0, w=0, h=0):
+        self.x, self.y, self.w, self.h = x, y, w, h
+
+    def __repr__(self):
+        return f"Box({self.x}, {self.y}, {self.w}, {self.h})"
+
+
+class FakeRecognitionDetail:
+    """识别结果 (hit / box / algorithm / best_result 等字段的最小子集)"""
+
+    def __init__(self, node, hit, box=None):
+        self.name = node
+        self.hit = hit
+        self.box = box if box is not None else (Box(0, 0, 1, 1) if hit else None)
+        self.algorithm = "Simulated"
+        self.best_result = None
+
+    def __repr__(self):
+        return f"FakeRecognitionDetail({self.name!r}, hit={self.hit})"
+
+
+class FakeTaskDetail:
+    _ids = itertools.count(1)
+
+    def __init__(self, entry):
+        self.task_id = next(self._ids)
+        self.entry = entry
+        self.status = "succeeded"
+
+
+class VirtualClock:
+    """
+    虚拟时钟: sleep(s) 立即返回并把全局虚拟时间推进 s 秒 (由调度器线程驱动)
+
+    其他线程 (如 KeyDispatcher 的后台线程) 使用 advance_local(t) 只把本线程的时间线推进到 t,
+    不影响调度器; 该线程此后的 now() 返回自己的时间, 从而得到精确的 Job 完成时刻
+
+    Args:
+        oversleep: 可选的无参函数 (秒, 见 constant_latency 等), 每次 sleep 额外推进的时间,
+            模拟系统定时器的唤醒误差; 调度器的自旋预算用来吸收这部分误差
+        read_cost: 每次读取全局时间 (now) 推进的秒数, 模拟忙等读时钟的开销,
+            使自旋等待在虚拟时间中同样会到达截止时刻
+    """
+
+    def __init__(self, start=0.0, oversleep=None, read_cost=DEFAULT_READ_COST):
+        self._now = float(start)
+        self.oversleep = oversleep
+        self.read_cost = read_cost
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def now(self):
+        local = getattr(self._local, "time", None)
+        if local is not None:
+            return local
+        with self._lock:
+            now = self._now
+            self._now += self.read_cost
+        return now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            extra = self.oversleep() if self.oversleep is not None else 0.0
+            with self._lock:
+                self._now += seconds + max(0.0, extra)
+
+    def advance_local(self, deadline):
+        self._local.time = max(getattr(self._local, "time", deadline), deadline)
+
+
+########################
+# Job 耗时模型 (返回无参函数, 单位秒)
+########################
+
+def constant_latency(ms):
+    """固定耗时"""
+    seconds = ms / 1000.0
+    return lambda: seconds
+
+
+def lognormal_latency(median_ms, sigma=0.5, seed=None):
+    """对数正态耗时: 中位数 median_ms, sigma 为对数标准差 (越大长尾越重)"""
+    rng = random.Random(seed)
+    mu = math.log(max(median_ms, 1e-6) / 1000.0)
+    return lambda: rng.lognormvariate(mu, sigma)
+
+
+def spike_latency(base_ms, spike_ms, probability=0.02, seed=None):
+    """平时 base_ms, 以 probability 的概率出现 spike_ms 的尖峰 (模拟高负载机器)"""
+    rng = random.Random(seed)
+    base, spike = base_ms / 1000.0, spike_ms / 1000.0
+    return lambda: spike if rng.random() < probability else base
+
+
+class FakeJob:
+    """
+    模拟 Job: 提交时即确定完成时刻, wait() 等到完成时刻
+
+    记录字段: kind / args / posted_at / done_at (模拟时钟)
+    虚拟时钟模式下 wait() 立即返回, 只把等待线程自己的时间线推进到 done_at
+    """
+
+    def __init__(self, controller, kind, args, posted_at, done_at, succeeded=True):
+        self._controller = controller
+        self.kind = kind
+        self.args = args
+        self.posted_at = posted_at
+        self.done_at = done_at
+        self._succeeded = succeeded
+        self._waited = False
+
+    def wait(self):
+        virtual_clock = self._controller.virtual_clock
+        if virtual_clock is not None:
+            virtual_clock.advance_local(self.done_at)
+        else:
+            remaining = self.done_at - self._controller.clock()
+            if remaining > 0:
+                self._controller.sleep(remaining)
+        self._waited = True
+        return self
+
+    @property
+    def done(self):
+        return self._waited or self._controller.clock() >= self.done_at
+
+    @property
+    def succeeded(self):
+        return self.done and self._succeeded
+
+    @property
+    def failed(self):
+        return self.done and not self._succeeded
+
+    def __repr__(self):
+        return f"FakeJob({self.kind}{self.args}, posted={self.posted_at:.4f})"
+
+
+class FakeController:
+    """
+    模拟控制器
+
+    与真实控制器一样串行执行 Job: 每个 Job 在前一个完成后才开始计时
+
+    Args:
+        screenshots: 截图目录或图片路径列表, 每次 post_screencap 依次取下一张 (到末尾后停留在最后一张)
+        latency: 每个 Job 的耗时 (秒), 可以是常数或无参函数 (见 constant_latency 等)
+        clock / sleep: 时钟与睡眠函数, 默认 time.perf_counter / time.sleep
+        virtual_clock: 虚拟时钟, 设置后忽略 clock / sleep, Job 不占用调度器时间
+    """
+
+    def __init__(self, screenshots=None, latency=0.0, clock=time.perf_counter, sleep=time.sleep, virtual_clock=None):
+        self.virtual_clock = virtual_clock
+        self.clock = virtual_clock.now if virtual_clock is not None else clock
+        self.sleep = sleep
+        self.latency = latency
+        self.jobs = []
+        self._last_done = float("-inf")
+        self._lock = threading.Lock()
+        self._frames = _list_images(screenshots)
+        self._frame_index = -1
+        self.cached_image = None
+
+    def _post(self, kind, *args, succeeded=True):
+        now = self.clock()
+        latency = self.latency() if callable(self.latency) else self.latency
+        with self._lock:
+            done_at = max(now, self._last_done) + max(0.0, latency)
+            self._last_done = done_at
+            job = FakeJob(self, kind, args, now, done_at, succeeded)
+            self.jobs.append(job)
+        return job
+
+    def post_key_down(self, key):
+        return self._post("key_down", key)
+
+    def post_key_up(self, key):
+        return self._post("key_up", key)
+
+    def post_click_key(self, key):
+        return self._post("click_key", key)
+
+    def post_click(self, x, y):
+        return self._post("click", x, y)
+
+    def post_screencap(self):
+        if self._frames:
+            self._frame_index = min(self._frame_index + 1, len(self._frames) - 1)
+            self.cached_image = _load_image(self._frames[self._frame_index])
+        return self._post("screencap")
+
+    def key_jobs(self):
+        """按提交顺序返回 (posted_at, kind, key) 的按键记录"""
+        with self._lock:
+            return [(j.posted_at, j.kind, j.args[0]) for j in self.jobs if j.kind in ("key_down", "key_up")]
+
+
+class FakeTasker:
+    def __init__(self, controller):
+        self.controller = controller
+        self.stopping = False
+
+    def post_stop(self):
+        self.stopping = True
+
+
+class FakeContext:
+    """
+    模拟 Context
+
+    Args:
+        controller: FakeController, 默认按 screenshots 新建
+        screenshots: 截图目录或图片列表 (仅 controller 为空时使用)
+        recognition: 识别脚本 {节点名: 结果}, 结果可以是
+            bool (每次相同) / list[bool] (按调用次序, 用尽后保持最后一个) / 函数 f(node, image) -> bool
+        node_data: {节点名: 节点定义}, 供 get_node_data 返回
+        tasks: run_task 脚本 {入口节点: bool}, 默认全部成功
+    """
+
+    def __init__(self, controller=None, screenshots=None, recognition=None, node_data=None, tasks=None):
+        self.tasker = FakeTasker(controller or FakeController(screenshots))
+        self._recognition = dict(recognition or {})
+        self._calls = {}
+        self._node_data = dict(node_data or {})
+        self._tasks = dict(tasks or {})
+        self.recognition_calls = []  # (时刻, 节点名)
+        self.task_calls = []  # (时刻, 入口节点, pipeline_override)
+
+    def run_recognition(self, entry, image=None, pipeline_override=None):
+        clock = self.tasker.controller.clock
+        self.recognition_calls.append((clock(), entry))
+        script = self._recognition.get(entry, False)
+        if callable(script):
+            hit = bool(script(entry, image))
+        elif isinstance(script, (list, tuple)):
+            n = self._calls.get(entry, 0)
+            self._calls[entry] = n + 1
+            hit = bool(script[min(n, len(script) - 1)]) if script else False
+        else:
+            hit = bool(script)
+        return FakeRecognitionDetail(entry, hit)
+
+    def run_task(self, entry, pipeline_override=None):
+        self.task_calls.append((self.tasker.controller.clock(), entry, pipeline_override))
+        if not self._tasks.get(entry, True):
+            return None
+        return FakeTaskDetail(entry)
+
+    def get_node_data(self, name):
+        return self._node_data.get(name)
+
+
+class FakeRunArg:
+    """与 CustomAction.RunArg 字段一致的参数对象"""
+
+    def __init__(self, custom_action_param, node_name="Simulated", custom_action_name=""):
+        self.task_detail = None
+        self.node_name = node_name
+        self.custom_action_name = custom_action_name
+        self.custom_action_param = custom_action_param
+        self.reco_detail = None
+        self.box = None
+
+
+def load_actions():
+    """导入全部自定义动作模块, 返回 {动作名: 类} (只含 CustomAction 子类)"""
+    from maa.custom_action import CustomAction
+    import common
+    import setting
+    import movement_action.actions
+    import movement_action.action_sequence
+
+    actions = {}
+    for module in (common, setting, movement_action.actions, movement_action.action_sequence):
+        for attr in dir(module):
+            obj = getattr(module, attr)
+            if isinstance(obj, type) and issubclass(obj, CustomAction) and obj.__module__.split(".")[0] in (
+                "common", "setting", "movement_action"
+            ):
+                actions[attr] = obj
+    return actions
+
+
+def run_action(name, param, context, node_name="Simulated"):
+    """
+    在模拟环境中执行一个自定义动作
+
+    Args:
+        name: 动作类名 (与注册名一致, 如 "AutoBattle")
+        param: custom_action_param, dict 会按 Pipeline 的方式序列化为 JSON 字符串
+    """
+    actions = load_actions()
+    if name not in actions:
+        raise KeyError(f"未知的自定义动作: {name}")
+    if isinstance(param, (dict, list)):
+        param = json.dumps(param, ensure_ascii=False)
+    return actions[name]().run(context, FakeRunArg(param, node_name, name))
+
+
+def _list_images(screenshots):
+    if not screenshots:
+        return []
+    if isinstance(screenshots, (list, tuple)):
+        return list(screenshots)
+    if os.path.isdir(screenshots):
+        return [
+            os.path.join(screenshots, f)
+            for f in sorted(os.listdir(screenshots))
+            if f.lower().endswith(_IMAGE_SUFFIXES)
+        ]
+    return [screenshots]
+
+
+def _load_image(path):
+    """读取截图为 BGR ndarray (与 MaaFramework cached_image 一致)"""
+    try:
+        import cv2
+        import numpy as np
+
+        # cv2.imread 不支持非 ASCII 路径, 使用 imdecode
+        return cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except ImportError:
+        import numpy as np
+        from PIL import Image
+
+        return np.asarray(Image.open(path).convert("RGB"))[:, :, ::-1].copy()
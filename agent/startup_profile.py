@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析 (main.py --profile-startup)
+
+说明:
+- 按阶段 (导入 maa / 初始化日志 / 注册动作 / AgentServer.start_up ...) 记录耗时
+- 安装导入钩子 (包装 builtins.__import__) 记录每个新导入模块的耗时:
+  累计 (含其导入的子模块) 与自身 (不含子模块) 两列; 已导入的模块不计入
+- 报告输出到日志, 同时写入 JSON 文件供 tools/bench_startup.py 汇总与对比基线
+- 只使用标准库, 可在导入任何 Agent 模块之前使用
+"""
+
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# 报告中列出的导入数
+TOP_IMPORTS = 25
+
+
+class StartupProfiler:
+    """
+    启动阶段与导入耗时记录
+
+    Args:
+        origin: 计时起点 (time.perf_counter 时刻), 默认为创建时刻
+    """
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases = []  # (阶段名, 开始偏移秒, 耗时秒)
+        self.imports = {}  # 模块名 -> [累计秒, 自身秒, 父模块]
+        self.ready = None  # 就绪 (AgentServer.start_up 完成) 时的偏移秒
+        self._stack = []
+        self._thread = threading.get_ident()
+        self._original_import = None
+
+    @contextmanager
+    def phase(self, name):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append((name, begin - self.origin, end - begin))
+
+    def install(self):
+        """安装导入钩子 (只记录主线程的导入)"""
+        if self._original_import is not None:
+            return
+        original = self._original_import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or threading.get_ident() != self._thread:
+                return original(name, globals, locals, fromlist, level)
+            if name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            parent = self._stack[-1] if self._stack else None
+            self._stack.append([name, 0.0])
+            begin = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                elapsed = time.perf_counter() - begin
+                _, children = self._stack.pop()
+                if self._stack:
+                    self._stack[-1][1] += elapsed
+                self.imports.setdefault(name, [elapsed, elapsed - children, parent[0] if parent else None])
+
+        builtins.__import__ = timed_import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.origin
+
+    def mark_ready(self):
+        self.ready = self.elapsed()
+
+    def to_dict(self):
+        return {
+            "ready_ms": None if self.ready is None else round(self.ready * 1000, 2),
+            "total_ms": round(self.elapsed() * 1000, 2),
+            "phases": [{"name": name, "start_ms": round(start * 1000, 2), "ms": round(duration * 1000, 2)}
+                       for name, start, duration in self.phases],
+            "imports": [{"module": name, "cumulative_ms": round(cum * 1000, 2), "self_ms": round(own * 1000, 2),
+                         "parent": parent}
+                        for name, (cum, own, parent) in sorted(self.imports.items(), key=lambda kv: -kv[1][0])],
+        }
+
+    def report(self, log, top=TOP_IMPORTS):
+        """逐行输出报告 (log 为 logger.info 等单参数函数)"""
+        ready = self.elapsed() if self.ready is None else self.ready
+        log(f"[StartupProfile] 就绪用时 {ready * 1000:.1f}ms, 总计 {self.elapsed() * 1000:.1f}ms (自 main.py 开始执行)")
+        for name, start, duration in self.phases:
+            log(f"  阶段 {name:28} +{start * 1000:8.1f}ms  {duration * 1000:8.1f}ms")
+        if self.imports:
+            log(f"  新导入 {len(self.imports)} 个模块, 按累计耗时前 {min(top, len(self.imports))} 个:")
+            log(f"  {'模块':40} {'累计':>9} {'自身':>9}")
+            for item in self.to_dict()["imports"][:top]:
+                log(f"  {item['module']:40} {item['cumulative_ms']:7.1f}ms {item['self_ms']:7.1f}ms")
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
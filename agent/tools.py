@@ -1,11 +1,41 @@
 import sys
 import logging
 import os
+import atexit
+import json
+import threading
 from datetime import datetime
 from pathlib import Path
 import locale
 import codecs
 
+from log_queue import AsyncLogging, CompressingFileHandler, append_line, prune_logs
+
+# 日志目录 (相对运行时工作目录)
+LOG_DIR = os.path.join(".", "logs_agent")
+
+# 日志滚动: 单个文件的大小上限（字节）与时间跨度（小时），每次启动的日志最多保留的滚动文件数
+LOG_MAX_BYTES = 20 * 1024 * 1024
+LOG_ROTATE_HOURS = 24
+LOG_BACKUP_COUNT = 10
+
+# 日志保留: 日志目录中最多保留的旧日志文件数与天数（0 表示不限制）
+LOG_RETENTION_FILES = 50
+LOG_RETENTION_DAYS = 14
+
+# 日志队列容量（条），队列满时丢弃并计数
+LOG_QUEUE_SIZE = 10000
+
+# 日志目录中的记录文件（回放时序 / 战斗轮次 JSONL）：单个文件的大小上限（字节）与保留的滚动文件数
+RECORD_MAX_BYTES = 10 * 1024 * 1024
+RECORD_BACKUP_COUNT = 5
+
+# 日志目录中同样按保留策略（数量与天数）清理的文件：滚动出的记录文件与跟踪文件
+RETAINED_PATTERNS = ("*.jsonl.*.gz", "trace_*.json")
+
+# 当前的异步日志 (setup_logging 创建)
+_async_logging = None
+
 # 保存原始编码设置
 _original_encoding = None
 _original_stdout_encoding = None
@@ -108,10 +138,18 @@ def restore_original_encoding():
         print(f"[编码管理] [错误] 还原编码时出错: {e}")
 
 
-def setup_logging():
-    """配置日志系统，将日志输出到文件和控制台"""
+def setup_logging(max_bytes=LOG_MAX_BYTES, rotate_hours=LOG_ROTATE_HOURS, backup_count=LOG_BACKUP_COUNT,
+                  keep_files=LOG_RETENTION_FILES, keep_days=LOG_RETENTION_DAYS, queue_size=LOG_QUEUE_SIZE):
+    """
+    配置日志系统，将日志输出到文件和控制台
+
+    logger 调用只把记录放入队列, 文件与控制台输出由后台线程完成 (见 log_queue);
+    文件按大小 / 时间滚动并 gzip 压缩, 日志目录按数量与天数保留
+    """
+    global _async_logging
+
     # 创建日志目录
-    log_dir = r".\logs_agent"
+    log_dir = LOG_DIR
     os.makedirs(log_dir, exist_ok=True)
     
     # 生成日志文件名（按日期和时间）
@@ -125,7 +163,8 @@ def setup_logging():
     # 配置根日志记录器（手动配置 handler，以实现不同输出级别）
     root_logger = logging.getLogger()
 
-    # 清除已有 handler，避免重复添加
+    # 停止上一次的后台写入线程, 清除已有 handler，避免重复添加
+    shutdown_logging()
     for h in list(root_logger.handlers):
         root_logger.removeHandler(h)
 
@@ -134,8 +173,15 @@ def setup_logging():
 
     formatter = logging.Formatter(log_format, datefmt=date_format)
 
-    # 文件处理器：DEBUG 及以上写入文件
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    def prune():
+        compressed, removed = prune_logs(log_dir, keep_files=keep_files, keep_days=keep_days, active=log_file)
+        for pattern in RETAINED_PATTERNS:
+            removed += prune_logs(log_dir, pattern, keep_files=keep_files, keep_days=keep_days)[1]
+        return compressed, removed
+
+    # 文件处理器：DEBUG 及以上写入文件; 超过大小或时间跨度时滚动压缩, 随后执行保留策略
+    file_handler = CompressingFileHandler(log_file, max_bytes=max_bytes, rotate_seconds=rotate_hours * 3600,
+                                          backup_count=backup_count, on_rollover=prune)
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
 
@@ -144,10 +190,46 @@ def setup_logging():
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
 
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    _async_logging = AsyncLogging(root_logger, [file_handler, console_handler], queue_size)
+    _async_logging.start()
+    atexit.register(shutdown_logging)
 
     logger = logging.getLogger(__name__)
     logger.info(f"日志系统已初始化，日志文件: {log_file}")
+
+    # 压缩 / 清理以前的日志文件可能较慢, 在后台进行
+    def prune_in_background():
+        compressed, removed = prune()
+        if compressed or removed:
+            logger.info(f"[Logging] 日志保留策略: 压缩 {compressed} 个, 删除 {removed} 个旧日志文件")
+
+    threading.Thread(target=prune_in_background, name="LogPrune", daemon=True).start()
     
-    return log_file
\ No newline at end of file
+    return log_file
+
+
+def append_record(path, record):
+    """向日志目录中的 JSONL 记录文件追加一条记录, 超过 RECORD_MAX_BYTES 时滚动压缩 (调用方加锁)"""
+    append_line(path, json.dumps(record, ensure_ascii=False), RECORD_MAX_BYTES, RECORD_BACKUP_COUNT)
+
+
+def logging_counters():
+    """
+    异步日志的计数: {"enqueued", "dropped", "depth", "max_depth"}; 未初始化时返回 None
+    """
+    if _async_logging is None:
+        return None
+    return _async_logging.counters()
+
+
+def shutdown_logging():
+    """写完队列中剩余的日志并停止后台写入线程 (可重复调用)"""
+    global _async_logging
+    if _async_logging is None:
+        return
+    handle, _async_logging = _async_logging, None
+    counters = handle.counters()
+    if counters["dropped"]:
+        logging.getLogger(__name__).warning(
+            f"[Logging] 本次运行共丢弃 {counters['dropped']} 条日志 (队列最大深度 {counters['max_depth']})")
+    handle.stop()
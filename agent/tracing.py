@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Chrome / Perfetto trace-event 跟踪
+
+说明:
+- 环境变量 MAD_AGENT_TRACE 开启 (由 main 在启动时调用 TRACER.enable_from_env()):
+  "1" / "true" 写入 logs_agent/trace_<时间戳>.json, 其他值视为输出文件路径
+- 输出为 trace-event JSON 数组格式, 用 chrome://tracing 或 https://ui.perfetto.dev 打开;
+  事件由后台线程每 FLUSH_INTERVAL 秒追加写入, 进程异常退出时文件缺少结尾的 "]" 也可以正常打开
+- 用法:
+    with TRACER.span("screencap"):          # 上下文管理器
+        ...
+    @traced("build_index")                  # 函数装饰器
+    def build_index(...): ...
+    @custom_action("AutoBattle")
+    @trace_action                           # 自定义动作: run() 整体为一个 span (放在注册装饰器之下)
+    class AutoBattle(CustomAction): ...
+- 关闭时 span() 返回共享的空上下文管理器, 开销只有一次属性判断
+"""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from tools import LOG_DIR
+
+logger = logging.getLogger(__name__)
+
+# 开启跟踪的环境变量
+TRACE_ENV = "MAD_AGENT_TRACE"
+
+# 后台写入间隔（秒）
+FLUSH_INTERVAL = 1.0
+
+# 单个跟踪文件最多记录的事件数, 超过后丢弃并计数 (避免长时间运行写满磁盘)
+MAX_EVENTS = 2_000_000
+
+
+class _NullSpan:
+    """跟踪关闭时使用的空 span"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """一个 complete ("X") 事件; set() 可在结束前补充参数"""
+
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.complete(self.name, self.start, end, self.cat, self.args)
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    trace-event 记录器 (线程安全)
+
+    事件时间戳为相对开启时刻的微秒数; 每个线程首次产生事件时写入线程名元数据
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self._lock = threading.Lock()
+        self._events = []
+        self._threads = set()
+        self._count = 0
+        self._dropped = 0
+        self._t0 = 0.0
+        self._pid = os.getpid()
+        self._file = None
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def enable_from_env(self):
+        """按环境变量 MAD_AGENT_TRACE 开启跟踪; 返回输出文件路径 (未开启时为 None)"""
+        value = os.environ.get(TRACE_ENV, "").strip()
+        if not value or value.lower() in ("0", "false", "no", "off"):
+            return None
+        path = None if value.lower() in ("1", "true", "yes", "on") else value
+        return self.enable(path)
+
+    def enable(self, path=None):
+        """开始记录并写入 path (默认 logs_agent/trace_<时间戳>.json)"""
+        if self.enabled:
+            return self.path
+        if path is None:
+            path = os.path.join(LOG_DIR, f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "w", encoding="utf-8")
+            self._file.write("[\n")
+        except OSError as e:
+            logger.warning(f"[Tracing] 无法创建跟踪文件 {path}: {e}")
+            return None
+        self.path = path
+        self._t0 = time.perf_counter()
+        self._threads.clear()
+        self._count = 0
+        self._dropped = 0
+        self._stop.clear()
+        self.enabled = True
+        self._flusher = threading.Thread(target=self._flush_loop, name="TraceFlush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.disable)
+        logger.info(f"[Tracing] 已开启跟踪, 输出: {path}")
+        return path
+
+    def disable(self):
+        """停止记录, 写完剩余事件并关闭文件"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self._flush()
+        with self._lock:
+            try:
+                # 结尾的元数据事件同时用于闭合数组
+                self._file.write(json.dumps(self._metadata("trace_stats", {"events": self._count,
+                                                                           "dropped": self._dropped})))
+                self._file.write("\n]\n")
+                self._file.close()
+            except OSError as e:
+                logger.warning(f"[Tracing] 写入跟踪文件失败: {e}")
+            self._file = None
+        logger.info(f"[Tracing] 跟踪已写入 {self.path} ({self._count} 个事件, 丢弃 {self._dropped} 个)")
+
+    def span(self, name, cat="agent", **args):
+        """返回记录 name 耗时的上下文管理器 (跟踪关闭时为空操作)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def complete(self, name, start, end, cat="agent", args=None):
+        """记录一个已结束的区间 (start / end 为 time.perf_counter 时刻)"""
+        if not self.enabled:
+            return
+        event = {"name": name, "cat": cat, "ph": "X", "pid": self._pid, "tid": threading.get_ident(),
+                 "ts": round((start - self._t0) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        self._append(event)
+
+    def instant(self, name, cat="agent", **args):
+        """记录一个时刻事件"""
+        if not self.enabled:
+            return
+        event = {"name": name, "cat": cat, "ph": "i", "s": "t", "pid": self._pid, "tid": threading.get_ident(),
+                 "ts": round((time.perf_counter() - self._t0) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        self._append(event)
+
+    def _metadata(self, name, args, tid=0):
+        return {"name": name, "ph": "M", "pid": self._pid, "tid": tid, "args": args}
+
+    def _append(self, event):
+        tid = event["tid"]
+        with self._lock:
+            if self._count >= MAX_EVENTS:
+                self._dropped += 1
+                return
+            if tid not in self._threads:
+                self._threads.add(tid)
+                self._events.append(self._metadata("thread_name", {"name": threading.current_thread().name}, tid))
+            self._events.append(event)
+            self._count += 1
+
+    def _flush(self):
+        with self._lock:
+            events, self._events = self._events, []
+            if not events or self._file is None:
+                return
+            try:
+                self._file.write("".join(json.dumps(e, ensure_ascii=False) + ",\n" for e in events))
+                self._file.flush()
+            except OSError as e:
+                logger.warning(f"[Tracing] 写入跟踪文件失败: {e}")
+
+    def _flush_loop(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            self._flush()
+
+
+# 全局跟踪器
+TRACER = Tracer()
+
+
+def traced(name=None, cat="agent"):
+    """函数装饰器: 每次调用记录一个 span (默认以函数限定名命名)"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with TRACER.span(span_name, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_action(cls):
+    """
+    自定义动作类装饰器: run() 记录为 span, 参数为 Pipeline 节点名与返回值
+
+    须放在 @custom_action (action_registry) 之下 (先包装 run, 再注册实例)
+    """
+    run = cls.run
+
+    @functools.wraps(run)
+    def wrapper(self, context, argv):
+        if not TRACER.enabled:
+            return run(self, context, argv)
+        with TRACER.span(cls.__name__, "action", node=getattr(argv, "node_name", None)) as span:
+            result = run(self, context, argv)
+            span.set(result=bool(result))
+            return result
+
+    cls.run = wrapper
+    return cls
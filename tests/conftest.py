@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共配置
+
+Agent 的模块以 agent/ 为根目录导入 (与 main.py 运行时一致), 依赖 MaaFramework (pip install maafw)。
+测试在临时目录中运行, 日志 / 时序 / 配置文件不会写入项目目录。
+"""
+
+import os
+import sys
+
+import pytest
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent")
+if AGENT_DIR not in sys.path:
+    sys.path.insert(0, AGENT_DIR)
+
+
+@pytest.fixture(autouse=True)
+def _work_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+
+@pytest.fixture
+def restore_config():
+    """测试结束后把 CONFIG_STORE 恢复为测试前的设置 (测试中的修改只在内存中, 不写配置文件)"""
+    from config_store import CONFIG_STORE
+
+    saved = dict(CONFIG_STORE.snapshot())
+    yield CONFIG_STORE
+    CONFIG_STORE.update(saved)
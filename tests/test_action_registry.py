@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""延迟加载: LazyAction 首次执行时才导入模块; 动作子模块互不连带导入; 序列索引按需建立"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import action_registry
+from action_registry import LazyAction
+from movement_action.sequence_cache import SequenceCache
+
+LAZY_MODULE = "lazy_probe_actions"
+
+MODULE_SOURCE = '''
+from maa.custom_action import CustomAction
+from action_registry import custom_action
+
+
+@custom_action("LazyProbe")
+class LazyProbe(CustomAction):
+    def run(self, context, argv):
+        return "ran"
+'''
+
+
+def test_lazy_action_imports_module_on_first_run(tmp_path, monkeypatch):
+    (tmp_path / (LAZY_MODULE + ".py")).write_text(MODULE_SOURCE, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, LAZY_MODULE, raising=False)
+
+    proxy = LazyAction("LazyProbe", LAZY_MODULE)
+    monkeypatch.setitem(action_registry._proxies, "LazyProbe", proxy)
+    try:
+        assert LAZY_MODULE not in sys.modules
+        assert proxy.target is None
+
+        assert proxy.run(None, None) == "ran"
+        assert LAZY_MODULE in sys.modules
+        target = proxy.target
+        assert proxy.run(None, None) == "ran"
+        assert proxy.target is target
+    finally:
+        sys.modules.pop(LAZY_MODULE, None)
+        action_registry._classes.pop("LazyProbe", None)
+
+
+def test_movement_action_submodules_load_independently():
+    # 新进程中检查 (当前进程的 sys.modules 已被其他测试填充)
+    code = (
+        "import sys\n"
+        "import movement_action.actions\n"
+        "assert 'movement_action.action_sequence' not in sys.modules, 'action_sequence'\n"
+        "import movement_action\n"
+        "assert 'movement_action.action_sequence' not in sys.modules, 'package'\n"
+        "movement_action.JsonActionSequence\n"
+        "assert 'movement_action.action_sequence' in sys.modules\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+
+def _write_sequence(action_dir, name):
+    os.makedirs(action_dir, exist_ok=True)
+    data = {"name": name, "total_time": 0.2,
+            "actions": [{"type": "key_down", "key": "w", "time": 0.0}, {"type": "key_up", "key": "w", "time": 0.1}]}
+    path = os.path.join(action_dir, name + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return path
+
+
+def test_resolve_builds_index_on_first_use(tmp_path):
+    path = _write_sequence(os.path.join(str(tmp_path), "agent", "action_json"), "route_a")
+    cache = SequenceCache()
+    assert cache.resolve("route_a.json") == (path, None)
+
+
+def test_resolve_waits_for_background_index_build(tmp_path, monkeypatch):
+    action_dir = str(tmp_path / "seq")
+    path = _write_sequence(action_dir, "route_a")
+    cache = SequenceCache()
+
+    started = threading.Event()
+    build = cache._build_index
+
+    def slow_build(directory):
+        started.set()
+        time.sleep(0.2)
+        return build(directory)
+
+    monkeypatch.setattr(cache, "_build_index", slow_build)
+    warm_up = threading.Thread(target=cache.build_index, args=(action_dir, False))
+    warm_up.start()
+    try:
+        assert started.wait(5)
+        # 预热尚未完成: resolve 等待其索引, 而不是返回 None 或按默认目录另建
+        assert cache.resolve("route_a") == (path, None)
+    finally:
+        warm_up.join(5)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""JsonActionSequence 回放: 时序记录 (outcome)"""
+
+import json
+
+from simulation import FakeContext, FakeController, VirtualClock, constant_latency
+from movement_action.action_sequence import JsonActionSequence
+from movement_action.sequence_cache import KEY_DOWN, KEY_UP
+from movement_action.telemetry import TimingRecorder, TIMING_FILE_NAME
+
+ACTIONS = [(0.0, KEY_DOWN, 0x57), (0.05, KEY_UP, 0x57), (0.10, KEY_DOWN, 0x44), (0.15, KEY_UP, 0x44)]
+
+
+def _play(tmp_path, context, clock, spin_ms=0):
+    recorder = TimingRecorder(log_dir=str(tmp_path))
+    action = JsonActionSequence(clock=clock.now, sleep=clock.sleep, spin_ms=spin_ms, recorder=recorder)
+    ok = action._execute_action_sequence(context, ACTIONS, "test_seq", compensate=False)
+    with open(tmp_path / TIMING_FILE_NAME, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    return ok, records
+
+
+def test_completed_playback_is_recorded(tmp_path):
+    clock = VirtualClock()
+    context = FakeContext(FakeController(virtual_clock=clock))
+    ok, records = _play(tmp_path, context, clock)
+    assert ok
+    assert [r["outcome"] for r in records] == ["completed"]
+    assert len(records[0]["events"]) == len(ACTIONS)
+
+
+def test_stopped_playback_is_recorded(tmp_path):
+    clock = VirtualClock()
+    context = FakeContext(FakeController(virtual_clock=clock))
+    context.tasker.post_stop()
+    ok, records = _play(tmp_path, context, clock)
+    assert not ok
+    assert [r["outcome"] for r in records] == ["stopped"]
+
+
+def test_failed_playback_is_recorded(tmp_path):
+    clock = VirtualClock()
+    controller = FakeController(virtual_clock=clock)
+
+    def broken(key):
+        raise RuntimeError("controller disconnected")
+
+    controller.post_key_up = broken
+    ok, records = _play(tmp_path, FakeContext(controller), clock)
+    assert not ok
+    assert [r["outcome"] for r in records] == ["error"]
+
+
+def _lateness_ms(tmp_path, spin_ms):
+    """在注入 1ms 唤醒误差的虚拟时钟上回放, 返回每个事件的派发迟到 (毫秒)"""
+    clock = VirtualClock(oversleep=constant_latency(1.0))
+    context = FakeContext(FakeController(virtual_clock=clock))
+    ok, records = _play(tmp_path, context, clock, spin_ms)
+    assert ok
+    return [(dispatched - planned) * 1000 for planned, dispatched, _ in records[-1]["events"]]
+
+
+def test_spin_on_virtual_clock_absorbs_oversleep(tmp_path):
+    # 虚拟时钟下自旋阶段同样推进时间 (不会死循环), 2ms 的自旋预算吸收 1ms 的唤醒误差
+    assert max(_lateness_ms(tmp_path, spin_ms=2)) < 0.1
+    # 不自旋时唤醒误差全部成为迟到 (第一个事件在起点, 无需等待)
+    assert min(_lateness_ms(tmp_path, spin_ms=0)[1:]) >= 0.9
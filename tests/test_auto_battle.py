@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""AutoBattle.battle: 重叠模式下等待轮后处理"""
+
+import threading
+import time
+
+from common import AutoBattle, BattleSettings
+from round_records import RoundResult, OUTCOME_HIT, OUTCOME_TIMEOUT
+from simulation import FakeContext, run_action
+
+
+def _battle(context, ready):
+    settings = BattleSettings(["again_for_win"], "test_auto_battle", None)
+    result = RoundResult(settings.stats_key, 2, 3)
+    return AutoBattle().battle(context, settings, result, ready)
+
+
+def _fast_config(store):
+    store.update({"round_timeout_ms": 300, "round_timeout_auto": False, "auto_battle_mode": 1,
+                  "detect_interval_min_ms": 20, "detect_interval_max_ms": 20})
+
+
+def test_ready_never_set_times_out(restore_config):
+    _fast_config(restore_config)
+    # 上一轮的结算画面一直可见: 命中被忽略, 不计入检测次数
+    context = FakeContext(recognition={"again_for_win": True})
+    begin = time.monotonic()
+    result = _battle(context, threading.Event())
+    assert result.outcome == OUTCOME_TIMEOUT
+    assert time.monotonic() - begin < 5
+    assert result.ticks == 0
+    assert len(context.recognition_calls) > 1
+
+
+def test_ticks_counted_after_ready(restore_config):
+    _fast_config(restore_config)
+    ready = threading.Event()
+
+    # 前 3 次识别为上一轮的结算画面 (第 3 次时轮后处理完成), 新一轮第 1 次未命中, 第 2 次命中
+    def recognize(node, image):
+        n = len(context.recognition_calls)
+        if n == 3:
+            ready.set()
+        return n != 4
+
+    context = FakeContext(recognition={"again_for_win": recognize})
+    result = _battle(context, ready)
+    assert result.outcome == OUTCOME_HIT
+    assert result.ticks == 2
+
+
+class _StuckPostRoundContext(FakeContext):
+    """轮后处理节点执行时任务被停止, 且节点一直不返回 (模拟卡住的 run_task)"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.release = threading.Event()
+
+    def run_task(self, entry, pipeline_override=None):
+        self.tasker.post_stop()
+        self.release.wait(30)
+        return super().run_task(entry, pipeline_override)
+
+
+def test_stop_during_overlapped_post_round_does_not_hang(restore_config):
+    _fast_config(restore_config)
+    restore_config.update({"battle_rounds": 3})
+    context = _StuckPostRoundContext(recognition={"again_for_win": True})
+    param = {"target_node": ["again_for_win"], "post_rounds": ["post_round"], "overlap_post_rounds": True}
+    try:
+        begin = time.monotonic()
+        assert run_action("MultiRoundsAutoBattle", param, context) is False
+        assert time.monotonic() - begin < 5
+    finally:
+        context.release.set()
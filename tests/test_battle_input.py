@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""自动战斗输入循环: 与检测循环解耦, 周期不累积误差, 共享停止信号"""
+
+import threading
+import time
+
+import pytest
+
+import keycodes
+from battle_input import InputLoop, PeriodicInput, build_inputs
+from cancellation import CancelToken
+from common import AutoBattle, BattleSettings
+from round_records import RoundResult, OUTCOME_HIT
+from simulation import FakeContext
+
+
+def test_build_inputs_follows_mode_and_extra_inputs():
+    assert [item.name for item in build_inputs(0, 500)] == ["E"]
+    assert build_inputs(1, 500) == []
+
+    inputs = build_inputs(1, 500, [{"key": 0x51, "interval_ms": 8000},
+                                   {"sequence": "dodge_roll", "interval_ms": 15000, "delay_ms": 3000}])
+    assert [(item.interval, item.delay) for item in inputs] == [(8.0, 0.0), (15.0, 3.0)]
+
+
+@pytest.mark.parametrize("extra", [
+    ["q"],
+    [{"key": 0x51}],
+    [{"key": 0x51, "interval_ms": 0}],
+    [{"key": 0x51, "interval_ms": 100, "delay_ms": -1}],
+    [{"key": 300, "interval_ms": 100}],
+    [{"interval_ms": 100}],
+])
+def test_build_inputs_rejects_invalid_extra_inputs(extra):
+    with pytest.raises(ValueError):
+        build_inputs(1, 500, extra)
+
+
+def _counter(interval, cost=0.0):
+    def fire(context):
+        if cost:
+            time.sleep(cost)
+    return PeriodicInput("probe", interval, fire)
+
+
+def test_loop_stops_with_shared_token():
+    item = _counter(0.02)
+    stop = CancelToken()
+    loop = InputLoop(FakeContext(), [item], stop)
+    loop.start()
+    time.sleep(0.2)
+    stop.cancel()
+    loop.join(2)
+    count = item.count
+    assert 5 <= count <= 12
+    time.sleep(0.1)
+    assert item.count == count
+
+
+def test_slow_input_does_not_burst_to_catch_up():
+    item = _counter(0.01, cost=0.05)
+    stop = CancelToken()
+    loop = InputLoop(FakeContext(), [item], stop)
+    loop.start()
+    time.sleep(0.3)
+    stop.cancel()
+    loop.join(2)
+    # 每次执行 50ms: 落后时只补一次, 不会连续补发 30 次
+    assert item.count <= 8
+
+
+def test_loop_waits_for_ready():
+    item = _counter(0.01)
+    ready = threading.Event()
+    stop = CancelToken()
+    loop = InputLoop(FakeContext(), [item], stop, ready=ready)
+    loop.start()
+    time.sleep(0.1)
+    assert item.count == 0
+    ready.set()
+    time.sleep(0.1)
+    stop.cancel()
+    loop.join(2)
+    assert item.count > 0
+
+
+def test_slow_detection_does_not_delay_skill_input(restore_config):
+    restore_config.update({"round_timeout_ms": 5000, "round_timeout_auto": False, "auto_battle_mode": 0,
+                           "auto_e_interval_ms": 20, "frame_gate": False,
+                           "detect_interval_min_ms": 20, "detect_interval_max_ms": 20})
+
+    # 每次识别 150ms, 第 3 次命中
+    def slow_recognize(node, image):
+        time.sleep(0.15)
+        return len(context.recognition_calls) >= 3
+
+    context = FakeContext(recognition={"again_for_win": slow_recognize})
+    settings = BattleSettings(["again_for_win"], "test_battle_input", None)
+    result = AutoBattle().battle(context, settings, RoundResult(settings.stats_key, 1, 1))
+
+    assert result.outcome == OUTCOME_HIT
+    clicks = [job for job in context.tasker.controller.jobs if job.kind == "click_key"]
+    assert all(job.args == (keycodes.VK_E,) for job in clicks)
+    # 约 450ms 的检测期间按 E 周期 20ms 照常执行, 而不是每次检测一次
+    assert len(clicks) >= 10
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""协作式取消: 停止后及时返回, 中途取消时全部按键被松开"""
+
+import threading
+import time
+
+import pytest
+
+from cancellation import ActionCancelled, CancelToken
+from simulation import FakeContext, FakeController, VirtualClock, run_action
+from movement_action.action_sequence import JsonActionSequence
+from movement_action.sequence_cache import KEY_DOWN, KEY_UP
+from movement_action.telemetry import TimingRecorder
+
+
+def _held_keys(controller):
+    """按提交顺序重放按键记录, 返回结束时仍按住的按键"""
+    held = set()
+    for _, kind, key in controller.key_jobs():
+        if kind == "key_down":
+            held.add(key)
+        else:
+            held.discard(key)
+    return held
+
+
+def _stop_later(context, delay):
+    timer = threading.Timer(delay, context.tasker.post_stop)
+    timer.start()
+    return timer
+
+
+def test_wait_returns_promptly_after_stop():
+    context = FakeContext()
+    token = CancelToken(context)
+    timer = _stop_later(context, 0.05)
+    begin = time.perf_counter()
+    try:
+        assert token.wait(5.0) is False
+    finally:
+        timer.cancel()
+    assert time.perf_counter() - begin < 1.0
+    assert token.cancelled
+    with pytest.raises(ActionCancelled):
+        token.sleep(1.0)
+
+
+def test_run_with_shift_cancelled_mid_hold_releases_keys():
+    context = FakeContext()
+    timer = _stop_later(context, 0.05)
+    begin = time.perf_counter()
+    try:
+        ok = run_action("RunWithShift", {"direction": "w", "duration": 5.0}, context)
+    finally:
+        timer.cancel()
+    assert ok is False
+    assert time.perf_counter() - begin < 1.0
+    controller = context.tasker.controller
+    assert controller.key_jobs()
+    assert _held_keys(controller) == set()
+
+
+def test_sequence_cancelled_mid_playback_releases_all_keys(tmp_path):
+    clock = VirtualClock()
+    controller = FakeController(virtual_clock=clock)
+    context = FakeContext(controller)
+    post_key_down = controller.post_key_down
+
+    def stop_after_second_down(key):
+        job = post_key_down(key)
+        if sum(1 for _, kind, _ in controller.key_jobs() if kind == "key_down") == 2:
+            context.tasker.post_stop()
+        return job
+
+    controller.post_key_down = stop_after_second_down
+    actions = [(0.0, KEY_DOWN, 0x57), (0.1, KEY_DOWN, 0x10), (0.5, KEY_DOWN, 0x44),
+               (1.0, KEY_UP, 0x10), (1.5, KEY_UP, 0x44), (2.0, KEY_UP, 0x57)]
+    action = JsonActionSequence(clock=clock.now, sleep=clock.sleep, spin_ms=0,
+                                recorder=TimingRecorder(log_dir=str(tmp_path)))
+    assert action._execute_action_sequence(context, actions, "test_seq", compensate=False) is False
+
+    downs = [key for _, kind, key in controller.key_jobs() if kind == "key_down"]
+    assert downs == [0x57, 0x10]
+    assert _held_keys(controller) == set()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""组合序列: 时间线拼接与拼接处按键合并 (_merge_seam)"""
+
+import pytest
+
+from movement_action.sequence_cache import KEY_DOWN, KEY_UP, CompiledSequence, compose_sequences
+
+W, D = 0x57, 0x44
+
+
+def _seq(name, total_time, *events, waypoints=()):
+    return CompiledSequence(name, None, total_time, 0x10, tuple(events), tuple(waypoints))
+
+
+def test_parts_are_offset_by_total_time_and_gap():
+    a = _seq("a", 1.0, (0.0, KEY_DOWN, D), (0.5, KEY_UP, D), waypoints=((0.5, "node_a"),))
+    b = _seq("b", 0.5, (0.1, KEY_DOWN, W), (0.4, KEY_UP, W))
+    composite = compose_sequences([(a, 1, 0.25), (b, 2, 0.1)])
+
+    assert composite.name == "a + bx2"
+    assert [(round(t, 6), action_type, vk) for t, action_type, vk in composite.events] == [
+        (0.0, KEY_DOWN, D), (0.5, KEY_UP, D),
+        (1.35, KEY_DOWN, W), (1.65, KEY_UP, W),
+        (1.95, KEY_DOWN, W), (2.25, KEY_UP, W),
+    ]
+    assert composite.waypoints == ((0.5, "node_a"),)
+    # 最后一部分之后的间隔不计入总时长
+    assert composite.total_time == pytest.approx(2.35)
+
+
+def test_release_and_press_at_the_seam_are_merged():
+    a = _seq("a", 1.0, (0.0, KEY_DOWN, W), (0.2, KEY_DOWN, D), (0.6, KEY_UP, D), (1.0, KEY_UP, W))
+    b = _seq("b", 1.0, (0.0, KEY_DOWN, W), (0.5, KEY_UP, W))
+    composite = compose_sequences([(a, 1, 0.0), (b, 1, 0.0)])
+
+    # W 在拼接处保持按住, D 不受影响
+    assert composite.events == (
+        (0.0, KEY_DOWN, W), (0.2, KEY_DOWN, D), (0.6, KEY_UP, D), (1.5, KEY_UP, W),
+    )
+
+
+def test_seam_with_gap_is_not_merged():
+    a = _seq("a", 1.0, (0.0, KEY_DOWN, W), (1.0, KEY_UP, W))
+    composite = compose_sequences([(a, 2, 0.1)])
+    assert [e[1] for e in composite.events] == [KEY_DOWN, KEY_UP, KEY_DOWN, KEY_UP]
+
+
+def test_repeated_part_is_held_across_every_seam():
+    a = _seq("a", 1.0, (0.0, KEY_DOWN, W), (1.0, KEY_UP, W))
+    composite = compose_sequences([(a, 3, 0.0)])
+    assert composite.events == ((0.0, KEY_DOWN, W), (3.0, KEY_UP, W))
+
+
+def test_only_the_previous_part_is_merged():
+    # b 的 W 在 0.0 按下, 但 a 的 W 早已松开 (不在拼接时刻): 不合并
+    a = _seq("a", 1.0, (0.0, KEY_DOWN, W), (0.5, KEY_UP, W), (1.0, KEY_UP, D))
+    b = _seq("b", 1.0, (0.0, KEY_DOWN, W), (0.0, KEY_DOWN, D), (0.5, KEY_UP, W), (0.6, KEY_UP, D))
+    composite = compose_sequences([(a, 1, 0.0), (b, 1, 0.0)])
+    assert composite.events == (
+        (0.0, KEY_DOWN, W), (0.5, KEY_UP, W),
+        (1.0, KEY_DOWN, W), (1.5, KEY_UP, W), (1.6, KEY_UP, D),
+    )
+
+
+def test_empty_composite_is_rejected():
+    with pytest.raises(ValueError):
+        compose_sequences([])
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""KeyDispatcher: 非阻塞提交, 后台回收, 失败记录"""
+
+import time
+
+from simulation import FakeController
+from movement_action.dispatch import KeyDispatcher
+from movement_action.sequence_cache import KEY_DOWN, KEY_UP
+
+
+class _Estimator:
+    def __init__(self):
+        self.samples = []
+
+    def update(self, rtt):
+        self.samples.append(rtt)
+
+
+def test_post_returns_before_jobs_complete():
+    controller = FakeController(latency=0.1)
+    estimator = _Estimator()
+    dispatcher = KeyDispatcher(controller, estimator=estimator)
+
+    begin = time.perf_counter()
+    futures = dispatcher.post_batch([(0, KEY_DOWN, 0x57), (1, KEY_DOWN, 0x44), (2, KEY_UP, 0x57)])
+    assert time.perf_counter() - begin < 0.05
+
+    assert dispatcher.finish(timeout=5) == []
+    assert all(f.done() and f.exception() is None for f in futures)
+    assert sorted(dispatcher.completed_at) == [0, 1, 2]
+    assert len(estimator.samples) == 3
+    # 控制器串行执行: 第三个 Job 的往返时间包含前两个
+    assert estimator.samples[-1] >= 0.25
+
+
+def test_failures_are_reported_with_event_index():
+    controller = FakeController()
+
+    def broken(key):
+        raise RuntimeError("controller disconnected")
+
+    controller.post_key_up = broken
+    dispatcher = KeyDispatcher(controller)
+    dispatcher.post(KEY_DOWN, 0x57, 0)
+    future = dispatcher.post(KEY_UP, 0x57, 1)
+
+    failures = dispatcher.finish(timeout=5)
+    assert [(f.index, f.action_type, f.vk) for f in failures] == [(1, KEY_UP, 0x57)]
+    assert isinstance(future.exception(), RuntimeError)
+
+
+def test_failed_job_is_reported():
+    controller = FakeController()
+    controller.post_key_down = lambda key: controller._post("key_down", key, succeeded=False)
+    dispatcher = KeyDispatcher(controller)
+    dispatcher.key_down(0x57)
+
+    failures = dispatcher.finish(timeout=5)
+    assert [f.index for f in failures] == [0]
+    assert 0 not in dispatcher.completed_at
+
+
+def test_release_all_releases_held_keys():
+    controller = FakeController()
+    dispatcher = KeyDispatcher(controller)
+    dispatcher.key_down(0x57)
+    dispatcher.key_down(0x44)
+    dispatcher.key_up(0x57)
+
+    assert dispatcher.release_all() == [0x44]
+    assert dispatcher.held == set()
+    dispatcher.finish(timeout=5)
+    assert [kind for _, kind, _ in controller.key_jobs()][-1] == "key_up"
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""FrameGate: 画面未变化时复用结果, 过期或连续复用达到上限后重新识别"""
+
+import numpy as np
+
+from frame_gate import FrameGate
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Recognizer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, context, node, image):
+        self.calls += 1
+        return self.calls
+
+
+FRAME = np.full((72, 128, 3), 100, dtype=np.uint8)
+
+
+def test_unchanged_frame_reuses_result():
+    gate = FrameGate(max_age=10.0, max_skips=100, clock=_Clock())
+    run = _Recognizer()
+    assert gate.recognize(None, "node", FRAME, run) == (1, True)
+    assert gate.recognize(None, "node", FRAME.copy(), run) == (1, False)
+    assert run.calls == 1
+
+
+def test_result_expires_after_max_age():
+    clock = _Clock()
+    gate = FrameGate(max_age=2.0, max_skips=100, clock=clock)
+    run = _Recognizer()
+    gate.recognize(None, "node", FRAME, run)
+    clock.now = 1.9
+    assert gate.recognize(None, "node", FRAME, run) == (1, False)
+    clock.now = 2.1
+    assert gate.recognize(None, "node", FRAME, run) == (2, True)
+    # 重新识别后重新计时
+    assert gate.recognize(None, "node", FRAME, run) == (2, False)
+
+
+def test_consecutive_skips_are_bounded():
+    gate = FrameGate(max_age=100.0, max_skips=3, clock=_Clock())
+    run = _Recognizer()
+    results = [gate.recognize(None, "node", FRAME, run) for _ in range(9)]
+    assert [evaluated for _, evaluated in results] == [True, False, False, False] * 2 + [True]
+    assert gate.counters()["node"] == {"evaluated": 3, "skipped": 6}
+
+
+def test_limits_come_from_the_given_snapshot(restore_config):
+    restore_config.update({"frame_gate_max_skips": 1, "frame_gate_max_age_ms": 60000})
+    config = restore_config.snapshot()
+    # 动作进行中的配置变化不影响已取得的快照
+    restore_config.update({"frame_gate_max_skips": 100})
+
+    gate = FrameGate(clock=_Clock())
+    run = _Recognizer()
+    results = [gate.recognize(None, "node", FRAME, run, config)[1] for _ in range(4)]
+    assert results == [True, False, True, False]
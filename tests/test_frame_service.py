@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""FrameService: 按帧龄复用截图, 并发请求合并"""
+
+import threading
+
+from frame_service import FrameService
+from simulation import FakeController
+
+
+def test_fresh_frame_is_reused():
+    service = FrameService()
+    controller = FakeController()
+    first = service.get(controller, max_age_ms=500)
+    second = service.get(controller, max_age_ms=500)
+    assert second is first
+    assert service.counters() == {"captures": 1, "reused": 1, "coalesced": 0}
+
+
+def test_zero_max_age_always_captures():
+    service = FrameService()
+    controller = FakeController()
+    first = service.get(controller, max_age_ms=0)
+    second = service.get(controller, max_age_ms=0)
+    assert second.seq == first.seq + 1
+    assert service.counters()["captures"] == 2
+
+
+def test_concurrent_requests_share_one_capture():
+    service = FrameService()
+    controller = FakeController(latency=0.1)
+    barrier = threading.Barrier(4)
+    frames = []
+
+    def request():
+        barrier.wait()
+        frames.append(service.get(controller, max_age_ms=1000))
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(frames) == 4 and len({id(frame) for frame in frames}) == 1
+    counters = service.counters()
+    assert counters["captures"] == 1
+    assert counters["coalesced"] + counters["reused"] == 3
+    assert len([job for job in controller.jobs if job.kind == "screencap"]) == 1
+
+
+def test_new_controller_and_invalidate_drop_buffered_frames():
+    service = FrameService()
+    first = service.get(FakeController(), max_age_ms=500)
+    other = FakeController()
+    assert service.get(other, max_age_ms=500) is not first
+    service.invalidate()
+    assert service.latest() is None
+    assert service.get(other, max_age_ms=500) is not None
+    assert service.counters()["captures"] == 3
+
+
+def test_failed_capture_returns_none():
+    service = FrameService()
+    controller = FakeController()
+    controller.post_screencap = lambda: controller._post("screencap", succeeded=False)
+    assert service.get(controller, max_age_ms=500) is None
+    assert service.latest() is None
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""控制器延迟估计与回放补偿"""
+
+import json
+
+import pytest
+
+from simulation import FakeContext, FakeController, VirtualClock
+from movement_action.action_sequence import JsonActionSequence
+from movement_action.latency import MIN_SAMPLES, LatencyEstimator
+from movement_action.sequence_cache import KEY_DOWN, KEY_UP
+from movement_action.telemetry import TimingRecorder, TIMING_FILE_NAME
+
+ACTIONS = [(0.0, KEY_DOWN, 0x57), (0.05, KEY_UP, 0x57), (0.10, KEY_DOWN, 0x44), (0.15, KEY_UP, 0x44)]
+
+
+def _trained(rtt, samples=MIN_SAMPLES * 2):
+    estimator = LatencyEstimator()
+    for _ in range(samples):
+        estimator.update(rtt)
+    return estimator
+
+
+def test_no_compensation_until_enough_samples(restore_config):
+    config = restore_config.snapshot()
+    estimator = _trained(0.01, MIN_SAMPLES - 1)
+    assert estimator.compensation(config=config) == 0.0
+    estimator.update(0.01)
+    assert estimator.compensation(config=config) == pytest.approx(0.01)
+
+
+def test_compensation_is_capped_and_can_be_disabled(restore_config):
+    estimator = _trained(0.2)
+    restore_config.update({"latency_compensation": True, "latency_compensation_max_ms": 30})
+    assert estimator.compensation(config=restore_config.snapshot()) == pytest.approx(0.03)
+    restore_config.update({"latency_compensation": False})
+    assert estimator.compensation(config=restore_config.snapshot()) == 0.0
+
+
+def test_spike_is_truncated():
+    estimator = _trained(0.01)
+    estimator.update(1.0)
+    mean_ms, _, samples = estimator.snapshot()
+    assert samples == MIN_SAMPLES * 2 + 1
+    # 方差为 0 时尖峰截断到均值, 估计不被单次卡顿拉偏
+    assert mean_ms == pytest.approx(10.0)
+
+
+def _completion_delay_ms(tmp_path, compensate):
+    clock = VirtualClock()
+    context = FakeContext(FakeController(latency=0.01, virtual_clock=clock))
+    action = JsonActionSequence(clock=clock.now, sleep=clock.sleep, spin_ms=0, estimator=_trained(0.01),
+                                recorder=TimingRecorder(log_dir=str(tmp_path)))
+    assert action._execute_action_sequence(context, ACTIONS, "test_seq", compensate=compensate)
+    with open(tmp_path / TIMING_FILE_NAME, encoding="utf-8") as f:
+        record = [json.loads(line) for line in f][-1]
+    return [(completed - planned) * 1000 for planned, _, completed in record["events"]]
+
+
+def test_playback_compensates_controller_latency(tmp_path, restore_config):
+    restore_config.update({"latency_compensation": True, "latency_compensation_max_ms": 30})
+    uncompensated = _completion_delay_ms(tmp_path, compensate=False)
+    compensated = _completion_delay_ms(tmp_path, compensate=True)
+    # 不补偿时按键在计划时刻之后约 10ms 生效; 补偿后提前提交, 生效时刻接近计划
+    # (第一个事件不会早于回放起点, 不参与比较)
+    assert min(uncompensated) >= 9.0
+    assert max(abs(d) for d in compensated[1:]) < 1.0
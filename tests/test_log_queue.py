@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""日志滚动、记录文件滚动与保留策略"""
+
+import gzip
+import logging
+import os
+import queue
+import time
+
+from log_queue import AsyncLogging, CompressingFileHandler, LogQueueHandler, append_line, prune_logs
+
+
+def _touch(path, mtime, content=b"x"):
+    with open(path, "wb") as f:
+        f.write(content)
+    os.utime(path, (mtime, mtime))
+
+
+def test_append_line_rotates_and_caps_backups(tmp_path):
+    path = str(tmp_path / "battle_rounds.jsonl")
+    for i in range(20):
+        append_line(path, f'{{"round": {i:03d}}}', max_bytes=40, backup_count=2)
+    assert sorted(os.listdir(tmp_path)) == ["battle_rounds.jsonl", "battle_rounds.jsonl.1.gz",
+                                           "battle_rounds.jsonl.2.gz"]
+    assert os.path.getsize(path) <= 40
+    # .1.gz 为最近一次滚动出的内容, 紧接在当前文件之前
+    with gzip.open(path + ".1.gz", "rt", encoding="utf-8") as f:
+        rotated = f.read().splitlines()
+    with open(path, encoding="utf-8") as f:
+        current = f.read().splitlines()
+    assert int(rotated[-1][10:13]) + 1 == int(current[0][10:13])
+
+
+def test_prune_logs_keeps_active_and_newest(tmp_path):
+    now = time.time()
+    active = tmp_path / "agent_active.log"
+    _touch(active, now - 100 * 86400)
+    for i in range(5):
+        _touch(tmp_path / f"agent_old{i}.log.1.gz", now - (i + 1) * 60)
+    compressed, removed = prune_logs(str(tmp_path), keep_files=3, keep_days=0, active=str(active), now=now)
+    assert (compressed, removed) == (0, 2)
+    assert sorted(os.listdir(tmp_path)) == ["agent_active.log", "agent_old0.log.1.gz",
+                                           "agent_old1.log.1.gz", "agent_old2.log.1.gz"]
+
+
+def test_prune_logs_compresses_old_logs_and_drops_expired(tmp_path):
+    now = time.time()
+    _touch(tmp_path / "agent_recent.log", now - 3600, b"recent")
+    _touch(tmp_path / "agent_expired.log", now - 30 * 86400)
+    _touch(tmp_path / "sequence_timing.jsonl.1.gz", now - 30 * 86400)
+    assert prune_logs(str(tmp_path), keep_days=14, now=now) == (2, 1)
+    assert sorted(os.listdir(tmp_path)) == ["agent_recent.log.gz", "sequence_timing.jsonl.1.gz"]
+    # 压缩后保留原修改时间
+    assert abs(os.path.getmtime(tmp_path / "agent_recent.log.gz") - (now - 3600)) < 2
+    assert prune_logs(str(tmp_path), "*.jsonl.*.gz", keep_days=14, now=now) == (0, 1)
+
+
+def _record(msg, level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 0, msg, None, None)
+
+
+def test_full_queue_drops_and_reports(tmp_path):
+    handler = LogQueueHandler(queue.Queue(2))
+    for i in range(3):
+        handler.handle(_record(f"info {i}"))
+    assert handler.counters()["dropped"] == 1
+
+    handler.queue.get_nowait()
+    handler.queue.get_nowait()
+    handler.handle(_record("after"))
+    messages = [handler.queue.get_nowait().getMessage() for _ in range(2)]
+    assert messages[0] == "after"
+    assert "丢弃了 1 条日志" in messages[1]
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_async_logging_flushes_on_stop():
+    root = logging.getLogger("test_async_logging")
+    root.propagate = False
+    root.setLevel(logging.INFO)
+    target = _ListHandler()
+    handle = AsyncLogging(root, [target], queue_size=1000)
+    handle.start()
+    for i in range(500):
+        root.info(f"line {i}")
+    handle.stop()
+    assert target.messages == [f"line {i}" for i in range(500)]
+    assert handle.counters()["dropped"] == 0
+
+
+def test_file_handler_rotates_by_size_and_time(tmp_path):
+    now = [0.0]
+    path = str(tmp_path / "agent_test.log")
+    handler = CompressingFileHandler(path, max_bytes=200, rotate_seconds=3600, backup_count=3,
+                                     clock=lambda: now[0])
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    try:
+        for i in range(10):
+            handler.handle(_record("x" * 50))
+        assert os.path.exists(path + ".1.gz")
+        sized = len([n for n in os.listdir(tmp_path) if n.endswith(".gz")])
+
+        # 打开超过 rotate_seconds 后的下一条记录触发滚动
+        now[0] += 3600
+        handler.handle(_record("after an hour"))
+        assert len([n for n in os.listdir(tmp_path) if n.endswith(".gz")]) == min(3, sized + 1)
+    finally:
+        handler.close()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "after an hour\n"
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".gz")]) <= 3
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""ParallelRecognizer: 多目标识别与配置快照"""
+
+import time
+
+import numpy as np
+
+from recognition import ParallelRecognizer
+from recognition_memo import RECOGNITION_MEMO, RecognitionMemo
+from frame_gate import FRAME_GATE
+from simulation import FakeContext
+
+NODES = ["again_for_win", "again_for_lose"]
+
+
+def _image(value):
+    return np.full((72, 128, 3), value, dtype=np.uint8)
+
+
+def test_first_hit_returns_hit_node(restore_config):
+    recognizer = ParallelRecognizer(max_workers=2)
+    context = FakeContext(recognition={"again_for_lose": True})
+    try:
+        tick = recognizer.first_hit(context, NODES, _image(1), restore_config.snapshot())
+    finally:
+        recognizer.shutdown()
+    assert tick.node == "again_for_lose"
+    assert set(tick.durations) <= set(NODES)
+
+
+def test_frame_gate_switch_is_read_from_snapshot(restore_config):
+    restore_config.update({"frame_gate": False})
+    config = restore_config.snapshot()
+    restore_config.update({"frame_gate": True})
+    FRAME_GATE.invalidate()
+    RECOGNITION_MEMO.invalidate()
+
+    recognizer = ParallelRecognizer(max_workers=1)
+    context = FakeContext()
+    try:
+        # 动作进行中打开画面门控: 本次检测仍按快照关闭, 不应出现跳过
+        for _ in range(2):
+            recognizer.first_hit(context, NODES[:1], _image(2), config)
+    finally:
+        recognizer.shutdown()
+    assert FRAME_GATE.counters().get(NODES[0], {}).get("skipped", 0) == 0
+
+
+def test_memo_ttl_is_read_from_snapshot(restore_config):
+    restore_config.update({"recognition_memo_ttl_ms": 60000})
+    config = restore_config.snapshot()
+    restore_config.update({"recognition_memo_ttl_ms": 0})
+    memo = RecognitionMemo(clock=iter(range(0, 100, 1)).__next__)
+
+    context = FakeContext()
+    memo.recognize(context, NODES[0], _image(3), config=config)
+    _, cached = memo.recognize(context, NODES[0], _image(3), config=config)
+    assert cached
+    _, cached = memo.recognize(context, NODES[0], _image(3))
+    assert not cached
+
+
+def _uncached(restore_config):
+    """关闭画面门控并清空识别缓存, 每次检测都实际执行识别"""
+    restore_config.update({"frame_gate": False})
+    FRAME_GATE.invalidate()
+    RECOGNITION_MEMO.invalidate()
+    return restore_config.snapshot()
+
+
+def test_nodes_are_recognized_concurrently_on_one_frame(restore_config):
+    config = _uncached(restore_config)
+    seen = []
+
+    def slow_miss(node, image):
+        seen.append(id(image))
+        time.sleep(0.1)
+        return False
+
+    nodes = ["node_a", "node_b", "node_c"]
+    context = FakeContext(recognition={node: slow_miss for node in nodes})
+    recognizer = ParallelRecognizer(max_workers=3)
+    image = _image(4)
+    try:
+        tick = recognizer.first_hit(context, nodes, image, config)
+    finally:
+        recognizer.shutdown()
+
+    assert not tick.hit
+    assert set(tick.durations) == set(nodes)
+    # 三个 100ms 的识别并发执行, 总耗时远小于串行的 300ms
+    assert tick.elapsed < 0.25
+    assert seen == [id(image)] * 3
+    assert all(recognizer.stats.summary(node)["count"] == 1 for node in nodes)
+
+
+def test_first_hit_does_not_wait_for_slow_nodes(restore_config):
+    config = _uncached(restore_config)
+
+    def slow_miss(node, image):
+        time.sleep(0.5)
+        return False
+
+    context = FakeContext(recognition={"fast_hit": True, "slow_miss": slow_miss})
+    recognizer = ParallelRecognizer(max_workers=2)
+    try:
+        tick = recognizer.first_hit(context, ["slow_miss", "fast_hit"], _image(5), config)
+    finally:
+        recognizer.shutdown()
+
+    assert tick.node == "fast_hit"
+    assert tick.elapsed < 0.4
+    assert "slow_miss" not in tick.durations
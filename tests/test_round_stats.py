@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""战斗时长统计: 自适应检测节奏, 持久化, 自动单轮超时"""
+
+import random
+
+import pytest
+
+from round_stats import DetectionCadence, P2Quantile, RoundStats
+
+CADENCE = {"detect_interval_min_ms": 500, "detect_interval_max_ms": 5000, "detect_burst_margin_ms": 5000}
+
+
+def test_cadence_without_history_uses_slow_interval():
+    cadence = DetectionCadence(None, CADENCE)
+    assert cadence.interval(0.0) == 5.0
+    assert cadence.interval(100.0) == 5.0
+
+
+def test_cadence_bursts_inside_expected_window():
+    cadence = DetectionCadence((20.0, 25.0, 30.0), CADENCE)
+    assert cadence.window == (15.0, 35.0)
+    assert cadence.interval(0.0) == 5.0
+    # 不跨过窗口起点
+    assert cadence.interval(13.0) == pytest.approx(2.0)
+    assert cadence.interval(14.9) == 0.5
+    assert cadence.interval(20.0) == 0.5
+    assert cadence.interval(35.0) == 0.5
+    # 本轮明显偏长: 回到慢速
+    assert cadence.interval(40.0) == 5.0
+
+
+def test_p2_quantile_tracks_distribution():
+    rng = random.Random(1)
+    estimators = {p: P2Quantile(p) for p in (0.5, 0.9, 0.99)}
+    for _ in range(5000):
+        x = rng.random()
+        for est in estimators.values():
+            est.add(x)
+    for p, est in estimators.items():
+        assert est.value() == pytest.approx(p, abs=0.03)
+
+
+def test_stats_persist_across_instances(tmp_path):
+    path = str(tmp_path / "round_stats.json")
+    stats = RoundStats(path=path)
+    for seconds in (30.0, 32.0, 31.0):
+        stats.record("battle", seconds)
+
+    reloaded = RoundStats(path=path)
+    assert reloaded.history("battle") == [30.0, 32.0, 31.0]
+    learned = reloaded.learned("battle")
+    assert learned["count"] == 3 and learned["max"] == 32.0
+    assert learned["p50"] == pytest.approx(31.0)
+    assert reloaded.expected("battle")[1] == pytest.approx(31.0)
+
+
+def test_corrupt_stats_file_starts_empty(tmp_path):
+    path = tmp_path / "round_stats.json"
+    path.write_text("{not json", encoding="utf-8")
+    stats = RoundStats(path=str(path))
+    assert stats.keys() == []
+    stats.record("battle", 10.0)
+    assert RoundStats(path=str(path)).history("battle") == [10.0]
+
+
+def test_auto_round_timeout_needs_enough_rounds():
+    config = {"round_timeout_ms": 200000, "round_timeout_auto": True,
+              "round_timeout_auto_min_rounds": 3, "round_timeout_auto_margin_ms": 10000}
+    stats = RoundStats()
+    stats.record("battle", 40.0)
+    assert stats.round_timeout("battle", config)[0] == 200000
+
+    stats.record("battle", 50.0)
+    stats.record("battle", 45.0)
+    timeout, _ = stats.round_timeout("battle", config)
+    # 最近最长一轮 50s + 10s 余量
+    assert timeout == pytest.approx(60000)
+    # 不超过固定上限
+    assert stats.round_timeout("battle", dict(config, round_timeout_ms=55000))[0] == 55000
+    assert stats.round_timeout("battle", dict(config, round_timeout_auto=False))[0] == 200000
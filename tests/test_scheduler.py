@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""DeadlineScheduler: 绝对截止时间, 同时刻批量触发, 取消"""
+
+from cancellation import CancelToken
+from simulation import VirtualClock, constant_latency
+from movement_action.scheduler import DeadlineScheduler
+
+
+def _scheduler(clock, spin_ms=0, cancel_token=None):
+    return DeadlineScheduler(spin_ms, clock.now, clock.sleep, cancel_token=cancel_token)
+
+
+def test_lateness_does_not_accumulate_across_events():
+    clock = VirtualClock(oversleep=constant_latency(1.0))
+    events = [(i * 0.05, i) for i in range(20)]
+    fired = []
+    result = _scheduler(clock).run(events, lambda i, event: fired.append(clock.now()))
+
+    assert result.completed
+    # 每次唤醒迟到约 1ms, 但截止时刻按起点计算: 最后一个事件不会迟到 20 × 1ms
+    drift = [at - (result.start + t) for at, (t, _) in zip(fired, events)]
+    assert max(drift) < 0.002
+    assert max(result.lateness) < 0.002
+
+
+def test_events_at_the_same_time_fire_back_to_back():
+    clock = VirtualClock()
+    events = [(0.1, "a"), (0.1, "b"), (0.2, "c")]
+    order = []
+    result = _scheduler(clock).run(events, lambda i, event: order.append(event[1]))
+
+    assert order == ["a", "b", "c"]
+    assert result.lateness[0] == result.lateness[1]
+
+
+def test_given_start_is_used_as_origin():
+    clock = VirtualClock(start=5.0)
+    fired = []
+    result = _scheduler(clock).run([(1.0, "a")], lambda i, event: fired.append(clock.now()), start=2.0)
+
+    assert result.start == 2.0
+    assert 3.0 <= fired[0] < 5.1
+
+
+def test_cancel_stops_before_remaining_events():
+    clock = VirtualClock()
+    token = CancelToken()
+    events = [(0.0, "a"), (0.5, "b"), (1.0, "c")]
+    fired = []
+
+    def fire(i, event):
+        fired.append(event[1])
+        token.cancel()
+
+    result = _scheduler(clock, cancel_token=token).run(events, fire)
+    assert not result.completed
+    assert fired == ["a"]
+
+
+def test_fire_returning_false_aborts():
+    clock = VirtualClock()
+    result = _scheduler(clock).run([(0.0, "a"), (0.1, "b")], lambda i, event: False)
+    assert not result.completed
+    assert len(result.lateness) == 1
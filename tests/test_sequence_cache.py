@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""SequenceCache 索引: 序列库与独立文件的优先级"""
+
+import json
+import os
+
+from movement_action.packed_sequence import LIBRARY_FILE_NAME, convert_directory, open_library
+from movement_action.sequence_cache import SequenceCache
+
+SEQUENCE = {
+    "name": "jj_60_part1_1",
+    "total_time": 1.0,
+    "actions": [
+        {"type": "key_down", "key": "w", "time": 0.1},
+        {"type": "key_up", "key": "w", "time": 0.5},
+        {"type": "key_down", "key": "shift", "time": 0.6},
+        {"type": "key_up", "key": "shift", "time": 0.7},
+    ],
+}
+
+
+def _write_json(action_dir, name, data=SEQUENCE):
+    path = os.path.join(action_dir, name + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return path
+
+
+def test_library_only_directory_resolves_pipeline_names(tmp_path):
+    json_path = _write_json(tmp_path, "jj_60_part1_1")
+    convert_directory(str(tmp_path))
+    os.remove(json_path)
+
+    cache = SequenceCache()
+    assert cache.build_index(str(tmp_path), warm=False) == 1
+    library_path = os.path.join(str(tmp_path), LIBRARY_FILE_NAME)
+    for name in ("jj_60_part1_1", "jj_60_part1_1.json", "jj_60_part1_1.seqb"):
+        assert cache.resolve(name) == (library_path, "jj_60_part1_1")
+
+    compiled = cache.get(*cache.resolve("jj_60_part1_1.json"))
+    assert len(compiled.events) == len(SEQUENCE["actions"])
+
+
+def test_library_wins_over_standalone_json(tmp_path):
+    _write_json(tmp_path, "jj_60_part1_1")
+    convert_directory(str(tmp_path))
+    _write_json(tmp_path, "extra", dict(SEQUENCE, name="extra"))
+
+    cache = SequenceCache()
+    cache.build_index(str(tmp_path), warm=False)
+    library_path = os.path.join(str(tmp_path), LIBRARY_FILE_NAME)
+    assert cache.resolve("jj_60_part1_1.json") == (library_path, "jj_60_part1_1")
+    # 库中没有的序列仍使用独立文件
+    assert cache.resolve("extra.json") == (os.path.join(str(tmp_path), "extra.json"), None)
+
+
+def test_warm_skips_json_covered_by_library(tmp_path, monkeypatch):
+    _write_json(tmp_path, "jj_60_part1_1")
+    convert_directory(str(tmp_path))
+
+    loaded = []
+    original = json.load
+    monkeypatch.setattr(json, "load", lambda f, *a, **k: loaded.append(f.name) or original(f, *a, **k))
+
+    cache = SequenceCache()
+    cache.build_index(str(tmp_path), warm=True)
+    assert loaded == []
+    assert cache.misses == 1
+
+
+def test_library_can_be_repacked_while_open(tmp_path):
+    _write_json(tmp_path, "jj_60_part1_1")
+    convert_directory(str(tmp_path))
+    library_path = os.path.join(str(tmp_path), LIBRARY_FILE_NAME)
+    library = open_library(library_path)
+    assert library.names() == ["jj_60_part1_1"]
+
+    # 重新打包 (os.replace 替换正在使用的序列库), 之后按 mtime 重新读取
+    _write_json(tmp_path, "extra", dict(SEQUENCE, name="extra"))
+    convert_directory(str(tmp_path))
+    stat = os.stat(library_path)
+    os.utime(library_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert sorted(open_library(library_path).names()) == ["extra", "jj_60_part1_1"]
+
+
+def test_json_and_library_sources_share_the_route_name(tmp_path):
+    # JSON 中的 "name" 与文件名不同: 两种来源的编译结果都以文件名 (序列名) 命名
+    _write_json(tmp_path, "route_a", dict(SEQUENCE, name="录制时的名称"))
+    json_cache = SequenceCache()
+    json_cache.build_index(str(tmp_path), warm=False)
+    from_json = json_cache.get(*json_cache.resolve("route_a.json"))
+
+    convert_directory(str(tmp_path))
+    library_cache = SequenceCache()
+    library_cache.build_index(str(tmp_path), warm=False)
+    from_library = library_cache.get(*library_cache.resolve("route_a.json"))
+
+    assert from_json.name == from_library.name == "route_a"
+    assert from_json.events == from_library.events
+
+
+def test_get_reads_dodge_key_from_snapshot(tmp_path, restore_config):
+    path = _write_json(tmp_path, "jj_60_part1_1")
+    restore_config.update({"dodge_key": 0x10})
+    config = restore_config.snapshot()
+    # 动作开始后热更新闪避键: 本次编译仍按快照中的闪避键
+    restore_config.update({"dodge_key": 0x11})
+
+    cache = SequenceCache()
+    assert cache.get(path, config=config).dodge_vk == 0x10
+    assert cache.get_composite([((path, None), 2, 0.0)], config).dodge_vk == 0x10
+    assert cache.get(path).dodge_vk == 0x11
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""动作序列离线优化器"""
+
+import copy
+
+from movement_action.sequence_optimizer import optimize_sequence
+
+
+def _seq(*actions, total_time=None):
+    actions = [{"type": t, "key": k, "time": time} for t, k, time in actions]
+    return {"name": "route", "total_time": total_time if total_time is not None else actions[-1]["time"],
+            "actions": actions}
+
+
+def _events(data):
+    return [(a["type"], a["key"], a["time"]) for a in data["actions"]]
+
+
+def test_overlapping_holds_are_merged():
+    data = _seq(("key_down", "w", 0.0), ("key_down", "W", 0.2), ("key_up", "w", 0.5), ("key_up", "w", 0.8))
+    optimized, report = optimize_sequence(data)
+    assert _events(optimized) == [("key_down", "w", 0.0), ("key_up", "w", 0.5)]
+    assert (report.original_events, report.optimized_events) == (4, 2)
+
+
+def test_short_release_is_merged_into_one_hold():
+    data = _seq(("key_down", "w", 0.0), ("key_up", "w", 0.5), ("key_down", "w", 0.52), ("key_up", "w", 1.0))
+    optimized, _ = optimize_sequence(data, merge_gap=0.05)
+    assert _events(optimized) == [("key_down", "w", 0.0), ("key_up", "w", 1.0)]
+
+
+def test_empty_holds_are_dropped():
+    data = _seq(("key_down", "e", 0.0), ("key_up", "e", 0.01), ("key_down", "w", 0.1), ("key_up", "w", 0.6))
+    optimized, _ = optimize_sequence(data, min_hold=0.02)
+    assert _events(optimized) == [("key_down", "w", 0.0), ("key_up", "w", 0.5)]
+
+
+def test_idle_compression_keeps_hold_durations():
+    data = _seq(("key_down", "w", 0.0), ("key_up", "w", 1.0),
+                ("key_down", "d", 3.0), ("key_up", "d", 3.5), total_time=4.0)
+    optimized, report = optimize_sequence(data, idle_ratio=0.25, min_idle=0.1)
+    # 空闲段 2.0s -> 0.5s, 按住时长不变
+    assert _events(optimized) == [("key_down", "w", 0.0), ("key_up", "w", 1.0),
+                                  ("key_down", "d", 1.5), ("key_up", "d", 2.0)]
+    assert optimized["total_time"] == 2.0
+    assert report.saved == 2.0
+
+
+def test_leading_idle_is_trimmed_and_input_is_not_modified():
+    data = _seq(("key_down", "w", 1.5), ("key_up", "w", 2.0))
+    original = copy.deepcopy(data)
+    optimized, _ = optimize_sequence(data, lead=0.1)
+    assert _events(optimized) == [("key_down", "w", 0.1), ("key_up", "w", 0.6)]
+    assert data == original
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""设置校验与写入"""
+
+import pytest
+
+from setting import apply_settings, validate_settings
+from simulation import FakeContext, run_action
+
+
+def test_zero_timeout_enables_auto():
+    assert validate_settings({"round_timeout_ms": 0}) == ({"round_timeout_auto": True}, [])
+
+
+def test_nonzero_timeout_disables_auto():
+    assert validate_settings({"round_timeout_ms": 180000}) == (
+        {"round_timeout_ms": 180000, "round_timeout_auto": False}, [])
+
+
+def test_explicit_auto_flag_wins():
+    normalized, errors = validate_settings({"round_timeout_ms": 180000, "round_timeout_auto": True})
+    assert not errors
+    assert normalized["round_timeout_auto"] is True
+
+
+def test_fixed_timeout_after_auto(restore_config):
+    apply_settings({"round_timeout_ms": 0}, "test")
+    assert restore_config.get("round_timeout_auto") is True
+
+    apply_settings({"round_timeout_ms": 180000}, "test")
+    assert restore_config.get("round_timeout_auto") is False
+    assert restore_config.get("round_timeout_ms") == 180000
+
+
+def test_values_are_coerced():
+    assert validate_settings({"battle_rounds": "5", "auto_e_interval_ms": 500.0, "round_timeout_auto": "true"}) == (
+        {"battle_rounds": 5, "auto_e_interval_ms": 500, "round_timeout_auto": True}, [])
+
+
+@pytest.mark.parametrize("values", [
+    {"dodge_key": 300},
+    {"dodge_key": 0},
+    {"auto_battle_mode": 2},
+    {"battle_rounds": 0},
+    {"battle_rounds": True},
+    {"auto_e_interval_ms": "fast"},
+    {"round_timeout_ms": -1},
+    {"unknown_key": 1},
+])
+def test_invalid_values_are_rejected(values):
+    normalized, errors = validate_settings(values)
+    assert errors
+
+
+def _node(param):
+    # Pipeline V2 格式 (V1 为顶层 custom_action_param)
+    return {"action": {"type": "Custom", "param": {"custom_action": "x", "custom_action_param": param}}}
+
+
+def test_apply_settings_collects_all_setting_nodes(restore_config):
+    context = FakeContext(node_data={
+        "set_dodge_key": {"custom_action_param": {"dodge_key": 0x20}},
+        "set_auto_battle_mode": _node({"auto_battle_mode": 1}),
+        "set_battle_rounds": _node('{"battle_rounds": 4}'),
+    })
+    assert run_action("ApplySettings", {"settings": {"battle_rounds": 7}}, context) is True
+    config = restore_config.snapshot()
+    assert (config["dodge_key"], config["auto_battle_mode"], config["battle_rounds"]) == (0x20, 1, 7)
+
+
+def test_apply_settings_rejects_out_of_range_values_atomically(restore_config):
+    before = restore_config.snapshot()
+    context = FakeContext(node_data={
+        "set_battle_rounds": _node({"battle_rounds": before["battle_rounds"] + 1}),
+        "set_dodge_key": _node({"dodge_key": 300}),
+    })
+    assert run_action("ApplySettings", {}, context) is False
+    # 任一项不合法则全部不生效
+    assert restore_config.snapshot().version == before.version
+    assert restore_config.get("battle_rounds") == before["battle_rounds"]
+
+
+def test_apply_settings_rejects_invalid_node_json(restore_config):
+    before = restore_config.version
+    context = FakeContext(node_data={"set_battle_rounds": _node("{not json")})
+    assert run_action("ApplySettings", {}, context) is False
+    assert restore_config.version == before
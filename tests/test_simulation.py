@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""模拟环境: 动作发现"""
+
+from action_registry import ACTION_MODULES
+from simulation import load_actions
+
+
+def test_load_actions_returns_registered_custom_actions():
+    actions = load_actions()
+    assert "_PostRound" not in actions
+    assert set(actions) == set(ACTION_MODULES)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""trace-event 跟踪: 输出为合法的 Chrome trace JSON"""
+
+import json
+import threading
+
+import pytest
+
+from simulation import FakeContext, run_action
+from tracing import TRACER, Tracer, traced
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_trace_file_is_valid_chrome_json(tmp_path):
+    tracer = Tracer()
+    path = tracer.enable(str(tmp_path / "trace.json"))
+
+    def work():
+        with tracer.span("in_worker"):
+            pass
+
+    with tracer.span("outer", detail=1) as span:
+        span.set(result=True)
+        worker = threading.Thread(target=work, name="Worker")
+        worker.start()
+        worker.join()
+    tracer.instant("marker", value=2)
+    with pytest.raises(RuntimeError):
+        with tracer.span("failing"):
+            raise RuntimeError("boom")
+    tracer.disable()
+
+    events = _load(path)
+    assert isinstance(events, list)
+    for event in events:
+        assert event["ph"] in ("X", "i", "M")
+        assert isinstance(event["pid"], int) and isinstance(event["tid"], int)
+        if event["ph"] == "X":
+            assert event["ts"] >= 0 and event["dur"] >= 0
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert spans["outer"]["args"] == {"detail": 1, "result": True}
+    assert spans["failing"]["args"] == {"error": "RuntimeError"}
+    assert spans["in_worker"]["tid"] != spans["outer"]["tid"]
+    # 子区间落在父区间之内
+    assert spans["outer"]["ts"] <= spans["in_worker"]["ts"]
+    assert spans["in_worker"]["ts"] + spans["in_worker"]["dur"] <= spans["outer"]["ts"] + spans["outer"]["dur"]
+    thread_names = {e["args"]["name"] for e in events if e["name"] == "thread_name"}
+    assert "Worker" in thread_names
+    assert [e["args"]["value"] for e in events if e["ph"] == "i"] == [2]
+    assert events[-1]["name"] == "trace_stats" and events[-1]["args"]["events"] == 4
+
+
+def test_unterminated_trace_is_still_readable(tmp_path):
+    tracer = Tracer()
+    path = tracer.enable(str(tmp_path / "trace.json"))
+    with tracer.span("step"):
+        pass
+    tracer._flush()
+    # 进程异常退出时缺少结尾: 去掉最后的逗号并补上 "]" 即为合法 JSON (查看器会自动处理)
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    events = json.loads(content.rstrip().rstrip(",") + "]")
+    assert [e["name"] for e in events if e["ph"] == "X"] == ["step"]
+    tracer.disable()
+
+
+def test_disabled_tracer_records_nothing(tmp_path):
+    tracer = Tracer()
+    assert tracer.span("noop") is tracer.span("other")
+    with tracer.span("noop"):
+        pass
+    tracer.instant("noop")
+    assert tracer._events == []
+
+
+def test_custom_actions_and_traced_functions_emit_spans(tmp_path):
+    path = TRACER.enable(str(tmp_path / "trace.json"))
+
+    @traced("helper")
+    def helper():
+        return 1
+
+    try:
+        assert helper() == 1
+        assert run_action("LongPressKey", {"key": "w", "duration": 0}, FakeContext(), node_name="press_w")
+    finally:
+        TRACER.disable()
+
+    events = _load(path)
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert "helper" in spans
+    action = spans["LongPressKey"]
+    assert action["cat"] == "action"
+    assert action["args"] == {"node": "press_w", "result": True}
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""WaypointMonitor: 与调度器共用回放起点; 停止时校验或报告剩余路径点"""
+
+import time
+
+from cancellation import CancelToken
+from recognition_memo import RECOGNITION_MEMO
+from simulation import FakeContext
+from movement_action.action_sequence import JsonActionSequence
+from movement_action.sequence_cache import KEY_DOWN, KEY_UP
+from movement_action.telemetry import TimingRecorder
+from movement_action.waypoints import WaypointMonitor
+
+NODE = "route_checkpoint"
+ACTIONS = [(0.0, KEY_DOWN, 0x57), (0.02, KEY_UP, 0x57)]
+
+
+def _context(hit):
+    RECOGNITION_MEMO.invalidate()
+    return FakeContext(recognition={NODE: hit})
+
+
+def test_monitor_times_waypoints_from_given_start():
+    monitor = WaypointMonitor(_context(True), ((1.0, NODE),))
+    # 回放起点已过去 10 秒: 路径点立即校验, 时间相对传入的起点
+    monitor.start(CancelToken(), time.perf_counter() - 10.0)
+    monitor.stop(drain=True)
+    assert [r.hit for r in monitor.results] == [True]
+    assert monitor.results[0].captured_at >= 10.0
+
+
+def test_stop_with_drain_checks_remaining_waypoints():
+    monitor = WaypointMonitor(_context(True), ((0.0, NODE), (60.0, NODE)))
+    monitor.start(CancelToken())
+    monitor.stop(drain=True)
+    assert [r.time for r in monitor.results] == [0.0, 60.0]
+    assert monitor.unchecked == []
+
+
+def test_stop_without_drain_reports_unchecked_waypoints():
+    monitor = WaypointMonitor(_context(True), ((60.0, NODE),))
+    monitor.start(CancelToken())
+    monitor.stop()
+    assert monitor.results == []
+    assert monitor.unchecked == [(60.0, NODE)]
+
+
+def test_miss_after_last_key_fails_playback(tmp_path):
+    context = _context(False)
+    action = JsonActionSequence(spin_ms=0, recorder=TimingRecorder(log_dir=str(tmp_path)))
+    monitor = WaypointMonitor(context, ((30.0, NODE),), abort_on_miss=True, clock=action.clock)
+    begin = time.perf_counter()
+    ok = action._execute_action_sequence(context, ACTIONS, "test_seq", compensate=False, monitor=monitor)
+    # 不等待路径点时刻, 回放结束后立即校验
+    assert time.perf_counter() - begin < 10.0
+    assert not ok
+    assert monitor.missed is not None and monitor.missed.time == 30.0
@@ -46,12 +46,22 @@ except Exception:
 # no datas added for actionJSON here.
 
 
+# 自定义动作模块由 agent/action_registry.py 延迟导入 (importlib), 静态分析发现不了,
+# 须与 ACTION_MODULES 中的模块保持一致
+lazy_action_modules = [
+    'setting',
+    'common',
+    'movement_action.actions',
+    'movement_action.action_sequence',
+]
+
+
 a = Analysis(
     [os.path.join(spec_root, 'agent', 'main.py')],
     pathex=[],
     binaries=[],
     datas=datas_list,
-    hiddenimports=[],
+    hiddenimports=lazy_action_modules,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
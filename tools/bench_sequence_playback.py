@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+动作序列回放基准测试
+
+通过 JsonActionSequence 回放 agent/action_json 下的全部序列, 控制器替换为模拟控制器
+(agent/simulation.py), 按指定的耗时模型注入 Job 延迟, 输出每条路线的时序误差:
+
+    误差 = 按键实际生效时刻 (派发 + Job 耗时) - 计划时刻
+
+可选虚拟时钟模式 (--virtual): 调度器的睡眠只推进虚拟时间, 整个序列库可在远少于实时的时间内跑完,
+用于比较调度策略 (--spin-ms 可给多个值) 与在打包前发现时序回归 (--baseline)。
+虚拟时钟下每次睡眠按 --oversleep 模型多睡一段时间 (系统定时器的唤醒误差), 自旋预算越大吸收得越多;
+自旋阶段每次读时钟推进 1µs。
+
+使用方法 (在项目根目录下执行):
+    python tools/bench_sequence_playback.py --virtual
+    python tools/bench_sequence_playback.py --latency lognormal:8,0.6 --runs 3
+    python tools/bench_sequence_playback.py --virtual --latency spike:5,120,0.05 --spin-ms 0 2 5
+    python tools/bench_sequence_playback.py --virtual --oversleep lognormal:2,0.8 --spin-ms 0 1 2 5
+    python tools/bench_sequence_playback.py --virtual --json bench.json
+    python tools/bench_sequence_playback.py --virtual --baseline bench.json --tolerance-ms 2
+    python tools/bench_sequence_playback.py --virtual --latency lognormal:12 --runs 5 --no-compensation
+
+耗时模型 (--latency / --oversleep):
+    constant:<ms>                       固定耗时
+    lognormal:<median_ms>[,<sigma>]     对数正态耗时
+    spike:<base_ms>,<spike_ms>[,<prob>] 平时 base_ms, 按概率出现尖峰
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, "agent"))
+
+from simulation import (  # noqa: E402
+    FakeContext, FakeController, FakeRunArg, VirtualClock,
+    constant_latency, lognormal_latency, spike_latency,
+)
+from movement_action.action_sequence import JsonActionSequence  # noqa: E402
+from movement_action.latency import LatencyEstimator  # noqa: E402
+from movement_action.sequence_cache import SEQUENCE_CACHE  # noqa: E402
+from movement_action.telemetry import TimingRecorder, percentile  # noqa: E402
+
+
+class _CapturingRecorder(TimingRecorder):
+    """记录最近一次回放的时序, 文件写入临时目录, 不污染 Agent 日志"""
+
+    last = None
+
+    def record(self, timing, outcome="completed"):
+        self.last = timing
+        return super().record(timing, outcome)
+
+
+def parse_latency(spec, seed):
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v] if args else []
+    if kind == "constant":
+        return constant_latency(*(values or [0.0]))
+    if kind == "lognormal":
+        return lognormal_latency(*values, seed=seed)
+    if kind == "spike":
+        return spike_latency(*values, seed=seed)
+    raise ValueError(f"未知的耗时模型: {spec}")
+
+
+def bench_route(route, args, spin_ms, recorder, estimator):
+    """回放一条路线 args.runs 次, 返回统计字典"""
+    errors_ms = []
+    lateness_ms = []
+    wall = 0.0
+    simulated = 0.0
+    for run in range(args.runs):
+        seed = None if args.seed is None else args.seed + run
+        latency = parse_latency(args.latency, seed)
+        if args.virtual:
+            clock = VirtualClock(oversleep=parse_latency(args.oversleep, None if seed is None else seed + 10000))
+            controller = FakeController(latency=latency, virtual_clock=clock)
+            action = JsonActionSequence(clock=clock.now, sleep=clock.sleep, spin_ms=spin_ms,
+                                        recorder=recorder, estimator=estimator)
+        else:
+            controller = FakeController(latency=latency)
+            action = JsonActionSequence(spin_ms=spin_ms, recorder=recorder, estimator=estimator)
+        context = FakeContext(controller=controller)
+        param = json.dumps({"file": route, "compensate": not args.no_compensation})
+
+        recorder.last = None
+        begin = time.perf_counter()
+        ok = action.run(context, FakeRunArg(param, node_name="Benchmark", custom_action_name="JsonActionSequence"))
+        wall += time.perf_counter() - begin
+        timing = recorder.last
+        if not ok or timing is None:
+            return {"route": route, "ok": False}
+
+        jobs = [j for j in controller.jobs if j.kind in ("key_down", "key_up")]
+        for i, planned in enumerate(timing.planned):
+            late = timing.dispatched[i] - planned
+            lateness_ms.append(late * 1000)
+            errors_ms.append((late + jobs[i].done_at - jobs[i].posted_at) * 1000)
+        simulated += timing.planned[-1] if timing.planned else 0.0
+
+    return {
+        "route": route,
+        "ok": True,
+        "events": len(errors_ms),
+        "error_p50_ms": percentile(errors_ms, 50),
+        "error_p95_ms": percentile(errors_ms, 95),
+        "error_p99_ms": percentile(errors_ms, 99),
+        "error_max_ms": max(errors_ms),
+        "lateness_p99_ms": percentile(lateness_ms, 99),
+        "simulated_s": simulated,
+        "wall_s": wall,
+    }
+
+
+def compare_baseline(results, baseline_path, tolerance_ms):
+    """与基线报告比较 error_p99, 返回回归的 (路线, spin, 基线, 当前) 列表"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    expected = {(r["route"], r["spin_ms"]): r for r in baseline.get("results", []) if r.get("ok")}
+    regressions = []
+    for r in results:
+        base = expected.get((r["route"], r["spin_ms"]))
+        if not r["ok"]:
+            regressions.append((r["route"], r["spin_ms"], base and base["error_p99_ms"], None))
+        elif base and r["error_p99_ms"] > base["error_p99_ms"] + tolerance_ms:
+            regressions.append((r["route"], r["spin_ms"], base["error_p99_ms"], r["error_p99_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="动作序列回放基准测试")
+    parser.add_argument("action_dir", nargs="?", default=os.path.join(project_root, "agent", "action_json"))
+    parser.add_argument("--latency", default="constant:0", help="Job 耗时模型, 默认 constant:0")
+    parser.add_argument("--virtual", action="store_true", help="使用虚拟时钟 (远快于实时)")
+    parser.add_argument("--spin-ms", type=float, nargs="+", default=[None],
+                        help="调度器自旋预算 (毫秒), 可给多个值对比, 默认读取配置 sequence_spin_ms")
+    parser.add_argument("--oversleep", default="lognormal:1,0.5",
+                        help="虚拟时钟下每次睡眠的唤醒误差模型, 默认 lognormal:1,0.5")
+    parser.add_argument("--runs", type=int, default=1, help="每条路线回放次数, 默认 1")
+    parser.add_argument("--seed", type=int, default=0, help="耗时模型随机种子, 默认 0")
+    parser.add_argument("--route", nargs="+", help="只测试指定路线 (文件名, 可省略 .json)")
+    parser.add_argument("--no-compensation", action="store_true", help="关闭控制器延迟补偿")
+    parser.add_argument("--json", help="将结果写入 JSON 文件 (可作为 --baseline)")
+    parser.add_argument("--baseline", help="基线结果 JSON, error_p99 超出容差时返回非零")
+    parser.add_argument("--tolerance-ms", type=float, default=2.0, help="回归容差 (毫秒), 默认 2")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出 Agent 日志")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(levelname)s %(name)s: %(message)s")
+
+    SEQUENCE_CACHE.build_index(args.action_dir)
+    routes = args.route or sorted(f[:-5] for f in os.listdir(args.action_dir) if f.lower().endswith(".json"))
+    spins = args.spin_ms
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = _CapturingRecorder(log_dir=tmp)
+        for spin_ms in spins:
+            # 每种调度配置使用独立的延迟估计 (跨路线持续学习, 与 Agent 进程内一致)
+            estimator = LatencyEstimator()
+            for route in routes:
+                result = bench_route(route, args, spin_ms, recorder, estimator)
+                result["spin_ms"] = spin_ms
+                results.append(result)
+
+    mode = "虚拟时钟" if args.virtual else "实时"
+    compensation = "关闭" if args.no_compensation else "开启"
+    oversleep = f", 唤醒误差: {args.oversleep}" if args.virtual else ""
+    print(f"模式: {mode}, 耗时模型: {args.latency}{oversleep}, 延迟补偿: {compensation}, 每条路线 {args.runs} 次")
+    print(f"{'路线':28} {'spin':>5} {'事件':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} "
+          f"{'迟到p99':>8} {'模拟(s)':>8} {'耗时(s)':>8}")
+    for r in results:
+        spin = "-" if r["spin_ms"] is None else f"{r['spin_ms']:g}"
+        if not r["ok"]:
+            print(f"{r['route']:28} {spin:>5} 回放失败")
+            continue
+        print(f"{r['route']:28} {spin:>5} {r['events']:5d} {r['error_p50_ms']:8.2f} {r['error_p95_ms']:8.2f} "
+              f"{r['error_p99_ms']:8.2f} {r['error_max_ms']:8.2f} {r['lateness_p99_ms']:8.2f} "
+              f"{r['simulated_s']:8.2f} {r['wall_s']:8.2f}")
+    print("误差单位: 毫秒 (按键生效时刻 - 计划时刻)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"mode": mode, "latency": args.latency, "oversleep": args.oversleep if args.virtual else None,
+                       "compensation": not args.no_compensation,
+                       "runs": args.runs, "results": results},
+                      f, ensure_ascii=False, indent=2)
+
+    failed = [r for r in results if not r["ok"]]
+    if args.baseline:
+        regressions = compare_baseline(results, args.baseline, args.tolerance_ms)
+        for route, spin, base, current in regressions:
+            print(f"[回归] {route} (spin={spin}): 基线 p99 {base} ms -> 当前 {current} ms")
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Agent 启动 (time-to-ready) 基准测试
+
+以 --profile-startup --dry-run 多次启动 agent/main.py (或打包后的 MaaAgent.exe):
+每次都是新进程 (冷导入), 完成 AgentServer.start_up 之前的全部阶段后同步预热各动作模块并退出。
+工作目录为临时目录, 不污染项目的 logs_agent / config。输出:
+
+    就绪      main.py 开始执行到可以启动 AgentServer 的用时 (动作模块延迟加载, 不含预热)
+    进程就绪  进程创建到就绪的估计用时 (进程总耗时 - 就绪之后的耗时), 含解释器 / 打包程序自身的启动
+    预热      就绪后导入全部动作模块与建立序列索引的用时 (实际运行时在后台进行)
+    各阶段    --profile-startup 报告中每个阶段的耗时
+
+使用方法 (在项目根目录下执行):
+    python tools/bench_startup.py --runs 10
+    python tools/bench_startup.py --runs 10 --json startup.json
+    python tools/bench_startup.py --runs 10 --baseline startup.json --tolerance-ms 30
+    python tools/bench_startup.py --exe dist/MaaAgent.exe --runs 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(project_root, "agent", "main.py")
+
+# 预热阶段名 (与 main.py 一致)
+WARM_UP_PHASE = "warm_up (dry-run)"
+
+
+def median(values):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def run_once(command, workdir, profile_path, timeout):
+    """启动一次, 返回 (启动分析报告, 进程总耗时毫秒)"""
+    begin = time.perf_counter()
+    proc = subprocess.run(command + [f"--profile-startup={profile_path}", "--dry-run"], cwd=workdir,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout)
+    wall_ms = (time.perf_counter() - begin) * 1000
+    if proc.returncode != 0 or not os.path.exists(profile_path):
+        output = proc.stdout.decode("utf-8", errors="replace")
+        raise RuntimeError(f"启动失败 (返回码 {proc.returncode}):\n{output[-2000:]}")
+    with open(profile_path, "r", encoding="utf-8") as f:
+        return json.load(f), wall_ms
+
+
+def summarize(profiles, walls):
+    ready = [p["ready_ms"] for p in profiles]
+    after_ready = [p["total_ms"] - p["ready_ms"] for p in profiles]
+    phases = {}
+    for p in profiles:
+        for item in p["phases"]:
+            phases.setdefault(item["name"], []).append(item["ms"])
+    warm_up = phases.pop(WARM_UP_PHASE, [0.0])
+    return {
+        "runs": len(profiles),
+        "ready_ms": median(ready),
+        "ready_min_ms": min(ready),
+        "ready_max_ms": max(ready),
+        "process_ready_ms": median([w - a for w, a in zip(walls, after_ready)]),
+        "process_ms": median(walls),
+        "warm_up_ms": median(warm_up),
+        "phases_ms": {name: median(values) for name, values in phases.items()},
+        "imports": len(profiles[-1]["imports"]),
+        "top_imports": profiles[-1]["imports"][:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent 启动 (time-to-ready) 基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="启动次数, 默认 5")
+    parser.add_argument("--exe", help="测试打包后的可执行文件 (默认以当前解释器运行 agent/main.py)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="单次启动超时 (秒), 默认 60")
+    parser.add_argument("--json", help="将结果写入 JSON 文件 (可作为 --baseline)")
+    parser.add_argument("--baseline", help="基线结果 JSON, 就绪用时中位数超出容差时返回非零")
+    parser.add_argument("--tolerance-ms", type=float, default=30.0, help="回归容差 (毫秒), 默认 30")
+    args = parser.parse_args()
+
+    command = [os.path.abspath(args.exe)] if args.exe else [sys.executable, MAIN_SCRIPT]
+    profiles = []
+    walls = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.runs):
+            profile_path = os.path.join(tmp, f"startup_{i}.json")
+            try:
+                profile, wall_ms = run_once(command, tmp, profile_path, args.timeout)
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                print(f"[失败] 第 {i + 1} 次启动: {e}")
+                return 1
+            profiles.append(profile)
+            walls.append(wall_ms)
+
+    result = summarize(profiles, walls)
+    print(f"目标: {' '.join(command)}, 启动 {result['runs']} 次 (中位数)")
+    print(f"  就绪:     {result['ready_ms']:8.1f}ms (最小 {result['ready_min_ms']:.1f}ms, 最大 {result['ready_max_ms']:.1f}ms)")
+    print(f"  进程就绪: {result['process_ready_ms']:8.1f}ms (进程总耗时 {result['process_ms']:.1f}ms)")
+    print(f"  预热:     {result['warm_up_ms']:8.1f}ms (就绪后在后台进行)")
+    for name, ms in result["phases_ms"].items():
+        print(f"  阶段 {name:24} {ms:8.1f}ms")
+    print(f"  新导入 {result['imports']} 个模块, 累计耗时最多的:")
+    for item in result["top_imports"]:
+        print(f"    {item['module']:40} {item['cumulative_ms']:8.1f}ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"command": command, "result": result}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            base = json.load(f)["result"]["ready_ms"]
+        if result["ready_ms"] > base + args.tolerance_ms:
+            print(f"[回归] 就绪用时: 基线 {base:.1f}ms -> 当前 {result['ready_ms']:.1f}ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+动作序列优化工具
+
+对 agent/action_json 下的序列去除冗余按键、合并重叠按住、裁剪首尾空闲,
+可选压缩中间空闲段, 并输出每条路线节省的秒数。
+
+使用方法 (在项目根目录下执行):
+    python tools/optimize_action_json.py                      # 仅输出报告, 不写文件
+    python tools/optimize_action_json.py --out optimized/     # 写入到新目录
+    python tools/optimize_action_json.py --in-place --idle-ratio 0.5 --min-idle 0.2
+"""
+
+import argparse
+import json
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, "agent"))
+
+from movement_action.sequence_optimizer import optimize_sequence  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="优化 action_json 动作序列")
+    parser.add_argument("action_dir", nargs="?", default=os.path.join(project_root, "agent", "action_json"))
+    parser.add_argument("--out", help="优化结果输出目录")
+    parser.add_argument("--in-place", action="store_true", help="直接覆盖原文件")
+    parser.add_argument("--lead", type=float, default=0.0, help="第一个事件的起始时间 (秒), 默认 0")
+    parser.add_argument("--min-hold", type=float, default=0.0, help="丢弃按住时长不超过此值的按键 (秒), 默认 0")
+    parser.add_argument("--merge-gap", type=float, default=0.0, help="松开后多久内再按下视为一直按住 (秒), 默认 0")
+    parser.add_argument("--idle-ratio", type=float, default=None, help="中间空闲段缩放比例 (0~1), 默认不压缩")
+    parser.add_argument("--min-idle", type=float, default=0.0, help="压缩后空闲段最短时长 (秒), 默认 0")
+    parser.add_argument("--report", help="将报告写入 JSON 文件")
+    args = parser.parse_args()
+
+    out_dir = args.action_dir if args.in_place else args.out
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    reports = []
+    for fname in sorted(os.listdir(args.action_dir)):
+        if not fname.lower().endswith(".json"):
+            continue
+        path = os.path.join(args.action_dir, fname)
+        with open(path, "r", encoding="utf-8") as f:
+            sequence_data = json.load(f)
+
+        optimized, report = optimize_sequence(
+            sequence_data,
+            min_hold=args.min_hold,
+            merge_gap=args.merge_gap,
+            lead=args.lead,
+            idle_ratio=args.idle_ratio,
+            min_idle=args.min_idle,
+        )
+        reports.append(report)
+
+        if out_dir:
+            with open(os.path.join(out_dir, fname), "w", encoding="utf-8") as f:
+                json.dump(optimized, f, ensure_ascii=False, indent=2)
+
+    print(f"{'序列':30} {'原时长':>8} {'优化后':>8} {'节省':>8} {'事件数':>9}")
+    for r in reports:
+        print(f"{r.name:30} {r.original_time:8.3f} {r.optimized_time:8.3f} {r.saved:8.3f} "
+              f"{r.original_events:4d}->{r.optimized_events:<4d}")
+    total_saved = sum(r.saved for r in reports)
+    print(f"共 {len(reports)} 个序列, 合计节省 {total_saved:.3f} 秒")
+    if out_dir:
+        print(f"优化结果已写入: {out_dir}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"total_saved": round(total_saved, 6), "sequences": [r.to_dict() for r in reports]},
+                      f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+动作序列打包工具
+
+将 agent/action_json 下的 JSON 序列转换为紧凑二进制格式:
+- library.madlib: 单个序列库文件, Agent 读入内存按名称查找 (运行中重新打包后自动重新读取)
+- <name>.seqb:    (可选) 每个序列对应的独立二进制文件
+
+使用方法 (在项目根目录下执行):
+    python tools/pack_action_json.py [action_json目录] [--out library.madlib] [--files]
+"""
+
+import argparse
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, "agent"))
+
+from movement_action.packed_sequence import convert_directory, LIBRARY_FILE_NAME  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="将 JSON 动作序列打包为紧凑二进制格式")
+    parser.add_argument("action_dir", nargs="?", default=os.path.join(project_root, "agent", "action_json"))
+    parser.add_argument("--out", help=f"序列库输出路径, 默认 <action_dir>/{LIBRARY_FILE_NAME}")
+    parser.add_argument("--files", action="store_true", help="同时为每个 JSON 写出同名 .seqb 文件")
+    args = parser.parse_args()
+
+    library_path = args.out or os.path.join(args.action_dir, LIBRARY_FILE_NAME)
+    stats = convert_directory(args.action_dir, library_path, write_files=args.files)
+
+    total_json = sum(s[1] for s in stats)
+    total_packed = sum(s[2] for s in stats)
+    for route_name, json_bytes, packed_bytes in stats:
+        print(f"  {route_name:30} {json_bytes:8d} B -> {packed_bytes:6d} B")
+    print(f"共 {len(stats)} 个序列: {total_json} B -> {total_packed} B, 序列库 {os.path.getsize(library_path)} B")
+    print(f"序列库已写入: {library_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
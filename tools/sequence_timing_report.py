@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+动作序列回放时序报告
+
+读取 Agent 写入的 logs_agent/sequence_timing.jsonl, 按序列名汇总全部回放,
+输出各结果 (completed / stopped / error) 的回放次数、派发迟到时间的 p50/p95/p99 与直方图,
+可选导出 CSV。旧记录没有 outcome 字段, 视为 completed (当时只记录正常完成的回放)。
+
+使用方法 (在项目根目录或安装目录下执行):
+    python tools/sequence_timing_report.py [timing.jsonl] [--csv out.csv] [--outcome completed]
+    python tools/sequence_timing_report.py logs_agent/sequence_timing.jsonl.1.gz   # 滚动压缩后的记录
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import math
+import os
+import sys
+
+# 复用 Agent 侧的统计函数
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+from movement_action.telemetry import percentile, histogram, TIMING_FILE_NAME, OUTCOME_COMPLETED  # noqa: E402
+from tools import LOG_DIR  # noqa: E402
+
+
+def load_records(path):
+    records = []
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"[警告] 第 {line_no} 行不是有效 JSON, 已跳过")
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="动作序列回放时序报告")
+    parser.add_argument("path", nargs="?", default=os.path.join(LOG_DIR, TIMING_FILE_NAME))
+    parser.add_argument("--csv", help="将逐事件记录导出为 CSV")
+    parser.add_argument("--outcome", action="append",
+                        help="只统计指定结果的回放 (completed / stopped / error, 可重复), 默认全部")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"时序文件不存在: {args.path}")
+        return 1
+
+    records = load_records(args.path)
+    by_sequence = {}
+    for record in records:
+        record.setdefault("outcome", OUTCOME_COMPLETED)
+        if args.outcome and record["outcome"] not in args.outcome:
+            continue
+        by_sequence.setdefault(record.get("sequence", "未知序列"), []).append(record)
+
+    rows = []
+    for name in sorted(by_sequence):
+        late_ms = []
+        for run, record in enumerate(by_sequence[name]):
+            for index, (planned, dispatched, completed) in enumerate(record.get("events", [])):
+                rows.append([name, record.get("time"), record["outcome"], run, index, planned, dispatched, completed])
+                if planned is not None and dispatched is not None:
+                    late_ms.append((dispatched - planned) * 1000)
+
+        print("=" * 60)
+        outcomes = {}
+        for record in by_sequence[name]:
+            outcomes[record["outcome"]] = outcomes.get(record["outcome"], 0) + 1
+        detail = ", ".join(f"{outcome} {count}" for outcome, count in sorted(outcomes.items()))
+        print(f"{name}: {len(by_sequence[name])} 次回放 ({detail}), {len(late_ms)} 个事件")
+        if not late_ms:
+            continue
+        print(f"  派发迟到: p50 {percentile(late_ms, 50):.2f}ms, "
+              f"p95 {percentile(late_ms, 95):.2f}ms, p99 {percentile(late_ms, 99):.2f}ms")
+        peak = max(count for _, count in histogram(late_ms)) or 1
+        for label, count in histogram(late_ms):
+            bar = "#" * int(math.ceil(40 * count / peak)) if count else ""
+            print(f"  {label:>8} {count:6d} {bar}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["sequence", "time", "outcome", "run", "event", "planned_s", "dispatched_s", "completed_s"])
+            writer.writerows(rows)
+        print(f"已导出 CSV: {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())